@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from configparser import RawConfigParser
 
@@ -7,12 +8,16 @@ from fastapi import FastAPI
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 from starlette.middleware.cors import CORSMiddleware
-from starlette.requests import Request
 from starlette.responses import JSONResponse
 
+from app.cross.compression import CompressionMiddleware
+from app.cross.limits import RequestSizeLimitMiddleware
+from app.cross.responses import default_response_class
+from app.cross.security import jwks_provider  # type: ignore
+from app.db.instrumentation import QueryStatsMiddleware
 from app.db.loader import load_models
-from app.db.session import Session
 from app.repositories.exceptions import RecordNotFound
+from app.utils.images import shutdown_image_pool
 from app.utils.log import configure_logging
 
 
@@ -26,7 +31,10 @@ configParser.read("setup.cfg")
 version = configParser.get("metadata", "version", fallback="0.1.0")
 
 app: FastAPI = FastAPI(
-    title="FastAPI Nexton Starter", redoc_url="/redoc", version=version
+    title="FastAPI Nexton Starter",
+    redoc_url="/redoc",
+    version=version,
+    default_response_class=default_response_class,
 )
 
 # TODO: update this to be secure
@@ -38,14 +46,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RequestSizeLimitMiddleware)
 
 
-@app.middleware("http")
-async def db_session_middleware(request: Request, call_next):
-    request.state.db = Session()
-    response = await call_next(request)
-    request.state.db.close()
-    return response
+def preload() -> None:
+    """Runs once in the server's master process, before it forks the workers"""
+    asyncio.run(jwks_provider.load())
+
+
+@app.on_event("startup")
+async def load_jwks():
+    # Best effort, the keys are fetched on the first request otherwise. Workers
+    # forked from a preloaded master start with its keys.
+    if not jwks_provider.fresh:
+        await jwks_provider.load()
+
+
+@app.on_event("shutdown")
+def stop_image_pool():
+    shutdown_image_pool()
 
 
 @app.exception_handler(IntegrityError)
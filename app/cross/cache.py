@@ -0,0 +1,88 @@
+import hashlib
+import typing
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.cross.responses import render_json
+from app.settings.globals import (
+    CACHE_BACKEND,
+    REDIS_URL,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+)
+from app.utils.cache import CacheBackend, create_backend
+
+
+class ResponseCache:
+    """
+    Conditional GET support for read endpoints.
+
+    The ETag of a response hashes the request, a cheap version signal read from
+    the database (e.g. `max(updated_at)` and the row count) and the generation of
+    its scope, bumped by `invalidate` on writes. Clients sending a matching
+    `If-None-Match` get a 304; otherwise the rendered body is served from the
+    backend while the ETag holds.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    def invalidate(self, *scopes: str) -> None:
+        for scope in scopes:
+            self.backend.incr(f"generation:{scope}")
+
+    def etag(self, request: Request, scope: str, version: object, vary: object) -> str:
+        generation = self.backend.counter(f"generation:{scope}")
+        digest = hashlib.sha256(
+            repr(
+                (scope, generation, version, vary, request.url.path, request.url.query)
+            ).encode()
+        ).hexdigest()
+        return f'"{digest[:32]}"'
+
+    async def respond(
+        self,
+        request: Request,
+        scope: str,
+        version: typing.Callable[[], typing.Awaitable[object]],
+        render: typing.Callable[[], typing.Awaitable[object]],
+        vary: object = None,
+    ) -> Response:
+        """
+        Responds with what `render` returns, or a 304 / the cached body when the
+        `version` of the data (and `vary`, e.g. the user) didn't change.
+        """
+        # The backend may be a network round trip, keep it off the event loop
+        etag = await run_in_threadpool(self.etag, request, scope, await version(), vary)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        body = await run_in_threadpool(self.backend.get, f"response:{etag}")
+        if body is None:
+            body = render_json(await render())
+            await run_in_threadpool(
+                self.backend.set, f"response:{etag}", body, ttl=self.ttl
+            )
+        return Response(body, media_type="application/json", headers=headers)
+
+
+def _matches(if_none_match: typing.Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+response_cache = ResponseCache(
+    create_backend(
+        CACHE_BACKEND,
+        maxsize=RESPONSE_CACHE_SIZE,
+        ttl=RESPONSE_CACHE_TTL,
+        url=REDIS_URL,
+    ),
+    ttl=RESPONSE_CACHE_TTL,
+)
@@ -0,0 +1,184 @@
+import typing
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.settings.globals import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_SIZE,
+)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Media types not worth compressing again
+INCOMPRESSIBLE_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/octet-stream",
+)
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """What was compressed so far, so streamed chunks aren't held back"""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return typing.cast(bytes, self._compressor.process(data))
+
+    def flush(self) -> bytes:
+        return typing.cast(bytes, self._compressor.flush())
+
+    def finish(self) -> bytes:
+        return typing.cast(bytes, self._compressor.finish())
+
+
+Compressor = typing.Union[GzipCompressor, BrotliCompressor]
+
+
+def accepted_encodings(accept_encoding: str) -> typing.Dict[str, float]:
+    """Encodings of an `Accept-Encoding` header, by quality"""
+    encodings = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli (when installed) or gzip, whichever the
+    client accepts, preferring brotli. Bodies sent in one message are only
+    compressed from `minimum_size` bytes; streamed ones (the exports) are
+    compressed chunk by chunk, each chunk flushed to the client as it comes.
+    Responses already encoded or of an incompressible media type are left alone.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def negotiate(self, scope: Scope) -> typing.Optional[str]:
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        wildcard = encodings.get("*", 0.0)
+        available = ["br", "gzip"] if brotli is not None else ["gzip"]
+        # The first of the best quality, so brotli wins ties
+        best = max(available, key=lambda name: encodings.get(name, wildcard))
+        return best if encodings.get(best, wildcard) > 0 else None
+
+    def compressor(self, encoding: str) -> Compressor:
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        negotiated = self.negotiate(scope)
+        if negotiated is None:
+            await self.app(scope, receive, send)
+            return
+        encoding: str = negotiated
+
+        start: typing.Optional[Message] = None
+        compressor: typing.Optional[Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                    or media_type.startswith(INCOMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held until the first body message tells whether to compress
+                    start = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                # The start message always comes before the body
+                start = typing.cast(Message, start)
+                headers = MutableHeaders(scope=start)
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers and not headers["etag"].startswith("W/"):
+                    # Same content, different bytes than the identity response.
+                    # Weak whether or not this one is compressed, 304s included.
+                    headers["ETag"] = f"W/{headers['etag']}"
+                if not more_body and (not body or len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = self.compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({**message, "body": body})
+                    return
+                await send(start)
+
+            chunk = compressor.compress(body)
+            chunk += compressor.flush() if more_body else compressor.finish()
+            await send({**message, "body": chunk})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,6 +1,78 @@
-from sqlalchemy.orm import Session
-from starlette.requests import Request
+import contextlib
+import functools
+import typing
 
+from sqlalchemy.ext.asyncio import AsyncSession as _AsyncSession
+from sqlalchemy.orm import Session as _Session
+from starlette.concurrency import run_in_threadpool
 
-def get_db(request: Request) -> Session:
-    return request.state.db  # type: ignore
+from app.db.session import AsyncSession
+from app.db.session import Session
+from app.settings.globals import DATABASE_ASYNC
+
+
+T = typing.TypeVar("T")
+DbSession = typing.Union[_Session, _AsyncSession]
+
+
+def _end_transaction(db: _Session) -> None:
+    transaction = db.get_transaction()  # type: ignore
+    if transaction is None:
+        return
+    if transaction.is_active:
+        db.commit()
+    else:
+        # A failed flush (e.g. an IntegrityError turned into a 409) leaves the
+        # transaction inactive; it can only be rolled back.
+        db.rollback()
+
+
+async def get_db() -> typing.AsyncIterator[DbSession]:
+    """
+    Request scoped session, only created for routes that depend on it.
+
+    The session checks out a connection on its first statement and always
+    releases it back to the pool. Writes are committed by the repositories
+    before the route returns: the teardown only runs once the response is sent,
+    so it rolls back whatever is left open instead of committing it.
+    """
+    db: DbSession = AsyncSession() if DATABASE_ASYNC else Session()
+    try:
+        yield db
+    finally:
+        # Closing rolls back the transaction left open, if any
+        if isinstance(db, _AsyncSession):
+            await db.close()
+        else:
+            await run_in_threadpool(db.close)
+
+
+# `get_db` for work outside of a request, e.g. background tasks:
+#     async with db_scope() as db: ...
+db_scope = contextlib.asynccontextmanager(get_db)
+
+
+async def run_db(  # type: ignore
+    db: DbSession, fn: typing.Callable[..., T], **kwargs: object
+) -> T:
+    """
+    Runs a synchronous service or repository call against the request session
+    without blocking the event loop.
+
+    With an `AsyncSession` the call goes through `run_sync`, so every statement is
+    awaited on the asyncpg connection. With a plain `Session` the call is moved to
+    the threadpool.
+    """
+    if isinstance(db, _AsyncSession):
+        return typing.cast(
+            T, await db.run_sync(lambda session: fn(db=session, **kwargs))
+        )
+    return await run_in_threadpool(functools.partial(fn, db=db, **kwargs))
+
+
+async def release_db(db: DbSession) -> None:
+    """
+    Ends the session's transaction so its connection goes back to the pool, e.g.
+    before slow work that doesn't need the database. The session stays usable.
+    """
+    await run_db(db, _end_transaction)
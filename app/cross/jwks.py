@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+import time
+import typing
+
+import httpx
+
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+JWK = typing.Dict[str, str]
+
+
+class JWKS(BaseModel):
+    keys: typing.List[JWK]
+
+
+Fetch = typing.Callable[[], typing.Awaitable[JWKS]]
+
+
+class JWKSProvider:
+    """
+    JSON Web Key Set of the token issuer, fetched on first use (or on startup
+    through `load`) and cached for `ttl` seconds.
+
+    A token signed with an unknown `kid` triggers one refetch, shared by every
+    request waiting on it, at most once every `min_refresh_interval` seconds.
+    When a refetch fails the keys already known keep being used.
+    """
+
+    def __init__(
+        self,
+        url: typing.Optional[str] = None,
+        *,
+        path: typing.Optional[str] = None,
+        fetch: typing.Optional[Fetch] = None,
+        ttl: float = 3600.0,
+        min_refresh_interval: float = 60.0,
+        timeout: float = 5.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.url = url
+        self.path = path
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.clock = clock
+        self._fetch = fetch
+        self._keys: typing.Dict[str, JWK] = {}
+        self._expires_at: typing.Optional[float] = None
+        self._attempted_at: typing.Optional[float] = None
+        self._lock: typing.Optional[asyncio.Lock] = None
+        self._lock_loop: typing.Optional[asyncio.AbstractEventLoop] = None
+
+    def seed(self, jwks: JWKS) -> None:
+        """Replaces the known keys, e.g. with a stand-in key set in tests"""
+        now = self.clock()
+        self._keys = {key["kid"]: key for key in jwks.keys}
+        self._expires_at = now + self.ttl
+        self._attempted_at = now
+
+    @property
+    def fresh(self) -> bool:
+        """Whether keys were fetched and their `ttl` hasn't run out yet"""
+        return bool(self._keys) and self.clock() < typing.cast(float, self._expires_at)
+
+    async def load(self) -> None:
+        """Fetches the key set ahead of the first request, without failing"""
+        await self._refresh(force=True)
+
+    async def get(self, kid: str) -> typing.Optional[JWK]:
+        """The key `kid`, or None when the issuer doesn't know it either"""
+        if self._expires_at is None or self.clock() >= self._expires_at:
+            await self._refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            await self._refresh()
+            key = self._keys.get(kid)
+        return key
+
+    def _refresh_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_event_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def _refresh(self, force: bool = False) -> None:
+        attempted_at = self._attempted_at
+        async with self._refresh_lock():
+            if self._attempted_at != attempted_at:
+                return  # refreshed by someone else while waiting for the lock
+            now = self.clock()
+            if (
+                not force
+                and attempted_at is not None
+                and now - attempted_at < self.min_refresh_interval
+            ):
+                return
+            self._attempted_at = now
+            try:
+                jwks = await self._fetch_jwks()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Could not fetch the JWKS: %r", exc)
+                # Keep using the known keys until the next attempt is allowed
+                self._expires_at = now + self.min_refresh_interval
+                return
+            self.seed(jwks)
+
+    async def _fetch_jwks(self) -> JWKS:
+        if self._fetch is not None:
+            return await self._fetch()
+        if self.path is not None:
+            with open(self.path) as jwks_file:
+                return JWKS.parse_obj(json.load(jwks_file))
+        if self.url is None:
+            raise ValueError("The JWKS provider has no url, path or fetch")
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+            return JWKS.parse_obj(response.json())
@@ -0,0 +1,59 @@
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.settings.globals import REQUEST_MAX_BYTES
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Refuses request bodies over `max_size` bytes with a 413. Starlette spools a
+    whole form (e.g. an avatar upload) before the route runs, so this is where
+    its size is bounded: at once from the Content-Length, or, for a chunked body,
+    as soon as what was received goes over the limit.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = REQUEST_MAX_BYTES):
+        self.app = app
+        self.max_size = max_size
+
+    def too_large(self) -> JSONResponse:
+        return JSONResponse(
+            {"detail": f"Requests are limited to {self.max_size} bytes"},
+            status_code=413,
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_size:
+            await self.too_large()(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        replaced = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    exceeded = True
+                    # The rest isn't read: parsing stops as if the client left
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def checked_send(message: Message) -> None:
+            nonlocal replaced
+            if exceeded and message["type"] == "http.response.start":
+                # Whatever error the app made of the cut body becomes a 413
+                replaced = True
+                await self.too_large()(scope, receive, send)
+            elif not replaced:
+                await send(message)
+
+        await self.app(scope, limited_receive, checked_send)
@@ -0,0 +1,59 @@
+import json
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from app.models.api.base import to_jsonable
+from app.settings.globals import FAST_RESPONSES
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+def _jsonable(content: object) -> object:
+    if isinstance(content, BaseModel):
+        return to_jsonable(content)
+    if isinstance(content, (list, tuple)):
+        return [_jsonable(item) for item in content]
+    return content
+
+
+def render_json(content: object) -> bytes:
+    """
+    `content` (DTOs included) as the JSON body FastAPI would send. With
+    FAST_RESPONSES and orjson it skips `jsonable_encoder` and the stdlib encoder.
+    """
+    if FAST_RESPONSES and orjson is not None:
+        return orjson.dumps(_jsonable(content), default=jsonable_encoder)
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class DTOResponse(JSONResponse):
+    def render(self, content: object) -> bytes:
+        return render_json(content)
+
+
+def dto_response(content: object, status_code: int = 200) -> object:
+    """
+    For routes returning DTOs built from trusted rows. With FAST_RESPONSES they
+    are rendered as they are, without FastAPI validating and copying them again
+    against the route's `response_model` (still used for the docs).
+    """
+    if not FAST_RESPONSES:
+        return content
+    return DTOResponse(content, status_code=status_code)
+
+
+# Response class of the routes that don't set one
+default_response_class = (
+    DTOResponse if FAST_RESPONSES and orjson is not None else JSONResponse
+)
@@ -1,7 +1,9 @@
 # type: ignore
-from typing import List, Dict, Optional
-
-import requests
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
 
 from fastapi import Depends
 from fastapi import HTTPException
@@ -9,51 +11,105 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from starlette.status import HTTP_403_FORBIDDEN
 
-from app.settings.globals import COGNITO_POOL_ID, COGNITO_REGION
-from jose import jwt, jwk, JWTError
+from app.cross.db import DbSession, get_db, run_db
+from app.cross.jwks import JWK, JWKSProvider
+from app.models.api.user import User as UserDto
+from app.services.api.user import user_service
+from app.settings.globals import (
+    JWKS_CACHE_TTL,
+    JWKS_FETCH_TIMEOUT,
+    JWKS_FILE,
+    JWKS_MIN_REFRESH_INTERVAL,
+    JWKS_URL,
+    JWT_CACHE_MAX_TTL,
+    JWT_CACHE_SIZE,
+)
+from app.utils.cache import TTLCache
+from jose import jwk
+from jose.backends.base import Key
 from jose.utils import base64url_decode
 from starlette.requests import Request
 
 
-JWK = Dict[str, str]
-
-
-class JWKS(BaseModel):
-    keys: List[JWK]
-
-
-json_web_key_set = JWKS.parse_obj(
-    requests.get(
-        f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/"
-        f"{COGNITO_POOL_ID}/.well-known/jwks.json"
-    ).json()
+jwks_provider = JWKSProvider(
+    JWKS_URL,
+    path=JWKS_FILE,
+    ttl=JWKS_CACHE_TTL,
+    min_refresh_interval=JWKS_MIN_REFRESH_INTERVAL,
+    timeout=JWKS_FETCH_TIMEOUT,
 )
 
 
 class JWTAuthorizationCredentials(BaseModel):
     jwt_token: str
-    header: Dict[str, str]
-    claims: Dict[str, str]
+    header: Dict[str, Any]
+    claims: Dict[str, Any]
     signature: str
     message: str
 
 
+def _invalid(detail: str = "JWK invalid") -> HTTPException:
+    return HTTPException(status_code=HTTP_403_FORBIDDEN, detail=detail)
+
+
+def parse_token(jwt_token: str) -> JWTAuthorizationCredentials:
+    """Splits and decodes a compact JWS once, without verifying it"""
+    try:
+        message, signature = jwt_token.rsplit(".", 1)
+        header_segment, claims_segment = message.split(".")
+        header = json.loads(base64url_decode(header_segment.encode()))
+        claims = json.loads(base64url_decode(claims_segment.encode()))
+    except ValueError:
+        raise _invalid()
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise _invalid()
+    # Decoded straight from the token, no need to validate them again
+    return JWTAuthorizationCredentials.construct(
+        jwt_token=jwt_token,
+        header=header,
+        claims=claims,
+        signature=signature,
+        message=message,
+    )
+
+
 class JWTBearer(HTTPBearer):
-    def __init__(self, jwks: JWKS, auto_error: bool = True):
+    def __init__(
+        self,
+        jwks: JWKSProvider,
+        auto_error: bool = True,
+        cache_size: int = JWT_CACHE_SIZE,
+        cache_max_ttl: float = JWT_CACHE_MAX_TTL,
+    ):
         super().__init__(auto_error=auto_error)
 
-        self.kid_to_jwk = {jwk["kid"]: jwk for jwk in jwks.keys}
-
-    def verify_jwk_token(self, jwt_credentials: JWTAuthorizationCredentials) -> bool:
+        self.jwks = jwks
+        # kid -> (JWK, key constructed from it)
+        self._keys: Dict[str, Tuple[JWK, Key]] = {}
+        # Verified credentials by token digest, until the token expires
+        self.verified: TTLCache[str, JWTAuthorizationCredentials] = TTLCache(
+            maxsize=cache_size, ttl=cache_max_ttl
+        )
+        self.cache_max_ttl = cache_max_ttl
+
+    async def _key(self, kid: Optional[str]) -> Key:
+        public_key = await self.jwks.get(kid)
+        if public_key is None:
+            raise _invalid("JWK public key not found")
+        cached = self._keys.get(kid)
+        if cached is None or cached[0] is not public_key:
+            cached = (public_key, jwk.construct(public_key))
+            self._keys[kid] = cached
+        return cached[1]
+
+    async def verify_jwk_token(
+        self, jwt_credentials: JWTAuthorizationCredentials
+    ) -> bool:
+        key = await self._key(jwt_credentials.header.get("kid"))
         try:
-            public_key = self.kid_to_jwk[jwt_credentials.header["kid"]]
-        except KeyError:
-            raise HTTPException(
-                status_code=HTTP_403_FORBIDDEN, detail="JWK public key not found"
-            )
-
-        key = jwk.construct(public_key)
-        decoded_signature = base64url_decode(jwt_credentials.signature.encode())
+            decoded_signature = base64url_decode(jwt_credentials.signature.encode())
+        except ValueError:
+            return False
 
         return key.verify(jwt_credentials.message.encode(), decoded_signature)
 
@@ -67,31 +123,30 @@ class JWTBearer(HTTPBearer):
                 )
 
             jwt_token = credentials.credentials
-
-            message, signature = jwt_token.rsplit(".", 1)
-
-            try:
-                jwt_credentials = JWTAuthorizationCredentials(
-                    jwt_token=jwt_token,
-                    header=jwt.get_unverified_header(jwt_token),
-                    claims=jwt.get_unverified_claims(jwt_token),
-                    signature=signature,
-                    message=message,
-                )
-            except JWTError:
-                raise HTTPException(
-                    status_code=HTTP_403_FORBIDDEN, detail="JWK invalid"
-                )
-
-            if not self.verify_jwk_token(jwt_credentials):
-                raise HTTPException(
-                    status_code=HTTP_403_FORBIDDEN, detail="JWK invalid"
-                )
-
+            digest = hashlib.sha256(jwt_token.encode()).hexdigest()
+            jwt_credentials = self.verified.get(digest)
+            if jwt_credentials is not None:
+                return jwt_credentials
+
+            jwt_credentials = parse_token(jwt_token)
+            if not await self.verify_jwk_token(jwt_credentials):
+                raise _invalid()
+
+            ttl = self.cache_max_ttl
+            expires_at = jwt_credentials.claims.get("exp")
+            if expires_at is not None:
+                try:
+                    ttl = min(ttl, float(expires_at) - time.time())
+                except (TypeError, ValueError):
+                    raise _invalid()
+                if ttl <= 0:
+                    raise _invalid("JWT expired")
+
+            self.verified.set(digest, jwt_credentials, ttl=ttl)
             return jwt_credentials
 
 
-auth = JWTBearer(json_web_key_set)
+auth = JWTBearer(jwks_provider)
 
 
 async def get_auth_user_id(
@@ -100,4 +155,38 @@ async def get_auth_user_id(
     try:
         return credentials.claims["sub"]
     except KeyError:
-        HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Username missing")
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Username missing")
+
+
+async def get_auth_user(
+    request: Request,
+    credentials: JWTAuthorizationCredentials = Depends(auth),
+    db: DbSession = Depends(get_db),
+) -> UserDto:
+    """
+    The user behind the token, created on first sight. Resolved once per request
+    and cached by the process, so it doesn't cost a query on every request.
+    """
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+
+    claims = credentials.claims
+    try:
+        user_id = uuid.UUID(str(claims["sub"]))
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Username missing")
+
+    user = user_service.cached(user_id)
+    if user is None:
+        user = await run_db(
+            db,
+            user_service.provision,
+            user_id=user_id,
+            username=claims.get("cognito:username")
+            or claims.get("username")
+            or str(user_id),
+            email=claims.get("email") or str(user_id),
+        )
+    request.state.user = user
+    return user
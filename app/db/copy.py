@@ -0,0 +1,68 @@
+import io
+import json
+import typing
+
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only  # type: ignore
+
+
+def _copy_value(value: object) -> object:
+    # JSON columns take their text representation, with either driver
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _copy_text(value: object) -> str:
+    if value is None:
+        return "\\N"
+    return (
+        str(_copy_value(value))
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows(
+    db: Session,
+    table_name: str,
+    columns: typing.Sequence[str],
+    rows: typing.Iterable[typing.Mapping[str, object]],
+) -> None:
+    """
+    Loads `rows` into `table_name` with COPY, on the connection of the session's
+    current transaction.
+
+    Works with psycopg2 and with asyncpg when called through `AsyncSession.run_sync`.
+    """
+    connection = db.connection().connection
+    driver_connection = connection.driver_connection
+
+    if hasattr(driver_connection, "copy_records_to_table"):  # asyncpg
+        await_only(
+            driver_connection.copy_records_to_table(
+                table_name,
+                records=[
+                    tuple(_copy_value(row[column]) for column in columns)
+                    for row in rows
+                ],
+                columns=list(columns),
+            )
+        )
+        return
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_text(row[column]) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    cursor = connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table_name} ({', '.join(columns)}) FROM STDIN", buffer
+        )
+    finally:
+        cursor.close()
@@ -0,0 +1,45 @@
+import json
+import typing
+
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.expression import ClauseElement
+from sqlalchemy.sql.expression import Executable
+
+
+class Explain(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON)` of a statement, with its parameters bound as usual"""
+
+    inherit_cache = False
+
+    def __init__(self, statement: ClauseElement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def estimate_rows(db: Session, statement: ClauseElement) -> int:
+    """Number of rows the planner expects `statement` to return, without running it"""
+    plan = db.execute(Explain(statement)).scalar()
+    if isinstance(plan, str):  # asyncpg doesn't decode json columns
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_table_rows(db: Session, table_name: str) -> typing.Optional[int]:
+    """
+    Table size from the statistics kept by VACUUM/ANALYZE, or None when the
+    table has never been analyzed.
+    """
+    reltuples = db.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name},
+    ).scalar()
+    if reltuples is None or reltuples < 0:
+        return None
+    return int(reltuples)
@@ -0,0 +1,144 @@
+import contextlib
+import logging
+import re
+import time
+import typing
+
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from app.settings.globals import SQL_REPEATED_STATEMENT_THRESHOLD
+
+
+logger = logging.getLogger(__name__)
+
+# Bound parameter lists, e.g. the expanded `IN (%(id_1_1)s, %(id_1_2)s)`
+_PARAMETER_LIST = re.compile(
+    r"\(\s*(?:%\(\w+\)s|\$\d+|%s)(?:\s*,\s*(?:%\(\w+\)s|\$\d+|%s))*\s*\)"
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalizes a statement so that repeated executions compare equal"""
+    return _PARAMETER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Statements run while the stats were being captured"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: typing.Optional[str] = None
+        self.shapes: typing.Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int) -> typing.List[typing.Tuple[str, int]]:
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_seconds * 1000:.2f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_seconds * 1000:.2f}"
+        )
+
+
+_active: ContextVar[typing.Tuple[QueryStats, ...]] = ContextVar(
+    "query_stats", default=()
+)
+
+
+@contextlib.contextmanager
+def capture_queries() -> typing.Iterator[QueryStats]:
+    """Records every statement run by any engine in the current context"""
+    stats = QueryStats()
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, *_args):
+    if _active.get():
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, _cursor, statement, *_args):
+    collectors = _active.get()
+    if not collectors or not conn.info.get("query_started"):
+        return
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    for stats in collectors:
+        stats.record(statement, elapsed)
+
+
+class QueryStatsMiddleware:
+    """
+    Captures the statements run for each HTTP request, reports them in the
+    `Server-Timing` header and warns when a route repeats the same statement more
+    than `SQL_REPEATED_STATEMENT_THRESHOLD` times (usually an N+1 lazy load).
+    """
+
+    def __init__(self, app: ASGIApp, threshold: int = SQL_REPEATED_STATEMENT_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        with capture_queries() as stats:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self.report(scope, stats)
+
+    def report(self, scope: Scope, stats: QueryStats) -> None:
+        endpoint = scope.get("endpoint")
+        route = getattr(endpoint, "__qualname__", scope["path"])
+        for shape, count in stats.repeated(self.threshold):
+            logger.warning(
+                "%s %s ran the same statement %d times: %s",
+                scope["method"],
+                route,
+                count,
+                shape,
+            )
+        if stats.slowest_statement is not None:
+            logger.debug(
+                "%s %s: %d queries in %.2fms, slowest %.2fms: %s",
+                scope["method"],
+                scope["path"],
+                stats.count,
+                stats.total_seconds * 1000,
+                stats.slowest_seconds * 1000,
+                stats.slowest_statement,
+            )
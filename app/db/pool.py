@@ -0,0 +1,173 @@
+import functools
+import threading
+import time
+import typing
+
+from sqlalchemy import event
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # type: ignore
+from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import QueuePool
+
+from app.settings import globals as g
+from app.utils.metrics import Metric
+from app.utils.metrics import registry
+
+
+class PoolStats:
+    """Per worker counters for a connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def start_wait(self) -> float:
+        with self._lock:
+            self.waiting += 1
+        return time.perf_counter()
+
+    def end_wait(self, started: float, timed_out: bool = False) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.waiting -= 1
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds += elapsed
+            self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+
+    def checked_out(self, *_) -> None:
+        with self._lock:
+            self.in_use += 1
+
+    def checked_in(self, *_) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+
+class _InstrumentedPoolMixin:
+    stats: typing.Optional[PoolStats] = None
+
+    def _do_get(self):
+        if self.stats is None:
+            return super()._do_get()  # type: ignore
+
+        started = self.stats.start_wait()
+        try:
+            connection = super()._do_get()  # type: ignore
+        except exc.TimeoutError:
+            self.stats.end_wait(started, timed_out=True)
+            raise
+        except Exception:
+            self.stats.end_wait(started)
+            raise
+        self.stats.end_wait(started)
+        return connection
+
+    def recreate(self):
+        # Engine.dispose() swaps in a fresh pool; keep counting into the same stats
+        pool = super().recreate()  # type: ignore
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_size(workers: int, budget: int, max_overflow: int) -> int:
+    """
+    Splits the global connection budget evenly between workers, leaving room for
+    each pool's overflow connections.
+    """
+    return max(1, budget // max(1, workers) - max_overflow)
+
+
+def engine_options(is_async: bool = False) -> typing.Dict[str, object]:
+    """Keyword arguments for `create_engine`/`create_async_engine` from settings"""
+    options: typing.Dict[str, object] = {"pool_pre_ping": True}
+
+    if g.DATABASE_NULL_POOL:
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=(
+                g.DATABASE_POOL_SIZE
+                if g.DATABASE_POOL_SIZE is not None
+                else pool_size(
+                    g.WEB_CONCURRENCY,
+                    g.DATABASE_CONNECTION_BUDGET,
+                    g.DATABASE_MAX_OVERFLOW,
+                )
+            ),
+            max_overflow=g.DATABASE_MAX_OVERFLOW,
+            pool_timeout=g.DATABASE_POOL_TIMEOUT,
+            pool_recycle=g.DATABASE_POOL_RECYCLE,
+            pool_use_lifo=g.DATABASE_POOL_LIFO,
+        )
+
+    if g.DATABASE_PGBOUNCER and is_async:
+        # psycopg2 never prepares statements; asyncpg caches them per connection,
+        # which breaks once PgBouncer hands the transaction to another backend.
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+        }
+
+    return options
+
+
+def pool_metrics(
+    engine: Engine, name: str, stats: PoolStats
+) -> typing.Iterable[Metric]:
+    """Reports the checkout counters of `engine` at scrape time"""
+    pool = engine.pool
+    size = pool.size() if isinstance(pool, QueuePool) else 0
+    yield Metric("db_pool_size", "gauge", "Configured connections per worker pool").add(
+        size, engine=name
+    )
+    yield Metric("db_pool_in_use", "gauge", "Connections currently checked out").add(
+        stats.in_use, engine=name
+    )
+    yield Metric(
+        "db_pool_waiting", "gauge", "Checkouts currently waiting for a connection"
+    ).add(stats.waiting, engine=name)
+    yield Metric(
+        "db_pool_checkout_wait_max_seconds",
+        "gauge",
+        "Longest time a checkout waited for a connection",
+    ).add(stats.max_wait_seconds, engine=name)
+    yield Metric(
+        "db_pool_checkout_wait_seconds_total",
+        "counter",
+        "Time spent waiting for a connection",
+    ).add(stats.wait_seconds, engine=name)
+    yield Metric(
+        "db_pool_checkouts_total", "counter", "Connections handed out by the pool"
+    ).add(stats.checkouts, engine=name)
+    yield Metric(
+        "db_pool_checkout_timeouts_total",
+        "counter",
+        "Checkouts that gave up after DATABASE_POOL_TIMEOUT",
+    ).add(stats.timeouts, engine=name)
+
+
+def instrument_pool(engine: Engine, name: str) -> PoolStats:
+    """Tracks checkouts of `engine` and exposes them through the metrics registry"""
+    stats = PoolStats()
+    engine.pool.stats = stats  # type: ignore
+    event.listen(engine, "checkout", stats.checked_out)
+    event.listen(engine, "checkin", stats.checked_in)
+
+    registry.register(functools.partial(pool_metrics, engine, name, stats))
+    return stats
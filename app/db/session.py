@@ -1,8 +1,41 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncSession as _AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.db.pool import engine_options
+from app.db.pool import instrument_pool
+from app.settings.globals import DATABASE_ECHO
 from app.settings.globals import DATABASE_URL
 
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, echo=True)
-Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def async_database_url(url: str) -> str:
+    """Points a `postgresql://` URL at the asyncpg driver"""
+    return str(make_url(url).set(drivername="postgresql+asyncpg"))  # type: ignore
+
+
+engine = create_engine(DATABASE_URL, echo=DATABASE_ECHO, **engine_options())
+# Writes get their server defaults back with RETURNING, so there is nothing to
+# reload after a commit.
+Session = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+async_engine = create_async_engine(
+    async_database_url(DATABASE_URL),
+    echo=DATABASE_ECHO,
+    **engine_options(is_async=True),
+)
+# Objects handed back from `run_sync` are read outside of the greenlet, so they
+# must not expire on commit either or the next attribute access would hit the DB.
+AsyncSession = sessionmaker(
+    class_=_AsyncSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=async_engine,
+)
+
+instrument_pool(engine, "sync")
+instrument_pool(async_engine.sync_engine, "async")
@@ -1,14 +1,15 @@
 from app import server
-from app.application import app
-from app.routes import health, v1
+from app.application import app, preload
+from app.routes import health, metrics, v1
 
 
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(v1.get_router(), prefix="/v1")
 
 
 def run():
-    server.run(app)
+    server.run(app, preload=preload)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,90 @@
 import datetime
+import typing
 from typing import Optional
 
 from uuid import UUID
 
 from pydantic import BaseModel
 from pydantic import Field
+from pydantic.fields import SHAPE_LIST, SHAPE_SEQUENCE, SHAPE_SINGLETON
+
+
+class _FieldPlan(typing.NamedTuple):
+    name: str
+    alias: str
+    # Model of nested DTOs, None for plain values
+    model: typing.Optional[typing.Type[BaseModel]]
+    many: bool
+    default: object
+
+
+_field_plans: typing.Dict[typing.Type[BaseModel], typing.Tuple[_FieldPlan, ...]] = {}
+
+
+def _field_plan(model: typing.Type[BaseModel]) -> typing.Tuple[_FieldPlan, ...]:
+    """What `from_orm_trusted` and `to_jsonable` do with each field of `model`"""
+    cached = _field_plans.get(model)
+    if cached is not None:
+        return cached
+    plan = []
+    for field in model.__fields__.values():
+        nested = isinstance(field.type_, type) and issubclass(field.type_, BaseModel)
+        many = field.shape in (SHAPE_LIST, SHAPE_SEQUENCE)
+        plan.append(
+            _FieldPlan(
+                name=field.name,
+                alias=field.alias,
+                model=field.type_
+                if nested and (many or field.shape == SHAPE_SINGLETON)
+                else None,
+                many=many,
+                default=field.default,
+            )
+        )
+    _field_plans[model] = tuple(plan)
+    return _field_plans[model]
+
+
+M = typing.TypeVar("M", bound=BaseModel)
+
+
+def from_orm_trusted(model: typing.Type[M], obj: object) -> M:
+    """
+    `model.from_orm(obj)` without validation, for objects read from our own
+    tables: the attributes are copied as they are, nested DTOs included.
+    """
+    values = {}
+    for name, _, nested, many, default in _field_plan(model):
+        value = getattr(obj, name, default)
+        if nested is not None and value is not None:
+            if many:
+                value = [from_orm_trusted(nested, item) for item in value]
+            else:
+                value = from_orm_trusted(nested, value)
+        values[name] = value
+    # What `construct` does, without deep copying the defaults of every field
+    instance = typing.cast(M, object.__new__(model))
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__fields_set__", set(values))
+    return instance
+
+
+def to_jsonable(instance: BaseModel) -> typing.Dict[str, object]:
+    """
+    `instance.dict(by_alias=True)` through the field plan. UUIDs, datetimes and
+    such are left for the JSON encoder (orjson handles them).
+    """
+    data = {}
+    values = instance.__dict__
+    for name, alias, nested, many, default in _field_plan(type(instance)):
+        value = values.get(name, default)
+        if nested is not None and value is not None:
+            if many:
+                value = [to_jsonable(item) for item in value]
+            else:
+                value = to_jsonable(value)
+        data[alias] = value
+    return data
 
 
 class Base(BaseModel):
@@ -20,5 +100,9 @@ class Base(BaseModel):
     def from_dict(cls, kwargs) -> "Base":
         return cls(**kwargs)
 
+    @classmethod
+    def from_orm_trusted(cls, obj: object) -> "Base":
+        return from_orm_trusted(cls, obj)
+
     class Config:
         orm_mode = True
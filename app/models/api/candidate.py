@@ -1,9 +1,12 @@
-from typing import Optional
+import datetime
+from typing import Dict, List, Optional
+from uuid import UUID
 
 from pydantic import BaseModel
 
 from app.models.api.base import Base
 from app.models.api.base import Field
+from app.models.api.job import Job
 
 
 class CandidateBase(Base):
@@ -15,6 +18,9 @@ class CandidateBase(Base):
     email: str = Field(..., description="Candidate email")
     linkedin_url: str = Field(..., description="LinkedIn URL")
     avatar_path: Optional[str] = Field(..., description="Candidate avatar path")
+    avatar_variants: Optional[Dict[str, str]] = Field(
+        None, description="Paths of the resized avatars, by variant"
+    )
 
 
 class CandidateCreate(BaseModel):
@@ -33,3 +39,28 @@ class CandidateInDb(CandidateBase):
 
 class Candidate(CandidateInDb):
     pass
+
+
+class CandidateJob(BaseModel):
+    job: Job
+    created_at: datetime.datetime = Field(
+        ..., description="The datetime when the candidate was attached to the job"
+    )
+
+    class Config:
+        orm_mode = True
+
+
+class CandidateWithJobs(Candidate):
+    jobs: List[CandidateJob]
+
+
+class JobAttachment(BaseModel):
+    """A candidate attached to a job"""
+
+    candidate_id: UUID
+    job_id: UUID
+    created_at: datetime.datetime
+
+    class Config:
+        orm_mode = True
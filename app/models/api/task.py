@@ -0,0 +1,30 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.models.api.base import Base
+from app.models.api.base import Field
+
+
+class TaskCreate(BaseModel):
+    name: str = Field(..., description="Registered task to run")
+    payload: dict = Field({}, description="Arguments of the task")
+    priority: int = Field(0, description="Lower values run first")
+    max_attempts: int = Field(..., description="Runs before the task is failed")
+
+
+class TaskUpdate(BaseModel):
+    priority: Optional[int] = Field(None, description="Lower values run first")
+    run_at: Optional[datetime.datetime] = Field(None, description="Earliest run")
+
+
+class Task(Base):
+    name: str
+    payload: dict
+    priority: int
+    status: str
+    attempts: int
+    max_attempts: int
+    run_at: datetime.datetime
+    last_error: Optional[str]
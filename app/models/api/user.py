@@ -16,3 +16,11 @@ class UserCreate(UserBase):
 
 class UserUpdate(UserBase):
     pass
+
+
+class UserInDb(UserBase):
+    pass
+
+
+class User(UserInDb):
+    pass
@@ -1,3 +1,4 @@
+import enum
 import typing
 
 from pydantic import BaseModel
@@ -12,12 +13,23 @@ R = typing.TypeVar("R")
 class ListMeta(BaseModel):
     """Pagination details about the result set"""
 
-    total: int = Field(..., description="Total number of items in the result set")
-    total_pages: int = Field(..., description="Total number of pages in the result set")
+    total: typing.Optional[int] = Field(
+        None, description="Total number of items in the result set"
+    )
+    total_pages: typing.Optional[int] = Field(
+        None, description="Total number of pages in the result set"
+    )
+    total_exact: typing.Optional[bool] = Field(
+        None, description="Whether `total` is an exact count or a planner estimate"
+    )
     page_size: int = Field(..., description="Number of items per page")
-    page: int = Field(..., description="Page number to fetch")
+    page: typing.Optional[int] = Field(
+        None, description="Page number to fetch, only set when paginating by page"
+    )
     next_page: typing.Optional[int] = Field(None, description="Next page number")
     prev_page: typing.Optional[int] = Field(None, description="Previous page number")
+    next: typing.Optional[str] = Field(None, description="Cursor of the next page")
+    prev: typing.Optional[str] = Field(None, description="Cursor of the previous page")
 
 
 class List(GenericModel, typing.Generic[Item]):
@@ -37,3 +49,22 @@ class Detail(GenericModel, typing.Generic[Item]):
     """Response for returning a single item"""
 
     data: Item
+
+
+class BatchStatus(str, enum.Enum):
+    created = "created"
+    conflict = "conflict"
+
+
+class BatchItem(GenericModel, typing.Generic[Item]):
+    """Outcome for one item of a batch request"""
+
+    index: int = Field(..., description="Position of the item in the request")
+    status: BatchStatus
+    data: typing.Optional[Item] = Field(None, description="The stored item, if created")
+
+
+class Batch(GenericModel, typing.Generic[Item]):
+    """Response for batch requests, one entry per requested item"""
+
+    data: typing.List[BatchItem[Item]]
@@ -0,0 +1,13 @@
+from typing import Dict
+
+from pydantic import BaseModel, Field
+
+
+class PresignedUpload(BaseModel):
+    """Form to POST straight to the storage: `fields` first, then the `file`"""
+
+    url: str
+    # `fields` is taken by BaseModel
+    form_fields: Dict[str, str] = Field(..., alias="fields")
+    path: str
+    expires_in: int
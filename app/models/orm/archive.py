@@ -0,0 +1,31 @@
+import sqlalchemy as sa
+
+from app.models.orm.candidate import Candidate
+from app.models.orm.job import Job
+
+
+def archive_table(table: sa.Table) -> sa.Table:
+    """
+    Same columns as `table`, without its constraints, plus the time each row
+    was archived. Rows are moved in by `BaseRepository.remove_where(archive=True)`.
+    """
+    return sa.Table(
+        f"{table.name}_archive",
+        table.metadata,
+        *(
+            sa.Column(
+                column.name,
+                column.type,
+                primary_key=column.primary_key,
+                nullable=column.nullable,
+            )
+            for column in table.c
+        ),
+        sa.Column(
+            "archived_at", sa.DateTime, server_default=sa.func.now(), nullable=False
+        ),
+    )
+
+
+candidates_archive = archive_table(Candidate.__table__)
+jobs_archive = archive_table(Job.__table__)
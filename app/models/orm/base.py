@@ -3,6 +3,7 @@ import typing
 import sqlalchemy as sa
 
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.declarative import declared_attr
 
 from app.db.base_class import Base
 
@@ -12,6 +13,8 @@ M = typing.TypeVar("M", bound="ModelBase")
 
 class ModelBase(Base):
     __abstract__ = True
+    # Fetch server generated columns with RETURNING instead of a later SELECT
+    __mapper_args__ = {"eager_defaults": True}
     id = sa.Column(
         UUID(as_uuid=True),
         primary_key=True,
@@ -26,9 +29,15 @@ class ModelBase(Base):
         nullable=False,
     )
 
+    @declared_attr
+    def __table_args__(cls):  # pylint: disable=no-self-argument
+        # Keyset pagination seeks on (created_at, id)
+        return (sa.Index(f"ix_{cls.__tablename__}_created_at_id", "created_at", "id"),)
+
 
 class RelationBase(Base):
     __abstract__ = True
+    __mapper_args__ = {"eager_defaults": True}
 
     created_at = sa.Column(sa.DateTime, server_default=sa.func.now(), nullable=False)
     updated_at = sa.Column(
@@ -1,6 +1,6 @@
 import sqlalchemy as sa
 from sqlalchemy import ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
 from app.models.orm.base import ModelBase, RelationBase
@@ -10,9 +10,13 @@ class CandidateJobs(RelationBase):
     __tablename__ = "candidate_jobs"
 
     candidate_id = sa.Column(
-        UUID(as_uuid=True), ForeignKey("candidates.id"), primary_key=True
+        UUID(as_uuid=True),
+        ForeignKey("candidates.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    job_id = sa.Column(
+        UUID(as_uuid=True), ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True
     )
-    job_id = sa.Column(UUID(as_uuid=True), ForeignKey("jobs.id"), primary_key=True)
     candidate = relationship("Candidate", back_populates="jobs")
     job = relationship("Job", back_populates="candidates")  # type: ignore
 
@@ -24,6 +28,8 @@ class Candidate(ModelBase):
     email = sa.Column(sa.String(), unique=True, nullable=False)
     linkedin_url = sa.Column(sa.String(), unique=True, nullable=False)
     avatar_path = sa.Column(sa.String(), unique=True, nullable=True)
-    jobs = relationship(CandidateJobs, back_populates="candidate")
+    # Paths of the resized copies of the avatar, by variant name
+    avatar_variants = sa.Column(JSONB, nullable=True)
+    jobs = relationship(CandidateJobs, back_populates="candidate", passive_deletes=True)
     user_id = sa.Column(UUID(as_uuid=True), ForeignKey("users.id"))
     user = relationship("User", back_populates="candidates")  # type: ignore
@@ -10,4 +10,4 @@ class Job(ModelBase):
 
     title = sa.Column(sa.String(), unique=True, nullable=False)
     description = sa.Column(sa.String(), unique=True, nullable=False)
-    candidates = relationship(CandidateJobs, back_populates="job")
+    candidates = relationship(CandidateJobs, back_populates="job", passive_deletes=True)
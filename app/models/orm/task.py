@@ -0,0 +1,39 @@
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.models.orm.base import ModelBase
+
+
+class TaskStatus:
+    queued = "queued"
+    running = "running"
+    failed = "failed"
+
+
+class Task(ModelBase):
+    """Background work queued for the task workers, removed once done"""
+
+    __tablename__ = "tasks"
+    __table_args__ = (
+        sa.Index("ix_tasks_created_at_id", "created_at", "id"),
+        # What the workers claim next
+        sa.Index(
+            "ix_tasks_queued",
+            "priority",
+            "run_at",
+            postgresql_where=sa.text("status = 'queued'"),
+        ),
+    )
+
+    name = sa.Column(sa.String(), nullable=False)
+    payload = sa.Column(JSONB, nullable=False, server_default=sa.text("'{}'"))
+    # Lower values run first
+    priority = sa.Column(sa.Integer, nullable=False, server_default=sa.text("0"))
+    status = sa.Column(
+        sa.String(), nullable=False, server_default=sa.text(f"'{TaskStatus.queued}'")
+    )
+    attempts = sa.Column(sa.Integer, nullable=False, server_default=sa.text("0"))
+    max_attempts = sa.Column(sa.Integer, nullable=False)
+    run_at = sa.Column(sa.DateTime, nullable=False, server_default=sa.func.now())
+    locked_at = sa.Column(sa.DateTime, nullable=True)
+    last_error = sa.Column(sa.Text, nullable=True)
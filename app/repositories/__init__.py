@@ -1,3 +1,5 @@
 # type: ignore
 from .candidate import candidate_repo
 from .job import job_repo
+from .user import user_repo
+from .task import task_repo
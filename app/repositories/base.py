@@ -1,66 +1,412 @@
 # type: ignore
-from typing import TypeVar, Generic, Type, Optional, Any, List, Union, Dict
-from uuid import UUID
+from typing import (
+    TypeVar,
+    Generic,
+    Type,
+    Optional,
+    Any,
+    List,
+    Union,
+    Dict,
+    Iterator,
+    AsyncIterator,
+    Sequence,
+    Callable,
+    Tuple,
+)
+from uuid import UUID, uuid4
+
+import sqlalchemy as sa
 
-from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlalchemy.sql import ColumnElement
 
 from app.db.base_class import Base
+from app.db.copy import copy_rows
 from app.db.session import Session
+from app.repositories.cache import entity_cache
+from app.settings.globals import BULK_COPY_THRESHOLD, EXPORT_BATCH_SIZE
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# asyncpg refuses statements with more bind parameters than this
+MAX_BIND_PARAMS = 32767
+
 
 class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    # Named sets of loader options for the relationships a caller is about to
+    # read, e.g. {"with_jobs": (selectinload(Candidate.jobs),)}
+    profiles: Dict[str, Sequence[LoaderOption]] = {}
+
+    def __init__(
+        self,
+        model: Type[ModelType],
+        archive: Optional[sa.Table] = None,
+        schema: Optional[Type[BaseModel]] = None,
+        cache: bool = False,
+    ):
         """
         Base repository with default methods to Create, Read, Update, Delete (CRUD).
         **Parameters**
         * `model`: A SQLAlchemy model class
-        * `schema`: A Pydantic model (schema) class
+        * `archive`: Table where removed rows are moved when archiving
+        * `schema`: A Pydantic model (schema) class, for the snapshots of `find_cached`
+        * `cache`: Whether `find_cached` reads through the entity cache
         """
+        if cache and schema is None:
+            raise ValueError(
+                f"{model.__name__} snapshots can't be cached without a schema"
+            )
         self.model = model
+        self.archive = archive
+        self.schema = schema
+        self.cache = entity_cache(model.__tablename__, schema) if cache else None
+
+    def query(self, db: Session, profile: Optional[str] = None) -> Query:
+        """Query for the model, loading the relationships of the given `profile`"""
+        if profile is None:
+            return db.query(self.model)
+        try:
+            options = self.profiles[profile]
+        except KeyError:
+            raise ValueError(f"Unknown {self.model.__name__} profile: {profile}")
+        return db.query(self.model).options(*options)
+
+    def find(
+        self, db: Session, model_id: UUID, profile: Optional[str] = None
+    ) -> Optional[ModelType]:
+        return self.query(db, profile).filter(self.model.id == model_id).first()
+
+    def find_cached(
+        self, db: Session, model_id: UUID
+    ) -> Optional[Union[BaseModel, ModelType]]:
+        """
+        `schema` snapshot of the row `model_id`, from the entity cache when the
+        repository has one. Snapshots aren't attached to the session. Without a
+        `schema` this is `find`.
+        """
+        if self.cache is not None:
+            snapshot = self.cache.get(model_id)
+            if snapshot is not None:
+                return snapshot
+        db_obj = self.find(db=db, model_id=model_id)
+        if db_obj is None or self.schema is None:
+            return db_obj
+        return self._cache_snapshot(db_obj, overwrite=False)
 
-    def find(self, db: Session, model_id: UUID) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == model_id).first()
+    def _cache_snapshot(self, db_obj: ModelType, overwrite: bool = True) -> BaseModel:
+        snapshot = self.schema.from_orm(db_obj)
+        if self.cache is not None and overwrite:
+            self.cache.set(db_obj.id, snapshot)
+        elif self.cache is not None:
+            # Read through: a concurrent update may have stored a newer snapshot
+            self.cache.add(db_obj.id, snapshot)
+        return snapshot
+
+    def _cache_invalidate(self, ids: Sequence[UUID]) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(*ids)
 
     def find_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        profile: Optional[str] = None,
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return self.query(db, profile).offset(skip).limit(limit).all()
+
+    def find_rows(
+        self,
+        db: Session,
+        *criteria: ColumnElement,
+        columns: Optional[Sequence[str]] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Row]:
+        """
+        Matching rows with only the given `columns` (all of them by default), as
+        named tuples rather than ORM objects: nothing is hydrated into the session
+        or its identity map, which read only list endpoints don't need.
+        """
+        table = self.model.__table__
+        statement = (
+            select(*(table.c[name] for name in columns) if columns else table.c)
+            .where(*criteria)
+            .offset(skip)
+            .limit(limit)
+        )
+        return db.execute(statement).all()
 
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)  # type: ignore
+    def version(self, db: Session, *criteria: ColumnElement) -> Tuple[Any, int]:
+        """
+        Latest `updated_at` and count of the matching rows, which change whenever
+        one of them is inserted, updated or deleted
+        """
+        table = self.model.__table__
+        statement = select(sa.func.max(table.c.updated_at), sa.func.count()).where(
+            *criteria
+        )
+        if not criteria:
+            statement = statement.select_from(table)
+        return tuple(db.execute(statement).one())
+
+    def stream(
+        self,
+        db: Union[Session, AsyncSession],
+        *criteria: ColumnElement,
+        columns: Optional[Sequence[str]] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> Union[Iterator[List[Row]], AsyncIterator[List[Row]]]:
+        """
+        Reads matching rows through a server side cursor, `batch_size` rows at a
+        time, without loading them into the session. Yields lists of rows with the
+        given `columns` (all of them by default).
+        """
+        table = self.model.__table__
+        statement = (
+            select(*(table.c[name] for name in columns) if columns else table.c)
+            .where(*criteria)
+            .execution_options(stream_results=True, max_row_buffer=batch_size)
+        )
+        if isinstance(db, AsyncSession):
+            return self._astream(db, statement, batch_size)
+        return self._stream(db, statement, batch_size)
+
+    @staticmethod
+    def _stream(db: Session, statement, batch_size: int) -> Iterator[List[Row]]:
+        yield from db.execute(statement).partitions(batch_size)
+
+    @staticmethod
+    async def _astream(
+        db: AsyncSession, statement, batch_size: int
+    ) -> AsyncIterator[List[Row]]:
+        result = await db.stream(statement)
+        async for partition in result.partitions(batch_size):
+            yield partition
+
+    def create(
+        self,
+        db: Session,
+        *,
+        obj_in: CreateSchemaType,
+        values: Optional[Dict[str, Any]] = None,
+    ) -> ModelType:
+        db_obj = self.model(**obj_in.dict(), **(values or {}))  # type: ignore
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
+        if self.cache is not None:
+            self._cache_snapshot(db_obj)
         return db_obj
 
+    def create_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[CreateSchemaType],
+        values: Optional[Dict[str, Any]] = None,
+        skip_conflicts: bool = False,
+    ) -> List[ModelType]:
+        """
+        Inserts every item of `objs_in` in one round trip with a multi-row
+        `INSERT ... RETURNING`, or with COPY past `BULK_COPY_THRESHOLD` items.
+        `values` are set on every row. With `skip_conflicts` the rows that violate
+        a unique constraint are left out of the result instead of failing the batch.
+        """
+        rows = self._rows(objs_in, values)
+        created = self._insert(
+            db,
+            rows,
+            on_conflict=(lambda stmt: stmt.on_conflict_do_nothing())
+            if skip_conflicts
+            else None,
+        )
+        db.commit()
+        return created
+
+    def upsert_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[CreateSchemaType],
+        index_elements: Sequence[str],
+        values: Optional[Dict[str, Any]] = None,
+    ) -> List[ModelType]:
+        """
+        Inserts `objs_in`, updating the other columns of the rows whose
+        `index_elements` (a unique constraint) already exist.
+        """
+        # Postgres can't update the same row twice in one statement, last one wins
+        rows = list(
+            {
+                tuple(row[column] for column in index_elements): row
+                for row in self._rows(objs_in, values)
+            }.values()
+        )
+
+        def on_conflict(statement: Insert) -> Insert:
+            set_ = {
+                column: statement.excluded[column]
+                for column in rows[0]
+                if column not in index_elements
+            }
+            if "updated_at" in self.model.__table__.c:
+                set_["updated_at"] = sa.func.now()
+            return statement.on_conflict_do_update(
+                index_elements=index_elements, set_=set_
+            )
+
+        upserted = self._insert(db, rows, on_conflict=on_conflict)
+        db.commit()
+        self._cache_invalidate([db_obj.id for db_obj in upserted])
+        return upserted
+
+    @staticmethod
+    def _rows(
+        objs_in: Sequence[BaseModel], values: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return [{**obj_in.dict(), **(values or {})} for obj_in in objs_in]
+
+    def _insert(
+        self,
+        db: Session,
+        rows: List[Dict[str, Any]],
+        on_conflict: Optional[Callable[[Insert], Insert]] = None,
+    ) -> List[ModelType]:
+        if not rows:
+            return []
+
+        table = self.model.__table__
+        columns = list(rows[0])
+        if len(rows) >= BULK_COPY_THRESHOLD:
+            # COPY into an unconstrained staging table, then let a single
+            # INSERT ... SELECT apply the constraints and ON CONFLICT handling.
+            staging = f"_bulk_{uuid4().hex}"
+            db.execute(
+                sa.text(
+                    f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                    f"SELECT {', '.join(columns)} FROM {table.name} WITH NO DATA"
+                )
+            )
+            copy_rows(db, staging, columns, rows)
+            source = select(*(sa.column(column) for column in columns)).select_from(
+                sa.table(staging)
+            )
+            statements = [insert(table).from_select(columns, source)]
+        else:
+            chunk_size = max(1, MAX_BIND_PARAMS // len(columns))
+            statements = [
+                insert(table).values(rows[start : start + chunk_size])
+                for start in range(0, len(rows), chunk_size)
+            ]
+
+        inserted = []
+        for statement in statements:
+            if on_conflict is not None:
+                statement = on_conflict(statement)
+            orm_statement = (
+                select(self.model)
+                .from_statement(statement.returning(*table.c))
+                .execution_options(populate_existing=True)
+            )
+            inserted.extend(db.execute(orm_statement).scalars())
+        return inserted
+
     def update(
         self,
         db: Session,
         *,
-        db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]],
-    ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
+        model_id: Optional[UUID] = None,
+        db_obj: Optional[ModelType] = None,
+    ) -> Optional[ModelType]:
+        """
+        Sets the fields of `obj_in` on the row `model_id` (or `db_obj`) with a
+        single `UPDATE ... RETURNING`, without loading the row first. Returns the
+        updated object, or None when there is no such row.
+        """
+        if model_id is None:
+            model_id = db_obj.id
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
+
+        table = self.model.__table__
+        statement = (
+            sa.update(table)
+            .where(table.c.id == model_id)
+            .values(
+                {key: value for key, value in update_data.items() if key in table.c}
+            )
+            .returning(*table.c)
+        )
+        db_obj = db.execute(
+            select(self.model)
+            .from_statement(statement)
+            .execution_options(populate_existing=True)
+        ).scalar()
         db.commit()
-        db.refresh(db_obj)
+        if db_obj is None:
+            self._cache_invalidate([model_id])
+        elif self.cache is not None:
+            self._cache_snapshot(db_obj)
         return db_obj
 
-    def remove(self, db: Session, *, model_id: int) -> ModelType:
-        obj = db.query(self.model).find(model_id)
-        db.delete(obj)
+    def remove(self, db: Session, *, model_id: UUID, archive: bool = False) -> bool:
+        """Deletes the row `model_id`, returning whether it existed"""
+        return bool(
+            self.remove_where(
+                db, self.model.__table__.c.id == model_id, archive=archive
+            )
+        )
+
+    def remove_many(
+        self, db: Session, ids: Sequence[UUID], *, archive: bool = False
+    ) -> List[UUID]:
+        """Deletes the rows in `ids`, returning the ids that existed"""
+        if not ids:
+            return []
+        return self.remove_where(
+            db, self.model.__table__.c.id.in_(ids), archive=archive
+        )
+
+    def remove_where(
+        self, db: Session, *criteria: ColumnElement, archive: bool = False
+    ) -> List[UUID]:
+        """
+        Deletes every row matching `criteria` with one `DELETE ... RETURNING id`,
+        without loading them. With `archive` the deleted rows are copied to the
+        archive table in the same statement.
+
+        Objects already loaded in the session are not expired.
+        """
+        table = self.model.__table__
+        statement = sa.delete(table).where(*criteria)
+        if archive:
+            if self.archive is None:
+                raise ValueError(f"{table.name} has no archive table")
+            deleted = statement.returning(*table.c).cte("deleted")
+            columns = [column.name for column in table.c]
+            statement = (
+                self.archive.insert()
+                .add_cte(deleted)
+                .from_select(columns, select(*(deleted.c[name] for name in columns)))
+                .returning(self.archive.c.id)
+            )
+        else:
+            statement = statement.returning(table.c.id)
+
+        ids = db.execute(statement).scalars().all()
         db.commit()
-        return obj
+        self._cache_invalidate(ids)
+        return ids
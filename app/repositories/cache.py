@@ -0,0 +1,107 @@
+import logging
+import threading
+import typing
+
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from app.settings.globals import (
+    CACHE_BACKEND,
+    ENTITY_CACHE_SIZE,
+    ENTITY_CACHE_TTL,
+    REDIS_URL,
+)
+from app.utils.cache import CacheBackend, create_backend
+from app.utils.metrics import Metric, registry
+
+
+logger = logging.getLogger(__name__)
+
+SchemaType = typing.TypeVar("SchemaType", bound=BaseModel)
+
+# Left by `invalidate` until the entry expires, snapshots are never empty
+_TOMBSTONE = b""
+
+
+class EntityCache(typing.Generic[SchemaType]):
+    """
+    Serialized `schema` snapshots of the rows of one model, by id. Snapshots are
+    stored on create and update and dropped on remove by `BaseRepository`, and
+    expire after `ttl` seconds in any case. Reads only `add` the snapshot they
+    loaded, so they never replace one written by a concurrent update, and
+    `invalidate` leaves a tombstone rather than deleting the entry, so a read
+    racing a remove can't store the snapshot of the removed row again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        schema: typing.Type[SchemaType],
+        backend: CacheBackend,
+        ttl: float,
+    ):
+        self.name = name
+        self.schema = schema
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _key(self, model_id: UUID) -> str:
+        return f"entity:{self.name}:{model_id}"
+
+    def get(self, model_id: UUID) -> typing.Optional[SchemaType]:
+        raw = self.backend.get(self._key(model_id))
+        with self._lock:
+            if not raw:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return self.schema.parse_raw(raw) if raw else None
+
+    def set(self, model_id: UUID, snapshot: SchemaType) -> None:
+        self.backend.set(self._key(model_id), snapshot.json().encode(), ttl=self.ttl)
+
+    def add(self, model_id: UUID, snapshot: SchemaType) -> bool:
+        return self.backend.add(
+            self._key(model_id), snapshot.json().encode(), ttl=self.ttl
+        )
+
+    def invalidate(self, *ids: UUID) -> None:
+        for model_id in ids:
+            self.backend.set(self._key(model_id), _TOMBSTONE, ttl=self.ttl)
+
+    def collect(self) -> typing.Iterable[Metric]:
+        yield Metric(
+            "entity_cache_hits_total", "counter", "Entity cache lookups found"
+        ).add(self.hits, model=self.name)
+        yield Metric(
+            "entity_cache_misses_total", "counter", "Entity cache lookups missed"
+        ).add(self.misses, model=self.name)
+
+
+def entity_cache(
+    name: str, schema: typing.Type[SchemaType]
+) -> typing.Optional[EntityCache[SchemaType]]:
+    """Cache for a repository opting in, unless it can't be kept consistent"""
+    if ENTITY_CACHE_TTL <= 0:
+        return None
+    if CACHE_BACKEND == "memory":
+        # Rows are also written by the other web workers and the task worker
+        logger.info("Not caching %s: the memory cache backend isn't shared", name)
+        return None
+    cache = EntityCache(
+        name,
+        schema,
+        create_backend(
+            CACHE_BACKEND,
+            maxsize=ENTITY_CACHE_SIZE,
+            ttl=ENTITY_CACHE_TTL,
+            url=REDIS_URL,
+        ),
+        ttl=ENTITY_CACHE_TTL,
+    )
+    registry.register(cache.collect)
+    return cache
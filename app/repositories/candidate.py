@@ -1,31 +1,42 @@
 # type: ignore
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
+from sqlalchemy.orm import selectinload
+
 from app.db.session import Session
+from app.models.api.candidate import Candidate as CandidateDto
 from app.models.api.candidate import CandidateCreate, CandidateUpdate
-from app.models.orm.candidate import Candidate
+from app.models.orm.archive import candidates_archive
+from app.models.orm.candidate import Candidate, CandidateJobs
 from app.repositories.base import BaseRepository
 
 
 class CandidateRepository(BaseRepository[Candidate, CandidateCreate, CandidateUpdate]):
-    def find_by_user_id(self, user_id: UUID, db: Session) -> List[Candidate]:
-        return db.query(self.model).filter(Candidate.user_id == user_id).all()
+    profiles = {
+        "with_jobs": (selectinload(Candidate.jobs).joinedload(CandidateJobs.job),),
+    }
+
+    def find_by_user_id(
+        self, user_id: UUID, db: Session, profile: Optional[str] = None
+    ) -> List[Candidate]:
+        return self.query(db, profile).filter(Candidate.user_id == user_id).all()
+
+    def find_for_user(
+        self, model_id: UUID, user_id: UUID, db: Session, profile: Optional[str] = None
+    ) -> Optional[Candidate]:
+        return (
+            self.query(db, profile)
+            .filter(Candidate.id == model_id, Candidate.user_id == user_id)
+            .first()
+        )
 
     def create_by_user_id(
         self, user_id: UUID, obj_in: CandidateCreate, db: Session
     ) -> Candidate:
-        db_candidate = self.model(
-            name=obj_in.name,
-            email=obj_in.email,
-            linkedin_url=obj_in.linkedin_url,
-            user_id=user_id,
-        )
-
-        db.add(db_candidate)
-        db.commit()
-        db.refresh(db_candidate)
-        return db_candidate
+        return self.create(db=db, obj_in=obj_in, values={"user_id": user_id})
 
 
-candidate_repo = CandidateRepository(Candidate)
+candidate_repo = CandidateRepository(
+    Candidate, archive=candidates_archive, schema=CandidateDto, cache=True
+)
@@ -1,27 +1,81 @@
 # type: ignore
+from typing import List, Sequence
 from uuid import UUID
 
+import sqlalchemy as sa
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import selectinload
+
 from app.db.session import Session
 from app.models.api.job import JobCreate, JobUpdate
+from app.models.orm.archive import jobs_archive
 from app.models.orm.candidate import Candidate, CandidateJobs
 from app.models.orm.job import Job
 from app.repositories.base import BaseRepository
 
 
 class JobRepository(BaseRepository[Job, JobCreate, JobUpdate]):
+    profiles = {
+        "with_candidates": (
+            selectinload(Job.candidates).joinedload(CandidateJobs.candidate),
+        ),
+    }
+
     def attach_job_to_candidate(
         self, candidate: Candidate, job_id: UUID, db: Session
-    ) -> Job:
-        db_job = self.find(db=db, model_id=job_id)
+    ) -> List[Row]:
+        return self.attach(db, candidate_ids=[candidate.id], job_ids=[job_id])
+
+    def attach(
+        self, db: Session, *, candidate_ids: Sequence[UUID], job_ids: Sequence[UUID]
+    ) -> List[Row]:
+        """
+        Attaches every candidate in `candidate_ids` to every job in `job_ids` with
+        one `INSERT ... ON CONFLICT DO NOTHING`, without loading either side.
+        Unknown ids are ignored. Returns the newly attached pairs.
+        """
+        if not candidate_ids or not job_ids:
+            return []
+
+        candidates = Candidate.__table__
+        jobs = Job.__table__
+        candidate_jobs = CandidateJobs.__table__
+        pairs = (
+            sa.select(candidates.c.id, jobs.c.id)
+            .select_from(candidates.join(jobs, sa.true()))
+            .where(candidates.c.id.in_(candidate_ids), jobs.c.id.in_(job_ids))
+        )
+        statement = (
+            insert(candidate_jobs)
+            .from_select(["candidate_id", "job_id"], pairs)
+            .on_conflict_do_nothing()
+            .returning(*candidate_jobs.c)
+        )
+        attached = db.execute(statement).all()
+        db.commit()
+        return attached
 
-        db_candidates_jobs = CandidateJobs()
-        db_candidates_jobs.candidate = candidate
-        db_job.candidates.append(db_candidates_jobs)
+    def detach(
+        self, db: Session, *, candidate_ids: Sequence[UUID], job_ids: Sequence[UUID]
+    ) -> List[Row]:
+        """Detaches every candidate in `candidate_ids` from every job in `job_ids`"""
+        if not candidate_ids or not job_ids:
+            return []
 
-        db.add(db_job)
+        candidate_jobs = CandidateJobs.__table__
+        statement = (
+            sa.delete(candidate_jobs)
+            .where(
+                candidate_jobs.c.candidate_id.in_(candidate_ids),
+                candidate_jobs.c.job_id.in_(job_ids),
+            )
+            .returning(*candidate_jobs.c)
+        )
+        detached = db.execute(statement).all()
         db.commit()
-        db.refresh(db_job)
-        return db_job
+        return detached
 
 
-job_repo = JobRepository(Job)
+job_repo = JobRepository(Job, archive=jobs_archive)
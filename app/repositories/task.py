@@ -0,0 +1,156 @@
+# type: ignore
+import datetime
+from typing import Any, Dict, List, Mapping, Optional
+from uuid import UUID
+
+import sqlalchemy as sa
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.session import Session
+from app.models.api.task import TaskCreate, TaskUpdate
+from app.models.orm.task import Task, TaskStatus
+from app.repositories.base import BaseRepository
+
+
+class TaskRepository(BaseRepository[Task, TaskCreate, TaskUpdate]):
+    def enqueue(
+        self,
+        db: Session,
+        *,
+        name: str,
+        payload: Dict[str, Any],
+        max_attempts: int,
+        priority: int = 0,
+        delay: float = 0,
+    ) -> UUID:
+        """
+        Queues the task `name` without committing, so it's only run if the
+        caller's transaction commits
+        """
+        table = self.model.__table__
+        statement = insert(table).values(
+            name=name,
+            payload=payload,
+            priority=priority,
+            max_attempts=max_attempts,
+            run_at=sa.func.now() + datetime.timedelta(seconds=delay),
+        )
+        return db.execute(statement.returning(table.c.id)).scalar()
+
+    def claim(
+        self,
+        db: Session,
+        *,
+        limit: int,
+        lock_timeout: float,
+        caps: Optional[Mapping[str, int]] = None,
+    ) -> List[Task]:
+        """
+        Marks up to `limit` due tasks as running, and at most `caps[name]` of the
+        kinds in `caps`, skipping the ones other workers are claiming, and returns
+        them. Tasks running for longer than `lock_timeout` seconds are claimed
+        again, or failed once they have no attempts left.
+        """
+        table = self.model.__table__
+        now = sa.func.now()
+        stale = sa.and_(
+            table.c.status == TaskStatus.running,
+            table.c.locked_at < now - datetime.timedelta(seconds=lock_timeout),
+        )
+        db.execute(
+            sa.update(table)
+            .where(stale, table.c.attempts >= table.c.max_attempts)
+            .values(
+                status=TaskStatus.failed,
+                last_error=f"Still running after {lock_timeout} seconds",
+                locked_at=None,
+                updated_at=now,
+            )
+        )
+        due = sa.or_(
+            sa.and_(table.c.status == TaskStatus.queued, table.c.run_at <= now),
+            sa.and_(stale, table.c.attempts < table.c.max_attempts),
+        )
+
+        def claimable(criteria, count: int):
+            return (
+                select(table.c.id, table.c.priority, table.c.run_at)
+                .where(due, criteria)
+                .order_by(table.c.priority, table.c.run_at)
+                .limit(count)
+                .with_for_update(skip_locked=True)
+                .subquery()
+            )
+
+        caps = caps or {}
+        # One locking subquery per capped kind, the rest share the limit
+        branches = [
+            claimable(table.c.name.notin_(caps) if caps else sa.true(), limit),
+            *(
+                claimable(table.c.name == name, min(cap, limit))
+                for name, cap in caps.items()
+                if cap > 0
+            ),
+        ]
+        candidates = sa.union_all(*(select(*branch.c) for branch in branches))
+        candidates = candidates.subquery()
+        chosen = (
+            select(candidates.c.id)
+            .order_by(candidates.c.priority, candidates.c.run_at)
+            .limit(limit)
+        )
+        statement = (
+            sa.update(table)
+            .where(table.c.id.in_(chosen.scalar_subquery()))
+            .values(
+                status=TaskStatus.running,
+                attempts=table.c.attempts + 1,
+                locked_at=now,
+                updated_at=now,
+            )
+            .returning(*table.c)
+        )
+        tasks = (
+            db.execute(
+                select(self.model)
+                .from_statement(statement)
+                .execution_options(populate_existing=True)
+            )
+            .scalars()
+            .all()
+        )
+        db.commit()
+        return sorted(tasks, key=lambda task: (task.priority, task.run_at))
+
+    def complete(self, db: Session, *, task_id: UUID) -> None:
+        self.remove(db, model_id=task_id)
+
+    def fail(
+        self,
+        db: Session,
+        *,
+        task_id: UUID,
+        error: str,
+        retry_delay: Optional[float] = None,
+    ) -> None:
+        """Queues the task again after `retry_delay` seconds, or fails it for good"""
+        table = self.model.__table__
+        now = sa.func.now()
+        if retry_delay is None:
+            values = {"status": TaskStatus.failed}
+        else:
+            values = {
+                "status": TaskStatus.queued,
+                "run_at": now + datetime.timedelta(seconds=retry_delay),
+            }
+        db.execute(
+            sa.update(table)
+            .where(table.c.id == task_id)
+            .values(**values, last_error=error, locked_at=None, updated_at=now)
+        )
+        db.commit()
+
+
+task_repo = TaskRepository(Task)
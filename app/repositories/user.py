@@ -1,12 +1,39 @@
 # type: ignore
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.session import Session
 from app.models.api.user import UserCreate, UserUpdate
 from app.models.orm.user import User
 from app.repositories.base import BaseRepository
 
 
 class UserRepository(BaseRepository[User, UserCreate, UserUpdate]):
-    def update_user(self):
-        print("unimplemented yet")
+    def provision(
+        self, db: Session, *, user_id: UUID, username: str, email: str
+    ) -> Optional[User]:
+        """
+        The user `user_id`, created with `username` and `email` if missing. None
+        when another user already has that username or email.
+        """
+        user = self.find(db=db, model_id=user_id)
+        if user is not None:
+            return user
+
+        table = self.model.__table__
+        statement = (
+            insert(table)
+            .values(id=user_id, username=username, email=email)
+            .on_conflict_do_nothing()
+            .returning(*table.c)
+        )
+        user = db.execute(select(self.model).from_statement(statement)).scalar()
+        db.commit()
+        # Someone else provisioned it in the meantime
+        return user or self.find(db=db, model_id=user_id)
 
 
 user_repo = UserRepository(User)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from starlette.responses import PlainTextResponse
+
+from app.utils.metrics import registry
+
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    tags=["System"],
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+)
+def metrics():
+    """Per worker metrics in the Prometheus text format."""
+    return PlainTextResponse(registry.render())
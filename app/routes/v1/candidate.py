@@ -1,13 +1,23 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Body, UploadFile, File
+from fastapi import APIRouter, Depends, Body, UploadFile, File, Query
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
 
 from app.cross import security as api_security
-from app.cross.db import get_db
+from app.cross.cache import response_cache
+from app.cross.db import get_db, run_db
+from app.cross.responses import dto_response
 from app.db.session import Session
 from app.models.api.candidate import Candidate as CandidateSchema, CandidateCreate
+from app.models.api.candidate import CandidateWithJobs, JobAttachment
+from app.models.api.user import User
+from app.models.api.util.response import Batch
+from app.models.api.util.upload import PresignedUpload
 from app.services.api import candidate_service  # type: ignore
+from app.services.api.export import ExportFormat, export_response
+from app.services.api.fields import SparseFields
 
 
 router = APIRouter()
@@ -15,23 +25,103 @@ router = APIRouter()
 
 @router.get("/", response_model=List[CandidateSchema])
 async def get_candidates(
+    request: Request,
+    fields: Optional[List[str]] = Depends(SparseFields(CandidateSchema)),
     db: Session = Depends(get_db),  # type: ignore
-    user_id: str = Depends(api_security.get_auth_user_id),  # type: ignore
+    user: User = Depends(api_security.get_auth_user),  # type: ignore
 ):
-    """Return user loaded candidates"""
-    return candidate_service.get_user_candidates(user_id=user_id, db=db)
+    """
+    Return user loaded candidates, answering 304 while they didn't change.
+    `fields` limits the columns read and sent for each candidate.
+    """
+    return await response_cache.respond(
+        request,
+        "candidates",
+        version=lambda: run_db(db, candidate_service.version_for_user, user_id=user.id),
+        render=lambda: run_db(
+            db, candidate_service.get_user_candidates, user_id=user.id, fields=fields
+        ),
+        vary=user.id,
+    )
+
+
+@router.get("/with-jobs", response_model=List[CandidateWithJobs])
+async def get_candidates_with_jobs(
+    db: Session = Depends(get_db),  # type: ignore
+    user: User = Depends(api_security.get_auth_user),  # type: ignore
+):
+    """Return user loaded candidates along with the jobs they are attached to"""
+    return dto_response(
+        await run_db(
+            db,
+            candidate_service.get_user_candidates,
+            user_id=user.id,
+            profile="with_jobs",
+        )
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_candidates(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    db: Session = Depends(get_db),  # type: ignore
+    user: User = Depends(api_security.get_auth_user),  # type: ignore
+):
+    """Streams the user loaded candidates as NDJSON or CSV"""
+    return export_response(
+        candidate_service.export_user_candidates(
+            user_id=user.id, export_format=export_format, db=db
+        ),
+        export_format,
+        "candidates",
+    )
+
+
+@router.get("/{candidate_id}", response_model=CandidateWithJobs)
+async def get_candidate(
+    candidate_id: UUID,
+    db: Session = Depends(get_db),  # type: ignore
+    user: User = Depends(api_security.get_auth_user),  # type: ignore
+):
+    """Return a user loaded candidate along with the jobs they are attached to"""
+    return dto_response(
+        await run_db(
+            db,
+            candidate_service.get_user_candidate,
+            user_id=user.id,
+            candidate_id=candidate_id,
+            profile="with_jobs",
+        )
+    )
 
 
 @router.post("/", response_model=CandidateSchema)
 async def create_candidate(
     db: Session = Depends(get_db),  # type: ignore
-    user_id: str = Depends(api_security.get_auth_user_id),  # type: ignore
+    user: User = Depends(api_security.get_auth_user),  # type: ignore
     candidate: CandidateCreate = Body(..., embed=True),
 ):
     """
     Stores a new candidate
     """
-    return candidate_service.create(user_id=user_id, candidate=candidate, db=db)
+    return dto_response(
+        await run_db(db, candidate_service.create, user_id=user.id, candidate=candidate)
+    )
+
+
+@router.post("/batch", response_model=Batch[CandidateSchema])
+async def create_candidates(
+    db: Session = Depends(get_db),  # type: ignore
+    user: User = Depends(api_security.get_auth_user),  # type: ignore
+    candidates: List[CandidateCreate] = Body(..., embed=True),
+):
+    """
+    Stores many candidates at once, reporting for each one whether it was
+    created or conflicted with an existing candidate
+    """
+    return await run_db(
+        db, candidate_service.create_batch, user_id=user.id, candidates=candidates
+    )
 
 
 @router.post("/{candidate_id}/job/{job_id}", response_model=CandidateSchema)
@@ -41,16 +131,83 @@ async def attach_job_post(
     """
     Associates a candidate to a job post
     """
-    return candidate_service.add_job(candidate_id=candidate_id, job_id=job_id, db=db)
+    return await run_db(
+        db, candidate_service.add_job, candidate_id=candidate_id, job_id=job_id
+    )
+
+
+@router.post("/{candidate_id}/jobs", response_model=List[JobAttachment])
+async def attach_job_posts(
+    candidate_id: UUID,
+    job_ids: List[UUID] = Body(..., embed=True),
+    db: Session = Depends(get_db),  # type: ignore
+):
+    """
+    Associates a candidate to many job posts at once, returning the new associations
+    """
+    return await run_db(
+        db, candidate_service.attach_jobs, candidate_id=candidate_id, job_ids=job_ids
+    )
+
+
+@router.delete("/{candidate_id}/jobs", response_model=List[JobAttachment])
+async def detach_job_posts(
+    candidate_id: UUID,
+    job_ids: List[UUID] = Query(..., alias="job_id"),
+    db: Session = Depends(get_db),  # type: ignore
+):
+    """
+    Removes the associations of a candidate to the given job posts
+    """
+    return await run_db(
+        db, candidate_service.detach_jobs, candidate_id=candidate_id, job_ids=job_ids
+    )
 
 
 @router.post("/{candidate_id}/avatar/", response_model=str)
 async def set_candidate_avatar(
-    candidate_id: UUID, file: UploadFile = File(...), db: Session = Depends(get_db),  # type: ignore
+    candidate_id: UUID,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),  # type: ignore
 ):
     """
-    Uploads the candidate's avatar image and saves the path.
+    Uploads the candidate's avatar image and saves the path. The resized
+    variants are made by a background task.
     """
-    return candidate_service.set_candidate_avatar(
+    return await candidate_service.set_candidate_avatar(
         candidate_id=candidate_id, file=file, db=db
     )
+
+
+@router.post("/{candidate_id}/avatar/upload", response_model=PresignedUpload)
+async def request_avatar_upload(
+    candidate_id: UUID,
+    content_type: str = Body("image/jpeg", embed=True),
+    db: Session = Depends(get_db),  # type: ignore
+):
+    """
+    Presigned form to upload the candidate's avatar straight to the storage.
+    POST `fields` plus the `file` to `url`, then confirm the upload.
+    """
+    return await run_db(
+        db,
+        candidate_service.request_avatar_upload,
+        candidate_id=candidate_id,
+        content_type=content_type,
+    )
+
+
+@router.post("/{candidate_id}/avatar/confirm", response_model=str)
+async def confirm_avatar_upload(
+    candidate_id: UUID,
+    path: str = Body(..., embed=True),
+    db: Session = Depends(get_db),  # type: ignore
+):
+    """
+    Checks the avatar uploaded through the presigned form to `path`, as
+    returned with the form, and saves it. The resized variants are made by a
+    background task.
+    """
+    return await candidate_service.confirm_avatar_upload(
+        candidate_id=candidate_id, file_name=path, db=db
+    )
@@ -1,20 +1,52 @@
-from typing import List
+from typing import List, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, Query
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
 
 from app.db.session import Session
+from app.models.api.candidate import JobAttachment
 from app.models.api.job import Job as JobSchema
 from app.models.api.job import JobCreate
+from app.models.api.util.response import Batch
 from app.services.api import job_service  # type: ignore
-from app.cross.db import get_db
+from app.services.api.export import ExportFormat, export_response
+from app.services.api.fields import SparseFields
+from app.cross.cache import response_cache
+from app.cross.db import get_db, run_db
+from app.cross.responses import dto_response
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[JobSchema])
-async def get_jobs(db: Session = Depends(get_db),):  # type: ignore
-    """Return Nexton job posts"""
-    return job_service.get_all(db=db)
+async def get_jobs(
+    request: Request,
+    fields: Optional[List[str]] = Depends(SparseFields(JobSchema)),
+    db: Session = Depends(get_db),  # type: ignore
+):
+    """
+    Return Nexton job posts, answering 304 while they didn't change. `fields`
+    limits the columns read and sent for each job post.
+    """
+    return await response_cache.respond(
+        request,
+        "jobs",
+        version=lambda: run_db(db, job_service.version),
+        render=lambda: run_db(db, job_service.get_all, fields=fields),
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_jobs(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    db: Session = Depends(get_db),  # type: ignore
+):
+    """Streams every job post as NDJSON or CSV"""
+    return export_response(
+        job_service.export(export_format=export_format, db=db), export_format, "jobs",
+    )
 
 
 @router.post("/", response_model=JobSchema)
@@ -24,4 +56,43 @@ async def create_job(
     """
     Stores a new job post
     """
-    return job_service.create(db=db, job=job)
+    return dto_response(await run_db(db, job_service.create, job=job))
+
+
+@router.post("/batch", response_model=Batch[JobSchema])
+async def create_jobs(
+    jobs: List[JobCreate] = Body(..., embed=True), db: Session = Depends(get_db),  # type: ignore
+):
+    """
+    Stores many job posts at once, reporting for each one whether it was
+    created or conflicted with an existing job post
+    """
+    return await run_db(db, job_service.create_batch, jobs=jobs)
+
+
+@router.post("/{job_id}/candidates", response_model=List[JobAttachment])
+async def attach_candidates(
+    job_id: UUID,
+    candidate_ids: List[UUID] = Body(..., embed=True),
+    db: Session = Depends(get_db),  # type: ignore
+):
+    """
+    Associates many candidates to a job post at once, returning the new associations
+    """
+    return await run_db(
+        db, job_service.attach_candidates, job_id=job_id, candidate_ids=candidate_ids
+    )
+
+
+@router.delete("/{job_id}/candidates", response_model=List[JobAttachment])
+async def detach_candidates(
+    job_id: UUID,
+    candidate_ids: List[UUID] = Query(..., alias="candidate_id"),
+    db: Session = Depends(get_db),  # type: ignore
+):
+    """
+    Removes the associations of the given candidates to a job post
+    """
+    return await run_db(
+        db, job_service.detach_candidates, job_id=job_id, candidate_ids=candidate_ids
+    )
@@ -1,5 +1,8 @@
-import multiprocessing
+import asyncio
+import logging
 import os
+import random
+import signal
 import typing
 
 import gunicorn.app.base
@@ -7,9 +10,23 @@ import uvicorn.workers
 
 from starlette.applications import Starlette
 
+from app.db.session import async_engine, engine
+from app.settings.globals import (
+    WEB_CONCURRENCY,
+    WEB_GRACEFUL_TIMEOUT,
+    WEB_MAX_REQUESTS,
+    WEB_MAX_REQUESTS_JITTER,
+    WEB_MAX_RSS_MB,
+    WEB_PRELOAD,
+    WEB_TIMEOUT,
+)
+from app.utils.process import rss_bytes
+
+logger = logging.getLogger(__name__)
+
 
 def number_of_workers() -> int:
-    return multiprocessing.cpu_count() + 1
+    return WEB_CONCURRENCY
 
 
 class StandaloneApplication(gunicorn.app.base.BaseApplication):
@@ -36,20 +53,82 @@ class StandaloneApplication(gunicorn.app.base.BaseApplication):
 class LifespanUvicornWorker(uvicorn.workers.UvicornWorker):
     CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
 
-
-def run(app: Starlette, options: typing.Optional[dict] = None):
-    if options is None:
-        options = {}
-
-    default_options = {
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Somewhere in the top 10% of the limit, so workers growing alike
+        # aren't all replaced at once
+        self.max_rss = int(WEB_MAX_RSS_MB * 2 ** 20 * random.uniform(0.9, 1.0))
+        self.recycling = False
+
+    def run(self):
+        # Newer uvloop versions don't create a loop in `get_event_loop` anymore
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        super().run()
+
+    async def callback_notify(self):
+        await super().callback_notify()
+        self.check_memory()
+
+    def check_memory(self) -> None:
+        """Stops the worker gracefully once it's over `max_rss`, to be replaced"""
+        if not self.max_rss or self.recycling:
+            return
+        rss = rss_bytes()
+        if rss is not None and rss > self.max_rss:
+            logger.warning(
+                "Worker %s uses %.0fMB, over its %.0fMB limit: restarting it",
+                self.pid,
+                rss / 2 ** 20,
+                self.max_rss / 2 ** 20,
+            )
+            self.recycling = True
+            # Same as a graceful shutdown: in-flight requests are finished first
+            os.kill(self.pid, signal.SIGTERM)
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    """
+    Workers must never use database connections opened by the master, which
+    every other forked process shares. They start with empty pools instead,
+    leaving the master's connections for the master to close.
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+def default_options() -> typing.Dict[str, object]:
+    """gunicorn settings of `run`, from the WEB_* settings"""
+    return {
         "bind": "%s:%s" % ("0.0.0.0", os.environ.get("PORT", "8080")),
         "workers": number_of_workers(),
         "worker_class": "app.server.LifespanUvicornWorker",
-        "threads": 2,
+        "preload_app": WEB_PRELOAD,
+        "post_fork": post_fork,
+        "max_requests": WEB_MAX_REQUESTS,
+        "max_requests_jitter": WEB_MAX_REQUESTS_JITTER,
+        "graceful_timeout": WEB_GRACEFUL_TIMEOUT,
+        "timeout": WEB_TIMEOUT,
+        # Worker heartbeats on tmpfs, a disk backed /tmp can block them
+        "worker_tmp_dir": "/dev/shm" if os.path.isdir("/dev/shm") else None,
         "capture_output": True,
     }
 
-    return StandaloneApplication(app, {**default_options, **options}).run()
+
+def run(
+    app: Starlette,
+    options: typing.Optional[dict] = None,
+    preload: typing.Optional[typing.Callable[[], None]] = None,
+):
+    """
+    Serves `app` with gunicorn and uvicorn workers. With WEB_PRELOAD, `preload`
+    runs once in the master before it forks them, and they inherit its result.
+    """
+    if options is None:
+        options = {}
+    if WEB_PRELOAD and preload is not None:
+        preload()
+
+    return StandaloneApplication(app, {**default_options(), **options}).run()
 
 
 def debug(app: Starlette):
@@ -1,3 +1,4 @@
 # type: ignore
 from .candidate import candidate_service
 from .job import job_service
+from .user import user_service
@@ -0,0 +1,48 @@
+import typing
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from starlette.status import HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+from app.db.base_class import Base
+from app.models.api.util.response import Batch, BatchItem, BatchStatus
+from app.settings.globals import BATCH_MAX_ITEMS
+
+
+def check_batch_size(items: typing.Sized) -> None:
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batches are limited to {BATCH_MAX_ITEMS} items",
+        )
+
+
+def batch_result(
+    items_in: typing.Sequence[BaseModel],
+    stored: typing.Iterable[Base],
+    keys: typing.Sequence[str],
+    schema: typing.Type[BaseModel],
+) -> Batch:
+    """
+    Matches the rows returned by a bulk insert to the requested items through
+    all of their unique `keys`, so an item skipped on one of them never takes the
+    row of another item. Items without a row, or repeating the keys of an earlier
+    item, are reported as conflicts.
+    """
+    stored_by_key = {
+        tuple(getattr(db_obj, key) for key in keys): db_obj for db_obj in stored
+    }
+    items: typing.List[BatchItem] = []
+    for index, item in enumerate(items_in):
+        db_obj = stored_by_key.pop(tuple(getattr(item, key) for key in keys), None)
+        if db_obj is None:
+            items.append(BatchItem(index=index, status=BatchStatus.conflict))
+        else:
+            items.append(
+                BatchItem(
+                    index=index,
+                    status=BatchStatus.created,
+                    data=schema.from_orm(db_obj),
+                )
+            )
+    return Batch(data=items)
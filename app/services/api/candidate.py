@@ -1,20 +1,50 @@
 # type: ignore
-from typing import List
-from uuid import UUID
+import asyncio
+import io
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile
+from starlette.status import (
+    HTTP_404_NOT_FOUND,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
 
+from app.cross.cache import response_cache
+from app.cross.db import db_scope, release_db, run_db
 from app.db.session import Session
-from app.models.api.candidate import Candidate as CandidateDto, CandidateUpdate
-from app.models.api.candidate import CandidateCreate
+from app.models.api.candidate import Candidate as CandidateDto
+from app.models.api.candidate import CandidateCreate, CandidateWithJobs
+from app.models.api.candidate import JobAttachment
 from app.models.orm.candidate import Candidate
+from app.models.orm.job import Job
 from app.repositories import candidate_repo, job_repo
-from app.settings.globals import AWS_IMG_BUCKET, CANDIDATE_AVATAR_PATH
-from app.utils.file_management import file_management
+from app.repositories.exceptions import RecordNotFound
+from app.models.api.util.response import Batch
+from app.models.api.util.upload import PresignedUpload
+from app.services.api.batch import batch_result, check_batch_size
+from app.services.api.export import Chunks, ExportFormat, encode_rows, encoder_for
+from app.services.api.fields import from_rows
+from app.settings.globals import (
+    AVATAR_MAX_BYTES,
+    AWS_IMG_BUCKET,
+    CANDIDATE_AVATAR_PATH,
+    CANDIDATE_AVATAR_UPLOAD_PATH,
+    CANDIDATE_AVATAR_VARIANT_PATH,
+    IMAGE_WORKERS,
+    UPLOAD_URL_EXPIRES_IN,
+)
+from app.tasks import enqueue, register
+from app.utils.file_management import FileTooLarge, file_management
+from app.utils.images import AVATAR_VARIANTS, render_variants_async
 
 
 class CandidateService:
     ALLOWED_AVATAR_TYPES = ["image/jpeg"]
+    # Response schema for the candidates loaded with each repository profile
+    PROFILE_SCHEMAS = {None: CandidateDto, "with_jobs": CandidateWithJobs}
 
     def create(
         self, user_id: UUID, candidate: CandidateCreate, db: Session
@@ -22,42 +52,281 @@ class CandidateService:
         candidate = candidate_repo.create_by_user_id(
             user_id=user_id, obj_in=candidate, db=db
         )
-        return CandidateDto.from_orm(candidate)
+        response_cache.invalidate("candidates")
+        return CandidateDto.from_orm_trusted(candidate)
 
-    def get_user_candidates(self, user_id: UUID, db: Session) -> List[CandidateDto]:
-        return candidate_repo.find_by_user_id(db=db, user_id=user_id)
+    def create_batch(
+        self, user_id: UUID, candidates: List[CandidateCreate], db: Session
+    ) -> Batch[CandidateDto]:
+        check_batch_size(candidates)
+        created = candidate_repo.create_many(
+            db=db, objs_in=candidates, values={"user_id": user_id}, skip_conflicts=True
+        )
+        response_cache.invalidate("candidates")
+        return batch_result(
+            candidates, created, ("email", "linkedin_url"), CandidateDto
+        )
+
+    def get(
+        self, candidate_id: UUID, db: Session, profile: Optional[str] = None
+    ) -> CandidateDto:
+        if profile is None:
+            candidate = candidate_repo.find_cached(db=db, model_id=candidate_id)
+        else:
+            candidate = candidate_repo.find(
+                db=db, model_id=candidate_id, profile=profile
+            )
+        if candidate is None:
+            raise RecordNotFound(Candidate, candidate_id)
+        if profile is None:
+            return candidate
+        return self.PROFILE_SCHEMAS[profile].from_orm_trusted(candidate)
+
+    def get_user_candidate(
+        self, user_id: UUID, candidate_id: UUID, db: Session, profile: str
+    ) -> CandidateDto:
+        """Candidates of other users are reported as not found"""
+        candidate = candidate_repo.find_for_user(
+            model_id=candidate_id, user_id=user_id, db=db, profile=profile
+        )
+        if candidate is None:
+            raise RecordNotFound(Candidate, candidate_id)
+        return self.PROFILE_SCHEMAS[profile].from_orm_trusted(candidate)
+
+    def version_for_user(self, user_id: UUID, db: Session) -> Tuple[Any, int]:
+        return candidate_repo.version(db, Candidate.user_id == user_id)
+
+    def get_user_candidates(
+        self,
+        user_id: UUID,
+        db: Session,
+        profile: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[CandidateDto]:
+        """
+        Without a profile only the columns of the DTO (or the requested `fields`)
+        are read, skipping the ORM
+        """
+        if profile is None:
+            rows = candidate_repo.find_rows(
+                db,
+                Candidate.user_id == user_id,
+                columns=fields or CandidateDto.__fields__,
+            )
+            return from_rows(CandidateDto, rows, fields)
+        candidates = candidate_repo.find_by_user_id(
+            db=db, user_id=user_id, profile=profile
+        )
+        schema = self.PROFILE_SCHEMAS[profile]
+        return [schema.from_orm_trusted(candidate) for candidate in candidates]
+
+    def export_user_candidates(
+        self, user_id: UUID, export_format: ExportFormat, db: Session
+    ) -> Chunks:
+        rows = candidate_repo.stream(
+            db, Candidate.user_id == user_id, columns=CandidateDto.__fields__
+        )
+        return encode_rows(rows, encoder_for(export_format, CandidateDto))
 
     def add_job(self, candidate_id: UUID, job_id: UUID, db: Session) -> CandidateDto:
-        candidate = candidate_repo.find(db=db, model_id=candidate_id)
-        job_repo.attach_job_to_candidate(candidate, job_id, db=db)
-        return CandidateDto.from_orm(candidate)
+        candidate = candidate_repo.find_cached(db=db, model_id=candidate_id)
+        if candidate is None:
+            raise RecordNotFound(Candidate, candidate_id)
+        attached = job_repo.attach_job_to_candidate(candidate, job_id, db=db)
+        # Nothing attached when the pair already exists, or when there is no such job
+        if not attached and job_repo.find(db=db, model_id=job_id) is None:
+            raise RecordNotFound(Job, job_id)
+        response_cache.invalidate("candidates")
+        return candidate
+
+    def attach_jobs(
+        self, candidate_id: UUID, job_ids: List[UUID], db: Session
+    ) -> List[JobAttachment]:
+        check_batch_size(job_ids)
+        attached = job_repo.attach(db=db, candidate_ids=[candidate_id], job_ids=job_ids)
+        response_cache.invalidate("candidates")
+        return [JobAttachment.from_orm(row) for row in attached]
 
-    def set_candidate_avatar(
+    def detach_jobs(
+        self, candidate_id: UUID, job_ids: List[UUID], db: Session
+    ) -> List[JobAttachment]:
+        check_batch_size(job_ids)
+        detached = job_repo.detach(db=db, candidate_ids=[candidate_id], job_ids=job_ids)
+        response_cache.invalidate("candidates")
+        return [JobAttachment.from_orm(row) for row in detached]
+
+    async def set_candidate_avatar(
         self, candidate_id: UUID, file: UploadFile, db: Session
     ) -> str:
-        candidate = candidate_repo.find(db=db, model_id=candidate_id)
-        if not candidate:
-            raise ValueError("Candidate does not exist")
+        """
+        Uploads the avatar off the event loop, without holding a connection, and
+        records its path once the upload succeeded.
+        """
+        file_name = await run_db(
+            db, self.check_avatar, candidate_id=candidate_id, file=file
+        )
+        await release_db(db)
+        try:
+            await file_management.upload_file_async(
+                file.file, file_name, AWS_IMG_BUCKET, max_bytes=AVATAR_MAX_BYTES
+            )
+        except FileTooLarge as exc:
+            raise HTTPException(
+                status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc)
+            )
 
+        return await run_db(
+            db, self.record_avatar, candidate_id=candidate_id, file_name=file_name
+        )
+
+    def check_avatar(self, candidate_id: UUID, file: UploadFile, db: Session) -> str:
+        """Validates an avatar upload, returning the path to store it at"""
         if not file or not file.filename or not file.file:
             raise ValueError("File must not be null")
-        if file.content_type not in self.ALLOWED_AVATAR_TYPES:
+        return self.avatar_path(candidate_id, file.content_type, db)
+
+    def avatar_path(self, candidate_id: UUID, content_type: str, db: Session) -> str:
+        candidate = candidate_repo.find_cached(db=db, model_id=candidate_id)
+        if not candidate:
+            raise ValueError("Candidate does not exist")
+        if content_type not in self.ALLOWED_AVATAR_TYPES:
             raise ValueError("File extension not allowed")
+        return self.generate_avatar_path(candidate)
+
+    def request_avatar_upload(
+        self, candidate_id: UUID, content_type: str, db: Session
+    ) -> PresignedUpload:
+        """
+        Presigned form to upload the avatar straight to the bucket, to be
+        followed by `confirm_avatar_upload` with its `path`. Every upload gets a
+        key of its own, so the recorded avatar is never overwritten before (or
+        without) being confirmed.
+        """
+        self.avatar_path(candidate_id, content_type, db)
+        file_name = CANDIDATE_AVATAR_UPLOAD_PATH.format(
+            candidate_id=candidate_id, upload_id=uuid4().hex
+        )
+        form = file_management.presigned_post(
+            file_name,
+            AWS_IMG_BUCKET,
+            content_type=content_type,
+            max_bytes=AVATAR_MAX_BYTES,
+            expires_in=UPLOAD_URL_EXPIRES_IN,
+        )
+        return PresignedUpload(
+            url=form["url"],
+            fields=form["fields"],
+            path=file_name,
+            expires_in=UPLOAD_URL_EXPIRES_IN,
+        )
+
+    async def confirm_avatar_upload(
+        self, candidate_id: UUID, file_name: str, db: Session
+    ) -> str:
+        """Records the avatar uploaded to `file_name` through a presigned form"""
+        candidate = await run_db(db, candidate_repo.find_cached, model_id=candidate_id)
+        if not candidate:
+            raise ValueError("Candidate does not exist")
+        if not self.is_avatar_upload_path(candidate_id, file_name):
+            raise HTTPException(
+                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Not an avatar upload of the candidate",
+            )
+        await release_db(db)
 
-        file_name = self.generate_avatar_path(candidate)
-        file_management.upload_file(file.file, file_name, AWS_IMG_BUCKET)
+        head = await file_management.head_file_async(file_name, AWS_IMG_BUCKET)
+        if head is None:
+            raise HTTPException(
+                status_code=HTTP_404_NOT_FOUND, detail="Avatar was not uploaded"
+            )
+        if (
+            head.get("ContentType") not in self.ALLOWED_AVATAR_TYPES
+            or head.get("ContentLength", 0) > AVATAR_MAX_BYTES
+        ):
+            raise HTTPException(
+                status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Uploaded avatar is not an allowed image",
+            )
+        return await run_db(
+            db, self.record_avatar, candidate_id=candidate_id, file_name=file_name
+        )
 
-        candidate_update = CandidateUpdate(
-            name=candidate.name,
-            email=candidate.email,
-            linkedin_url=candidate.linkedin_url,
-            avatar_path=file_name,
+    def record_avatar(self, candidate_id: UUID, file_name: str, db: Session) -> str:
+        """Saves the avatar path, queueing its processing in the same transaction"""
+        enqueue(db, "process_avatar", candidate_id=candidate_id, file_name=file_name)
+        # The variants of the previous avatar are outdated until it's processed
+        candidate_repo.update(
+            db=db,
+            model_id=candidate_id,
+            obj_in={"avatar_path": file_name, "avatar_variants": None},
         )
-        candidate_repo.update(db=db, db_obj=candidate, obj_in=candidate_update)
+        response_cache.invalidate("candidates")
         return file_name
 
-    def generate_avatar_path(self, candidate: Candidate) -> str:
+    async def process_avatar(self, candidate_id: UUID, file_name: str) -> None:
+        """
+        Task queued when an avatar is recorded: stores its resized variants and
+        records them on the candidate.
+        """
+        variants = await self.render_avatar_variants(candidate_id, file_name)
+        async with db_scope() as db:
+            await run_db(
+                db,
+                self.record_avatar_variants,
+                candidate_id=candidate_id,
+                variants=variants,
+            )
+
+    async def render_avatar_variants(
+        self, candidate_id: UUID, file_name: str
+    ) -> Dict[str, str]:
+        """
+        Resizes the avatar `file_name` in the image process pool and uploads the
+        variants next to it, returning their paths
+        """
+        original = await file_management.download_file_async(file_name, AWS_IMG_BUCKET)
+        rendered = await render_variants_async(original)
+        paths = {
+            name: CANDIDATE_AVATAR_VARIANT_PATH.format(
+                candidate_id=candidate_id,
+                variant=name,
+                extension=AVATAR_VARIANTS[name].extension,
+            )
+            for name in rendered
+        }
+        await asyncio.gather(
+            *(
+                file_management.upload_file_async(
+                    io.BytesIO(data),
+                    paths[name],
+                    AWS_IMG_BUCKET,
+                    content_type=AVATAR_VARIANTS[name].content_type,
+                )
+                for name, data in rendered.items()
+            )
+        )
+        return paths
+
+    def record_avatar_variants(
+        self, candidate_id: UUID, variants: Dict[str, str], db: Session
+    ) -> None:
+        candidate_repo.update(
+            db=db, model_id=candidate_id, obj_in={"avatar_variants": variants}
+        )
+        response_cache.invalidate("candidates")
+
+    def generate_avatar_path(self, candidate: CandidateDto) -> str:
         return CANDIDATE_AVATAR_PATH.format(candidate_id=candidate.id)
 
+    def is_avatar_upload_path(self, candidate_id: UUID, file_name: str) -> bool:
+        prefix = CANDIDATE_AVATAR_UPLOAD_PATH.format(
+            candidate_id=candidate_id, upload_id=""
+        )
+        return file_name.startswith(prefix) and bool(
+            re.fullmatch("[0-9a-f]{32}", file_name[len(prefix) :])
+        )
+
 
 candidate_service = CandidateService()
+
+register("process_avatar", candidate_service.process_avatar, concurrency=IMAGE_WORKERS)
@@ -0,0 +1,120 @@
+import collections.abc
+import csv
+import datetime
+import enum
+import io
+import typing
+
+from pydantic import BaseModel
+from sqlalchemy.engine import Row  # type: ignore
+from starlette.responses import StreamingResponse
+
+
+Rows = typing.Union[
+    typing.Iterator[typing.List[Row]], typing.AsyncIterator[typing.List[Row]]
+]
+Chunks = typing.Union[typing.Iterator[bytes], typing.AsyncIterator[bytes]]
+
+
+class ExportFormat(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return {"ndjson": "application/x-ndjson", "csv": "text/csv"}[self.value]
+
+
+class Encoder:
+    """Encodes rows one by one as `schema` objects, one chunk per batch of rows"""
+
+    def __init__(self, schema: typing.Type[BaseModel]):
+        self.schema = schema
+        self.fields = list(schema.__fields__)
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, row: Row) -> bytes:
+        raise NotImplementedError
+
+    def encode_batch(self, rows: typing.List[Row]) -> bytes:
+        return b"".join(self.encode(row) for row in rows)
+
+
+class NDJSONEncoder(Encoder):
+    def encode(self, row: Row) -> bytes:
+        # Rows come straight from the table, no need to validate them again.
+        # `_asdict` is public API, underscored only to avoid clashing with columns
+        values = row._asdict()  # pylint: disable=protected-access
+        return self.schema.construct(**values).json().encode() + b"\n"
+
+
+class CSVEncoder(Encoder):
+    def __init__(self, schema: typing.Type[BaseModel]):
+        super().__init__(schema)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _line(self, values: typing.Iterable[object]) -> bytes:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(values)
+        return self._buffer.getvalue().encode()
+
+    def header(self) -> bytes:
+        return self._line(self.fields)
+
+    def encode(self, row: Row) -> bytes:
+        return self._line(_csv_value(getattr(row, field)) for field in self.fields)
+
+
+def _csv_value(value: object) -> object:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def encoder_for(export_format: ExportFormat, schema: typing.Type[BaseModel]) -> Encoder:
+    if export_format == ExportFormat.csv:
+        return CSVEncoder(schema)
+    return NDJSONEncoder(schema)
+
+
+def encode_rows(rows: Rows, encoder: Encoder) -> Chunks:
+    """Lazily encodes the batches yielded by `BaseRepository.stream`"""
+    if isinstance(rows, collections.abc.AsyncIterator):
+        return _aencode(rows, encoder)
+    return _encode(rows, encoder)
+
+
+def _encode(
+    rows: typing.Iterator[typing.List[Row]], encoder: Encoder
+) -> typing.Iterator[bytes]:
+    header = encoder.header()
+    if header:
+        yield header
+    for batch in rows:
+        yield encoder.encode_batch(batch)
+
+
+async def _aencode(
+    rows: typing.AsyncIterator[typing.List[Row]], encoder: Encoder
+) -> typing.AsyncIterator[bytes]:
+    header = encoder.header()
+    if header:
+        yield header
+    async for batch in rows:
+        yield encoder.encode_batch(batch)
+
+
+def export_response(
+    chunks: Chunks, export_format: ExportFormat, name: str
+) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=export_format.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'
+        },
+    )
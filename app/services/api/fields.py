@@ -0,0 +1,63 @@
+import typing
+
+from fastapi import HTTPException
+from fastapi import Query
+from pydantic import BaseModel
+from sqlalchemy.engine import Row  # type: ignore
+
+from app.models.api.base import from_orm_trusted
+
+
+class SparseFields:
+    """
+    `?fields=name,email` dependency: the requested fields of `schema`, in the
+    order they were asked for, or None (every field) when there are none. Only
+    fields stored as columns, not nested DTOs, can be requested.
+    """
+
+    def __init__(self, schema: typing.Type[BaseModel]):
+        self.schema = schema
+        self.allowed = [
+            name
+            for name, field in schema.__fields__.items()
+            if not (
+                isinstance(field.type_, type) and issubclass(field.type_, BaseModel)
+            )
+        ]
+
+    def __call__(
+        self,
+        fields: typing.Optional[str] = Query(
+            None,
+            description="Comma separated fields to include in each item, "
+            "all of them by default",
+        ),
+    ) -> typing.Optional[typing.List[str]]:
+        if not fields:
+            return None
+        requested = list(
+            dict.fromkeys(name.strip() for name in fields.split(",") if name.strip())
+        )
+        unknown = [name for name in requested if name not in self.allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. "
+                f"Available fields: {', '.join(self.allowed)}",
+            )
+        return requested or None
+
+
+def from_rows(
+    schema: typing.Type[BaseModel],
+    rows: typing.Sequence[Row],
+    fields: typing.Optional[typing.Sequence[str]] = None,
+) -> typing.List[typing.Union[BaseModel, typing.Dict[str, object]]]:
+    """
+    DTOs for rows read from our own tables, without validating them again, or
+    plain dicts of the selected `fields` for sparse responses
+    """
+    if fields:
+        # Row's public dict accessor, named so it can't shadow a column
+        return [row._asdict() for row in rows]  # pylint: disable=protected-access
+    return [from_orm_trusted(schema, row) for row in rows]
@@ -1,19 +1,59 @@
 # type: ignore
-from typing import List
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
 
+from app.models.api.candidate import JobAttachment
 from app.models.api.job import Job as JobDto, JobCreate
 
+from app.cross.cache import response_cache
 from app.db.session import Session
 from app.repositories import job_repo
+from app.models.api.util.response import Batch
+from app.services.api.batch import batch_result, check_batch_size
+from app.services.api.export import Chunks, ExportFormat, encode_rows, encoder_for
+from app.services.api.fields import from_rows
 
 
 class JobService:
     def create(self, job: JobCreate, db: Session) -> JobDto:
         job = job_repo.create(db=db, obj_in=job)
-        return JobDto.from_orm(job)
+        response_cache.invalidate("jobs")
+        return JobDto.from_orm_trusted(job)
 
-    def get_all(self, db: Session) -> List[JobDto]:
-        return job_repo.find_multi(db=db)
+    def create_batch(self, jobs: List[JobCreate], db: Session) -> Batch[JobDto]:
+        check_batch_size(jobs)
+        created = job_repo.create_many(db=db, objs_in=jobs, skip_conflicts=True)
+        response_cache.invalidate("jobs")
+        return batch_result(jobs, created, ("title", "description"), JobDto)
+
+    def attach_candidates(
+        self, job_id: UUID, candidate_ids: List[UUID], db: Session
+    ) -> List[JobAttachment]:
+        check_batch_size(candidate_ids)
+        attached = job_repo.attach(db=db, candidate_ids=candidate_ids, job_ids=[job_id])
+        response_cache.invalidate("candidates")
+        return [JobAttachment.from_orm(row) for row in attached]
+
+    def detach_candidates(
+        self, job_id: UUID, candidate_ids: List[UUID], db: Session
+    ) -> List[JobAttachment]:
+        check_batch_size(candidate_ids)
+        detached = job_repo.detach(db=db, candidate_ids=candidate_ids, job_ids=[job_id])
+        response_cache.invalidate("candidates")
+        return [JobAttachment.from_orm(row) for row in detached]
+
+    def version(self, db: Session) -> Tuple[Any, int]:
+        return job_repo.version(db=db)
+
+    def get_all(
+        self, db: Session, fields: Optional[List[str]] = None, limit: int = 100
+    ) -> List[JobDto]:
+        rows = job_repo.find_rows(db, columns=fields or JobDto.__fields__, limit=limit)
+        return from_rows(JobDto, rows, fields)
+
+    def export(self, export_format: ExportFormat, db: Session) -> Chunks:
+        rows = job_repo.stream(db, columns=JobDto.__fields__)
+        return encode_rows(rows, encoder_for(export_format, JobDto))
 
 
 job_service = JobService()
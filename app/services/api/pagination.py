@@ -1,26 +1,120 @@
+import base64
+import binascii
+import datetime
+import enum
+import json
 import math
 import typing
+import uuid
 
+import sqlalchemy as sa
+
+from fastapi import HTTPException
 from fastapi import Query
 from pydantic import BaseModel
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm.query import Query as SAQuery
+from sqlalchemy.sql import Select
 
+from app.db.explain import estimate_rows
+from app.db.explain import estimate_table_rows
 from app.models.api.util.response import List
 from app.models.api.util.response import ListMeta
 from app.models.orm.base import ModelBase
+from app.settings.globals import PAGINATION_COUNT_CACHE_TTL
+from app.utils.cache import TTLCache
 
 
 T = typing.TypeVar("T", bound=ModelBase)
 
+# Exact totals keyed by (SQL, bound parameters) of the counted query
+exact_counts: TTLCache[typing.Tuple[str, str], int] = TTLCache(
+    maxsize=1024, ttl=PAGINATION_COUNT_CACHE_TTL
+)
+
+
+class PaginationMode(str, enum.Enum):
+    page = "page"
+    cursor = "cursor"
+
+
+class CountMode(str, enum.Enum):
+    exact = "exact"
+    estimated = "estimated"
+    none = "none"
+
+
+def _count_key(statement: Select) -> typing.Tuple[str, str]:
+    compiled = statement.compile(dialect=postgresql.dialect())
+    return str(compiled), repr(sorted(compiled.params.items()))
+
+
+def _unfiltered_table(statement: Select) -> typing.Optional[sa.Table]:
+    froms = statement.get_final_froms()  # type: ignore
+    if (
+        statement.whereclause is None  # type: ignore
+        and len(froms) == 1
+        and isinstance(froms[0], sa.Table)
+    ):
+        return froms[0]
+    return None
+
+
+class Cursor(typing.NamedTuple):
+    """Position in a result set ordered by (created_at, id)"""
+
+    created_at: datetime.datetime
+    id: uuid.UUID
+    before: bool = False
+
+    @classmethod
+    def from_row(cls, row: ModelBase, before: bool = False) -> "Cursor":
+        # The stubs type postgresql UUID columns as str
+        return cls(row.created_at, typing.cast(uuid.UUID, row.id), before)
+
+    def encode(self) -> str:
+        payload = [self.created_at.isoformat(), str(self.id), int(self.before)]
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    @classmethod
+    def decode(cls, value: str) -> "Cursor":
+        try:
+            created_at, model_id, before = json.loads(base64.urlsafe_b64decode(value))
+            return cls(
+                datetime.datetime.fromisoformat(created_at),
+                uuid.UUID(model_id),
+                bool(before),
+            )
+        except (binascii.Error, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
 
 class Paginate(BaseModel):
     page: int = Query(1, ge=1, description="Page number to fetch")
     page_size: int = Query(10, ge=1, le=1000, description="Number of items per page")
+    mode: PaginationMode = Query(
+        PaginationMode.page,
+        description="`cursor` seeks from the position in `cursor` instead of skipping "
+        "`(page - 1) * page_size` rows, so deep pages cost the same as the first one",
+    )
+    cursor: typing.Optional[str] = Query(
+        None, description="`meta.next` or `meta.prev` of a previous response"
+    )
+    count: typing.Optional[CountMode] = Query(
+        None,
+        description="How to compute `meta.total`: `exact` (cached briefly), "
+        "`estimated` from the query planner, or `none`. Defaults to `exact` when "
+        "paginating by page and `none` by cursor",
+    )
 
     @property
     def offset(self) -> int:
         return (self.page - 1) * self.page_size
 
+    @property
+    def by_cursor(self) -> bool:
+        return self.mode == PaginationMode.cursor or self.cursor is not None
+
     def total_pages(self, count) -> int:
         return math.ceil(count * 1.0 / self.page_size)
 
@@ -35,18 +129,111 @@ class Paginate(BaseModel):
             return None
         return self.page - 1
 
+    @property
+    def count_mode(self) -> CountMode:
+        if self.count is not None:
+            return self.count
+        return CountMode.none if self.by_cursor else CountMode.exact
+
+    def count_total(
+        self, scope: SAQuery
+    ) -> typing.Tuple[typing.Optional[int], typing.Optional[bool]]:
+        """Returns the total and whether it is exact, according to `count`"""
+        if self.count_mode == CountMode.none:
+            return None, None
+
+        statement = scope.order_by(None).statement
+        if self.count_mode == CountMode.exact:
+            key = _count_key(statement)
+            total = exact_counts.get(key)
+            if total is None:
+                total = scope.order_by(None).count()
+                exact_counts.set(key, total)
+            return total, True
+
+        table = _unfiltered_table(statement)
+        total = (
+            estimate_table_rows(scope.session, table.name)
+            if table is not None
+            else None
+        )
+        if total is None:
+            total = estimate_rows(scope.session, statement)
+        return total, False
+
     def __call__(self, scope: SAQuery) -> List[T]:
-        total = scope.count()
+        if self.by_cursor:
+            return self.seek(scope)
 
-        results = scope.limit(self.page_size).offset(self.offset).all()
+        total, total_exact = self.count_total(scope)
+
+        if total_exact:
+            results = scope.limit(self.page_size).offset(self.offset).all()
+            next_page = self.next_page(total)
+        else:
+            # Without an exact total, look one row ahead to know if there is more
+            results = scope.limit(self.page_size + 1).offset(self.offset).all()
+            next_page = self.page + 1 if len(results) > self.page_size else None
+            results = results[: self.page_size]
 
         meta = ListMeta(
             total=total,
-            total_pages=self.total_pages(total),
+            total_pages=self.total_pages(total) if total is not None else None,
+            total_exact=total_exact,
             page_size=self.page_size,
             page=self.page,
-            next_page=self.next_page(total),
+            next_page=next_page,
             prev_page=self.prev_page,
         )
 
         return List(data=results, meta=meta)
+
+    def seek(self, scope: SAQuery) -> List[T]:
+        """
+        Keyset pagination over (created_at, id). Fetches one extra row to know
+        whether there is another page in the direction of travel.
+        """
+        model = scope.column_descriptions[0]["entity"]
+        key = sa.tuple_(model.created_at, model.id)
+        cursor = Cursor.decode(self.cursor) if self.cursor else None
+        backwards = cursor is not None and cursor.before
+
+        total, total_exact = self.count_total(scope)
+
+        page = scope.order_by(None)
+        if cursor is not None:
+            position = sa.tuple_(
+                sa.literal(cursor.created_at, model.created_at.type),
+                sa.literal(cursor.id, model.id.type),
+            )
+            page = page.filter(key < position if backwards else key > position)
+        if backwards:
+            page = page.order_by(model.created_at.desc(), model.id.desc())
+        else:
+            page = page.order_by(model.created_at, model.id)
+
+        results = page.limit(self.page_size + 1).all()
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if backwards:
+            results.reverse()
+
+        has_next = has_more if not backwards else True
+        has_prev = has_more if backwards else cursor is not None
+
+        meta = ListMeta(
+            total=total,
+            total_pages=self.total_pages(total) if total is not None else None,
+            total_exact=total_exact,
+            page_size=self.page_size,
+            next=(
+                Cursor.from_row(results[-1]).encode() if results and has_next else None
+            ),
+            prev=(
+                Cursor.from_row(results[0], before=True).encode()
+                if results and has_prev
+                else None
+            ),
+        )
+
+        return List(data=results, meta=meta)
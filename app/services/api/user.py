@@ -0,0 +1,41 @@
+# type: ignore
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from starlette.status import HTTP_409_CONFLICT
+
+from app.db.session import Session
+from app.models.api.user import User as UserDto
+from app.repositories import user_repo
+from app.settings.globals import USER_CACHE_SIZE, USER_CACHE_TTL
+from app.utils.cache import TTLCache
+
+
+class UserService:
+    def __init__(self):
+        # Users seen by this process, so authenticated requests don't look them up
+        self.cache: TTLCache[UUID, UserDto] = TTLCache(
+            maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL
+        )
+
+    def cached(self, user_id: UUID) -> Optional[UserDto]:
+        return self.cache.get(user_id)
+
+    def provision(
+        self, user_id: UUID, username: str, email: str, db: Session
+    ) -> UserDto:
+        db_user = user_repo.provision(
+            db=db, user_id=user_id, username=username, email=email
+        )
+        if db_user is None:
+            raise HTTPException(
+                status_code=HTTP_409_CONFLICT,
+                detail="The username or email is already taken by another user",
+            )
+        user = UserDto.from_orm(db_user)
+        self.cache.set(user_id, user)
+        return user
+
+
+user_service = UserService()
@@ -1,8 +1,10 @@
 from pathlib import Path
+from typing import Optional
 
 from starlette.config import Config
 
 from app.utils import _TESTING
+from app.utils.process import available_cpus
 
 
 p: Path
@@ -18,7 +20,133 @@ else:
     config = Config()
 
 DATABASE_URL: str = config("DATABASE_URL", cast=str, default="postgresql://")
+# Serve requests through the asyncpg engine instead of the psycopg2 one
+DATABASE_ASYNC: bool = config("DATABASE_ASYNC", cast=bool, default=False)
+# Log every statement through `sqlalchemy.engine`, only meant for development
+DATABASE_ECHO: bool = config("DATABASE_ECHO", cast=bool, default=False)
+# Warn when a single request runs the same statement more than this many times
+SQL_REPEATED_STATEMENT_THRESHOLD: int = config(
+    "SQL_REPEATED_STATEMENT_THRESHOLD", cast=int, default=10
+)
+
+# Web server, see app/server.py
+# Import the app once in the master process, before forking the workers
+WEB_PRELOAD: bool = config("WEB_PRELOAD", cast=bool, default=True)
+# Workers are replaced after this many requests plus up to the jitter, so they
+# don't all restart at once. 0 never replaces them.
+WEB_MAX_REQUESTS: int = config("WEB_MAX_REQUESTS", cast=int, default=10000)
+WEB_MAX_REQUESTS_JITTER: int = config("WEB_MAX_REQUESTS_JITTER", cast=int, default=1000)
+# Workers are also replaced once their resident memory goes past 90-100% of
+# this many MB (it varies per worker). 0 doesn't check it.
+WEB_MAX_RSS_MB: int = config("WEB_MAX_RSS_MB", cast=int, default=0)
+# Seconds workers get to finish the requests in flight when stopping
+WEB_GRACEFUL_TIMEOUT: int = config("WEB_GRACEFUL_TIMEOUT", cast=int, default=30)
+# Seconds a worker can go without checking in before it's killed and replaced
+WEB_TIMEOUT: int = config("WEB_TIMEOUT", cast=int, default=30)
+
+# Connection pool. Every worker owns a pool, so unless DATABASE_POOL_SIZE is set
+# the pool size is derived from DATABASE_CONNECTION_BUDGET / WEB_CONCURRENCY.
+# Defaults to one worker per CPU the container may use, plus one.
+WEB_CONCURRENCY: int = config("WEB_CONCURRENCY", cast=int, default=available_cpus() + 1)
+DATABASE_CONNECTION_BUDGET: int = config(
+    "DATABASE_CONNECTION_BUDGET", cast=int, default=80
+)
+DATABASE_POOL_SIZE: Optional[int] = config("DATABASE_POOL_SIZE", cast=int, default=None)
+DATABASE_MAX_OVERFLOW: int = config("DATABASE_MAX_OVERFLOW", cast=int, default=0)
+DATABASE_POOL_TIMEOUT: float = config("DATABASE_POOL_TIMEOUT", cast=float, default=30)
+DATABASE_POOL_RECYCLE: int = config("DATABASE_POOL_RECYCLE", cast=int, default=1800)
+DATABASE_POOL_LIFO: bool = config("DATABASE_POOL_LIFO", cast=bool, default=True)
+# No pooling in the app at all, e.g. when PgBouncer already pools connections
+DATABASE_NULL_POOL: bool = config("DATABASE_NULL_POOL", cast=bool, default=False)
+# Don't cache prepared statements, required behind PgBouncer in transaction mode
+DATABASE_PGBOUNCER: bool = config("DATABASE_PGBOUNCER", cast=bool, default=False)
+
+# How long an exact `count=exact` pagination total is reused for the same query
+PAGINATION_COUNT_CACHE_TTL: float = config(
+    "PAGINATION_COUNT_CACHE_TTL", cast=float, default=30
+)
+# Rows fetched per round trip (and encoded per chunk) by the export endpoints
+EXPORT_BATCH_SIZE: int = config("EXPORT_BATCH_SIZE", cast=int, default=1000)
+# Backend of the response and entity caches: "memory" (per process) or "redis"
+CACHE_BACKEND: str = config("CACHE_BACKEND", cast=str, default="memory")
+REDIS_URL: str = config("REDIS_URL", cast=str, default="redis://localhost:6379/0")
+RESPONSE_CACHE_SIZE: int = config("RESPONSE_CACHE_SIZE", cast=int, default=1000)
+RESPONSE_CACHE_TTL: float = config("RESPONSE_CACHE_TTL", cast=float, default=300.0)
+# DTO snapshots kept by the repositories that opt in to entity caching. They need
+# the redis backend: with a per process one, the web workers wouldn't see what
+# the others and the task worker write, so with the default memory backend entity
+# caching is off (logged at startup). Redis evicts by its own maxmemory policy,
+# so ENTITY_CACHE_SIZE only bounds a memory backend and has no effect today.
+ENTITY_CACHE_SIZE: int = config("ENTITY_CACHE_SIZE", cast=int, default=10000)
+ENTITY_CACHE_TTL: float = config("ENTITY_CACHE_TTL", cast=float, default=60.0)
+# Bulk inserts of this many rows go through COPY instead of INSERT ... VALUES
+BULK_COPY_THRESHOLD: int = config("BULK_COPY_THRESHOLD", cast=int, default=1000)
+# Most items accepted by the batch endpoints in a single request
+BATCH_MAX_ITEMS: int = config("BATCH_MAX_ITEMS", cast=int, default=10000)
+
 COGNITO_POOL_ID: str = config("COGNITO_POOL_ID", cast=str, default="fake-pool-id")
 COGNITO_REGION: str = config("COGNITO_REGION", cast=str, default="us-west-2")
+JWKS_URL: str = config(
+    "JWKS_URL",
+    cast=str,
+    default=f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/"
+    f"{COGNITO_POOL_ID}/.well-known/jwks.json",
+)
+# Local JWKS document used instead of JWKS_URL, e.g. for tests or offline development
+JWKS_FILE: Optional[str] = config("JWKS_FILE", cast=str, default=None)
+JWKS_CACHE_TTL: float = config("JWKS_CACHE_TTL", cast=float, default=3600.0)
+# Least seconds between refetches triggered by tokens signed with an unknown key
+JWKS_MIN_REFRESH_INTERVAL: float = config(
+    "JWKS_MIN_REFRESH_INTERVAL", cast=float, default=60.0
+)
+JWKS_FETCH_TIMEOUT: float = config("JWKS_FETCH_TIMEOUT", cast=float, default=5.0)
+# Verified tokens are remembered until they expire, for at most JWT_CACHE_MAX_TTL
+JWT_CACHE_SIZE: int = config("JWT_CACHE_SIZE", cast=int, default=10000)
+JWT_CACHE_MAX_TTL: float = config("JWT_CACHE_MAX_TTL", cast=float, default=3600.0)
+# Authenticated users resolved by each process
+USER_CACHE_SIZE: int = config("USER_CACHE_SIZE", cast=int, default=10000)
+USER_CACHE_TTL: float = config("USER_CACHE_TTL", cast=float, default=300.0)
 CANDIDATE_AVATAR_PATH: str = "images/candidates/{candidate_id}/{candidate_id}_avatar"
+# Avatars uploaded through a presigned form, each to its own key
+CANDIDATE_AVATAR_UPLOAD_PATH: str = CANDIDATE_AVATAR_PATH + "_{upload_id}"
+# Resized copies of the avatar, stored next to it
+CANDIDATE_AVATAR_VARIANT_PATH: str = CANDIDATE_AVATAR_PATH + "_{variant}.{extension}"
 AWS_IMG_BUCKET: str = config("AWS_IMG_BUCKET", cast=str, default="fastapi-starter")
+# S3 compatible endpoint used instead of AWS, e.g. a local stand-in for development
+AWS_S3_ENDPOINT_URL: Optional[str] = config(
+    "AWS_S3_ENDPOINT_URL", cast=str, default=None
+)
+# Uploads run in their own thread pool, at most UPLOAD_WORKERS at a time per process
+UPLOAD_WORKERS: int = config("UPLOAD_WORKERS", cast=int, default=4)
+# Files bigger than this are sent as a multipart upload, in parts of this size
+UPLOAD_PART_SIZE: int = config("UPLOAD_PART_SIZE", cast=int, default=8 * 1024 * 1024)
+UPLOAD_PART_CONCURRENCY: int = config("UPLOAD_PART_CONCURRENCY", cast=int, default=2)
+AVATAR_MAX_BYTES: int = config("AVATAR_MAX_BYTES", cast=int, default=5 * 1024 * 1024)
+# Bodies over this are refused before they're read: an avatar plus its form fields
+REQUEST_MAX_BYTES: int = config(
+    "REQUEST_MAX_BYTES", cast=int, default=AVATAR_MAX_BYTES + 64 * 1024
+)
+# Seconds a presigned upload stays valid
+UPLOAD_URL_EXPIRES_IN: int = config("UPLOAD_URL_EXPIRES_IN", cast=int, default=300)
+# Processes resizing images, off the request path
+IMAGE_WORKERS: int = config("IMAGE_WORKERS", cast=int, default=2)
+# Background tasks, run by the `worker` process
+TASK_WORKER_CONCURRENCY: int = config("TASK_WORKER_CONCURRENCY", cast=int, default=4)
+TASK_POLL_INTERVAL: float = config("TASK_POLL_INTERVAL", cast=float, default=1.0)
+TASK_MAX_ATTEMPTS: int = config("TASK_MAX_ATTEMPTS", cast=int, default=5)
+# Failed attempts are retried after TASK_RETRY_DELAY seconds, doubled every time
+TASK_RETRY_DELAY: float = config("TASK_RETRY_DELAY", cast=float, default=5.0)
+TASK_RETRY_MAX_DELAY: float = config("TASK_RETRY_MAX_DELAY", cast=float, default=3600.0)
+# Running tasks not finished after this long are assumed lost and run again
+TASK_LOCK_TIMEOUT: float = config("TASK_LOCK_TIMEOUT", cast=float, default=600.0)
+# Render JSON with orjson (when installed) and send the DTOs of the routes that
+# opt in without validating them again against their response_model
+FAST_RESPONSES: bool = config("FAST_RESPONSES", cast=bool, default=False)
+# Responses are compressed from this many bytes, streamed ones always
+COMPRESSION_MIN_SIZE: int = config("COMPRESSION_MIN_SIZE", cast=int, default=1024)
+# 1 (fastest) to 9 (smallest)
+COMPRESSION_GZIP_LEVEL: int = config("COMPRESSION_GZIP_LEVEL", cast=int, default=6)
+# 0 (fastest) to 11 (smallest), past 5 or so it costs too much for dynamic content
+COMPRESSION_BROTLI_QUALITY: int = config(
+    "COMPRESSION_BROTLI_QUALITY", cast=int, default=4
+)
@@ -0,0 +1,85 @@
+"""
+Durable background tasks, queued in the `tasks` table and run by the worker
+process (`python -m app.tasks.worker`).
+
+    register("process_avatar", candidate_service.process_avatar)
+    enqueue(db, "process_avatar", candidate_id=..., file_name=...)
+
+`enqueue` doesn't commit, the task is queued with whatever else the caller's
+transaction writes.
+"""
+import asyncio
+import typing
+from uuid import UUID
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import validate_arguments
+
+from sqlalchemy.orm import Session
+
+from app.repositories import task_repo  # type: ignore
+from app.settings.globals import TASK_MAX_ATTEMPTS
+
+# Tasks are called with their JSON payload as keyword arguments, any signature
+TaskFunction = typing.Callable[..., object]  # type: ignore
+
+
+class TaskSpec(typing.NamedTuple):
+    name: str
+    fn: TaskFunction
+    is_async: bool
+    max_attempts: int
+    priority: int
+    # Most tasks of this kind each worker runs at once, no limit when None
+    concurrency: typing.Optional[int]
+
+
+registry: typing.Dict[str, TaskSpec] = {}
+
+
+def register(
+    name: str,
+    fn: TaskFunction,
+    *,
+    max_attempts: int = TASK_MAX_ATTEMPTS,
+    priority: int = 0,
+    concurrency: typing.Optional[int] = None,
+) -> TaskSpec:
+    """
+    Registers `fn` (sync or async) as the task `name`. Payloads are validated
+    against its annotations, e.g. UUIDs come back from JSON as UUIDs.
+    """
+    spec = TaskSpec(
+        name=name,
+        fn=validate_arguments(fn),
+        is_async=asyncio.iscoroutinefunction(fn),
+        max_attempts=max_attempts,
+        priority=priority,
+        concurrency=concurrency,
+    )
+    registry[name] = spec
+    return spec
+
+
+def enqueue(
+    db: Session,
+    name: str,
+    *,
+    priority: typing.Optional[int] = None,
+    delay: float = 0,
+    **payload: object,
+) -> UUID:
+    """Queues the task `name` in the session's transaction, after `delay` seconds"""
+    try:
+        spec = registry[name]
+    except KeyError:
+        raise ValueError(f"Unknown task: {name}")
+    task_id: UUID = task_repo.enqueue(
+        db,
+        name=name,
+        payload=jsonable_encoder(payload),
+        max_attempts=spec.max_attempts,
+        priority=spec.priority if priority is None else priority,
+        delay=delay,
+    )
+    return task_id
@@ -0,0 +1,198 @@
+"""
+Runs the queued background tasks:
+
+    python -m app.tasks.worker
+
+Workers claim due tasks with `SELECT ... FOR UPDATE SKIP LOCKED`, so any number
+of them can run side by side. Each one runs up to TASK_WORKER_CONCURRENCY tasks
+at a time, fewer for tasks registered with their own `concurrency`.
+"""
+import asyncio
+import collections
+import contextlib
+import logging
+import random
+import signal
+import typing
+
+from starlette.concurrency import run_in_threadpool
+
+from app.cross.db import db_scope, run_db
+from app.models.orm.task import Task
+from app.repositories import task_repo  # type: ignore
+from app.settings.globals import (
+    TASK_LOCK_TIMEOUT,
+    TASK_POLL_INTERVAL,
+    TASK_RETRY_DELAY,
+    TASK_RETRY_MAX_DELAY,
+    TASK_WORKER_CONCURRENCY,
+)
+from app.tasks import TaskSpec, registry
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff, with some jitter so failed tasks don't retry in sync"""
+    delay = min(TASK_RETRY_MAX_DELAY, TASK_RETRY_DELAY * 2.0 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class Worker:
+    def __init__(
+        self,
+        concurrency: int = TASK_WORKER_CONCURRENCY,
+        poll_interval: float = TASK_POLL_INTERVAL,
+        lock_timeout: float = TASK_LOCK_TIMEOUT,
+        session_scope: typing.Callable[
+            [], typing.AsyncContextManager
+        ] = db_scope,  # type: ignore
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.session_scope = session_scope
+        self.inflight: typing.Set[asyncio.Future] = set()
+        # Claimed tasks of each kind, running or waiting for their limit
+        self.claimed: typing.Counter[str] = collections.Counter()
+        self._limits: typing.Dict[str, asyncio.Semaphore] = {}
+        self._stopping: typing.Optional[asyncio.Event] = None
+
+    def _free_slots(self) -> typing.Dict[str, int]:
+        """How many more tasks of each kind with a `concurrency` can be claimed"""
+        return {
+            spec.name: max(0, spec.concurrency - self.claimed[spec.name])
+            for spec in registry.values()
+            if spec.concurrency is not None
+        }
+
+    def _limit(
+        self, spec: typing.Optional[TaskSpec]
+    ) -> typing.AsyncContextManager[object]:
+        if spec is None or spec.concurrency is None:
+            return _no_limit()
+        if spec.name not in self._limits:
+            self._limits[spec.name] = asyncio.Semaphore(spec.concurrency)
+        return self._limits[spec.name]
+
+    async def claim(self) -> typing.List[Task]:
+        free = self.concurrency - len(self.inflight)
+        if free <= 0:
+            return []
+        async with self.session_scope() as db:
+            return await run_db(
+                db,
+                task_repo.claim,
+                limit=free,
+                lock_timeout=self.lock_timeout,
+                caps=self._free_slots(),
+            )
+
+    async def execute(self, task: Task) -> None:
+        spec = registry.get(task.name)
+        try:
+            async with self._limit(spec):
+                if spec is None:
+                    raise LookupError(f"Unknown task: {task.name}")
+                # Always an object, as `enqueue` stores it
+                payload = typing.cast(typing.Dict[str, object], task.payload)
+                if spec.is_async:
+                    await typing.cast(typing.Awaitable[object], spec.fn(**payload))
+                else:
+                    await run_in_threadpool(spec.fn, **payload)
+        except Exception as exc:  # pylint: disable=broad-except
+            retry = task.attempts < task.max_attempts
+            logger.exception(
+                "Task %s %s failed (attempt %s of %s)",
+                task.name,
+                task.id,
+                task.attempts,
+                task.max_attempts,
+            )
+            async with self.session_scope() as db:
+                await run_db(
+                    db,
+                    task_repo.fail,
+                    task_id=task.id,
+                    error=repr(exc),
+                    retry_delay=retry_delay(task.attempts) if retry else None,
+                )
+        else:
+            async with self.session_scope() as db:
+                await run_db(db, task_repo.complete, task_id=task.id)
+        finally:
+            self.claimed[task.name] -= 1
+
+    def _start(self, task: Task) -> None:
+        # Counted right away, so the next claim sees it even before it runs
+        self.claimed[task.name] += 1
+        future = asyncio.ensure_future(self.execute(task))
+        self.inflight.add(future)
+        future.add_done_callback(self.inflight.discard)
+
+    async def run_once(self) -> int:
+        """Claims one batch of due tasks and runs them, returning how many"""
+        tasks = await self.claim()
+        for task in tasks:
+            self._start(task)
+        if self.inflight:
+            await asyncio.wait(self.inflight)
+        return len(tasks)
+
+    async def run(self) -> None:
+        """Runs tasks until `stop`, then waits for the ones in flight"""
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_event_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+
+        logger.info("Worker started, running up to %s tasks", self.concurrency)
+        while not self._stopping.is_set():
+            try:
+                tasks = await self.claim()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Claiming tasks failed")
+                tasks = []
+            for task in tasks:
+                self._start(task)
+            if tasks and len(self.inflight) < self.concurrency:
+                continue
+            # Idle or full: wait for a slot, new tasks to be due, or to stop
+            waiting = {*self.inflight, asyncio.ensure_future(self._stopping.wait())}
+            _, pending = await asyncio.wait(
+                waiting,
+                timeout=self.poll_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for future in pending - self.inflight:
+                future.cancel()
+
+        if self.inflight:
+            logger.info("Waiting for %s tasks to finish", len(self.inflight))
+            await asyncio.wait(self.inflight)
+
+    def stop(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+
+@contextlib.asynccontextmanager
+async def _no_limit() -> typing.AsyncIterator[None]:
+    yield
+
+
+def main() -> None:
+    # pylint: disable=import-outside-toplevel
+    from app.db.loader import load_models
+    from app.utils.log import configure_logging
+
+    configure_logging()
+    load_models()
+    # Registers the tasks of every service
+    import app.services.api  # noqa: F401  pylint: disable=unused-import
+
+    asyncio.run(Worker().run())
+
+
+if __name__ == "__main__":
+    main()
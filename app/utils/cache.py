@@ -0,0 +1,198 @@
+import threading
+import time
+import typing
+
+from collections import OrderedDict
+
+
+K = typing.TypeVar("K")
+V = typing.TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(typing.Generic[K, V]):
+    """
+    Thread safe, size bounded LRU cache whose entries expire after `ttl` seconds
+    (or after a per entry `ttl` given to `set`).
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[K, typing.Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K, default: typing.Optional[V] = None) -> typing.Optional[V]:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= self.clock():  # type: ignore
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]  # type: ignore
+
+    def set(self, key: K, value: V, ttl: typing.Optional[float] = None) -> None:
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key: K, value: V, ttl: typing.Optional[float] = None) -> bool:
+        """Sets `key` unless it holds a live entry, returning whether it did"""
+        now = self.clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self._data[key] = (now + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def pop(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend:
+    """
+    Byte store shared by the cache layers. `incr` keeps counters that are never
+    evicted, used as generations to invalidate whole groups of entries.
+    """
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Sets `key` unless it's already there, returning whether it did"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Process local backend, every worker keeps its own entries"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries: TTLCache[str, bytes] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.counters: typing.Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        return self.entries.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.entries.set(key, value, ttl=ttl)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return self.entries.add(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self.entries.pop(key)
+
+    def counter(self, key: str) -> int:
+        return self.counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+
+class RedisClient(typing.Protocol):
+    """The few commands of a `redis.Redis` client the backend uses"""
+
+    def get(self, name: str) -> typing.Optional[bytes]:
+        ...
+
+    def set(
+        self,
+        name: str,
+        value: bytes,
+        *,
+        ex: typing.Optional[int] = None,
+        nx: bool = False,
+    ) -> typing.Optional[bool]:
+        ...
+
+    def delete(self, name: str) -> object:
+        ...
+
+    def incr(self, name: str) -> int:
+        ...
+
+
+class RedisCacheBackend(CacheBackend):
+    """Backend shared by every worker, on a redis client (or anything alike)"""
+
+    def __init__(self, client: RedisClient, prefix: str = "cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            raise RuntimeError("The redis cache backend needs the redis package")
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(
+            self.client.set(self.prefix + key, value, ex=max(1, int(ttl)), nx=True)
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def counter(self, key: str) -> int:
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(self.prefix + key)
+
+
+def create_backend(name: str, maxsize: int, ttl: float, url: str = "") -> CacheBackend:
+    if name == "redis":
+        return RedisCacheBackend.from_url(url)
+    if name == "memory":
+        return MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {name}")
@@ -1,16 +1,179 @@
 # type: ignore
-from typing import IO
+import asyncio
+import functools
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, Optional
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+from app.settings.globals import (
+    AWS_S3_ENDPOINT_URL,
+    UPLOAD_PART_CONCURRENCY,
+    UPLOAD_PART_SIZE,
+    UPLOAD_WORKERS,
+)
+
+
+class FileTooLarge(ValueError):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Files are limited to {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class LimitedReader(io.RawIOBase):
+    """
+    Reads `file` up to `max_bytes`, raising `FileTooLarge` as soon as more than
+    that was read, so the upload to S3 is aborted instead of completed. The
+    request body itself is bounded by `RequestSizeLimitMiddleware`.
+    """
+
+    def __init__(self, file: IO, max_bytes: int):
+        super().__init__()
+        self.file = file
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            # Never more than the limit plus one byte to tell it was exceeded
+            size = self.max_bytes - self.bytes_read + 1
+        chunk = self.file.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_bytes:
+            raise FileTooLarge(self.max_bytes)
+        return chunk
+
+    def readinto(self, buffer) -> int:
+        chunk = self.read(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
 
 
 class FileManagement:
-    def __init__(self):
-        self.s3 = boto3.client("s3")
+    def __init__(self, client: Any = None, max_workers: int = UPLOAD_WORKERS):
+        self._s3 = client
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="upload"
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=UPLOAD_PART_SIZE,
+            multipart_chunksize=UPLOAD_PART_SIZE,
+            max_concurrency=UPLOAD_PART_CONCURRENCY,
+        )
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = boto3.client("s3", endpoint_url=AWS_S3_ENDPOINT_URL)
+        return self._s3
 
-    def upload_file(self, file: IO, file_name: str, bucket_name: str) -> str:
-        self.s3.upload_fileobj(file, bucket_name, file_name)
+    def upload_file(
+        self,
+        file: IO,
+        file_name: str,
+        bucket_name: str,
+        max_bytes: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> str:
+        """
+        Streams `file` to S3, in parts past `UPLOAD_PART_SIZE`. With `max_bytes`
+        the upload is aborted with `FileTooLarge` once that much was read.
+        """
+        if max_bytes is not None:
+            file = LimitedReader(file, max_bytes)
+        self.s3.upload_fileobj(
+            file,
+            bucket_name,
+            file_name,
+            ExtraArgs={"ContentType": content_type} if content_type else None,
+            Config=self.transfer_config,
+        )
         return file_name
 
+    async def upload_file_async(
+        self,
+        file: IO,
+        file_name: str,
+        bucket_name: str,
+        max_bytes: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> str:
+        """
+        `upload_file` on the upload thread pool, which bounds how many uploads
+        (and boto3 threads) each process runs while the event loop goes on.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(
+                self.upload_file,
+                file,
+                file_name,
+                bucket_name,
+                max_bytes=max_bytes,
+                content_type=content_type,
+            ),
+        )
+
+    def download_file(self, file_name: str, bucket_name: str) -> bytes:
+        file = io.BytesIO()
+        self.s3.download_fileobj(
+            bucket_name, file_name, file, Config=self.transfer_config
+        )
+        return file.getvalue()
+
+    async def download_file_async(self, file_name: str, bucket_name: str) -> bytes:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor, self.download_file, file_name, bucket_name
+        )
+
+    def presigned_post(
+        self,
+        file_name: str,
+        bucket_name: str,
+        content_type: str,
+        max_bytes: int,
+        expires_in: int,
+    ) -> Dict[str, Any]:
+        """
+        Signed form (`url` and `fields`) letting a client upload `file_name`
+        straight to S3, only with `content_type` and at most `max_bytes`.
+        Signing is local, it doesn't call S3.
+        """
+        return self.s3.generate_presigned_post(
+            bucket_name,
+            file_name,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_bytes],
+            ],
+            ExpiresIn=expires_in,
+        )
+
+    def head_file(self, file_name: str, bucket_name: str) -> Optional[Dict[str, Any]]:
+        """Metadata of the object `file_name`, None when it doesn't exist"""
+        try:
+            return self.s3.head_object(Bucket=bucket_name, Key=file_name)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    async def head_file_async(
+        self, file_name: str, bucket_name: str
+    ) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor, self.head_file, file_name, bucket_name
+        )
+
 
 file_management = FileManagement()
@@ -0,0 +1,79 @@
+import asyncio
+import io
+import typing
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+from app.settings.globals import IMAGE_WORKERS
+
+
+class Variant(typing.NamedTuple):
+    size: int
+    format: str
+    quality: int
+
+    @property
+    def content_type(self) -> str:
+        return f"image/{self.format.lower()}"
+
+    @property
+    def extension(self) -> str:
+        return {"JPEG": "jpg"}.get(self.format, self.format.lower())
+
+
+AVATAR_VARIANTS: typing.Dict[str, Variant] = {
+    "thumb": Variant(size=64, format="JPEG", quality=80),
+    "medium": Variant(size=256, format="JPEG", quality=82),
+    "webp": Variant(size=256, format="WEBP", quality=80),
+}
+
+
+def render_variants(
+    data: bytes, variants: typing.Optional[typing.Dict[str, Variant]] = None
+) -> typing.Dict[str, bytes]:
+    """
+    Resized and recompressed copies of the image `data`, fitting in a square of
+    each variant's size (the avatar variants by default). CPU bound, meant to run
+    in the image process pool.
+    """
+    if variants is None:
+        variants = AVATAR_VARIANTS
+    image = Image.open(io.BytesIO(data))
+    # JPEGs can be decoded straight at a fraction of their size
+    image.draft("RGB", (max(v.size for v in variants.values()),) * 2)
+    image = ImageOps.exif_transpose(image).convert("RGB")
+
+    rendered = {}
+    for name, variant in sorted(variants.items(), key=lambda item: -item[1].size):
+        resized = image.copy()
+        resized.thumbnail((variant.size, variant.size), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        resized.save(output, variant.format, quality=variant.quality, optimize=True)
+        rendered[name] = output.getvalue()
+    return rendered
+
+
+_pool: typing.Optional[ProcessPoolExecutor] = None
+
+
+def image_pool() -> ProcessPoolExecutor:
+    """Process pool of IMAGE_WORKERS, created on first use"""
+    global _pool  # pylint: disable=global-statement
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+
+def shutdown_image_pool() -> None:
+    global _pool  # pylint: disable=global-statement
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+async def render_variants_async(
+    data: bytes, variants: typing.Optional[typing.Dict[str, Variant]] = None
+) -> typing.Dict[str, bytes]:
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(image_pool(), render_variants, data, variants)
@@ -34,7 +34,7 @@ LOGGING_CONFIG = {
         "app": {"handlers": ["default"], "level": "INFO", "propagate": False},
         "sqlalchemy.engine": {
             "handlers": ["print"],
-            "level": "INFO",
+            "level": "WARNING",
             "propagate": False,
         },
     },
@@ -0,0 +1,63 @@
+import os
+import typing
+
+from dataclasses import dataclass
+from dataclasses import field
+
+
+Labels = typing.Dict[str, str]
+
+
+@dataclass
+class Metric:
+    name: str
+    kind: str
+    help: str
+    samples: typing.List[typing.Tuple[Labels, float]] = field(default_factory=list)
+
+    def add(self, value: float, **labels: str) -> "Metric":
+        self.samples.append(({"pid": str(os.getpid()), **labels}, value))
+        return self
+
+
+Collector = typing.Callable[[], typing.Iterable[Metric]]
+
+
+class Registry:
+    """
+    Collects metrics from registered collectors at scrape time and renders them
+    in the Prometheus text exposition format.
+
+    Each worker process has its own registry, so every sample is labelled with the
+    worker pid.
+    """
+
+    def __init__(self):
+        self._collectors: typing.List[Collector] = []
+
+    def register(self, collector: Collector) -> Collector:
+        self._collectors.append(collector)
+        return collector
+
+    def collect(self) -> typing.Dict[str, Metric]:
+        metrics: typing.Dict[str, Metric] = {}
+        for collector in self._collectors:
+            for metric in collector():
+                if metric.name in metrics:
+                    metrics[metric.name].samples.extend(metric.samples)
+                else:
+                    metrics[metric.name] = metric
+        return metrics
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.collect().values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in metric.samples:
+                rendered = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{metric.name}{{{rendered}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
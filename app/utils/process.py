@@ -0,0 +1,57 @@
+import math
+import os
+import typing
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read(path: str) -> typing.Optional[str]:
+    try:
+        with open(path) as cgroup_file:
+            return cgroup_file.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota(root: str = CGROUP_ROOT) -> typing.Optional[float]:
+    """
+    CPUs the container may use according to its CFS quota (`docker --cpus`,
+    Kubernetes CPU limits), cgroup v2 or v1. None when there is no quota.
+    """
+    cpu_max = _read(os.path.join(root, "cpu.max"))
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota == "max":
+            return None
+        return int(quota) / int(period or 100000)
+
+    for directory in ("cpu", "cpu,cpuacct"):
+        cfs_quota = _read(os.path.join(root, directory, "cpu.cfs_quota_us"))
+        cfs_period = _read(os.path.join(root, directory, "cpu.cfs_period_us"))
+        if cfs_quota is not None and cfs_period is not None:
+            return int(cfs_quota) / int(cfs_period) if int(cfs_quota) > 0 else None
+    return None
+
+
+def available_cpus(root: str = CGROUP_ROOT) -> int:
+    """
+    CPUs this process can actually run on: the ones it's pinned to, capped by
+    the cgroup quota. `cpu_count()` reports the host's, however many of them
+    the container gets.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_quota(root)
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def rss_bytes() -> typing.Optional[int]:
+    """Resident memory of this process, None where /proc isn't available"""
+    statm = _read("/proc/self/statm")
+    if statm is None:
+        return None
+    return int(statm.split()[1]) * os.sysconf("SC_PAGE_SIZE")
@@ -0,0 +1,78 @@
+"""
+Per request cost of bearer token authentication, for a client sending the same
+token over and over.
+
+    python -m benchmarks.auth [iterations]
+
+"legacy" is the verification JWTBearer used to run on every request.
+"""
+import asyncio
+import sys
+import time
+
+import rsa
+
+from jose import jwk, jwt
+from jose.utils import base64url_decode
+from starlette.requests import Request
+
+from app.cross.jwks import JWKS, JWKSProvider
+from app.cross.security import JWTAuthorizationCredentials, JWTBearer
+
+
+def legacy_verify(jwt_token: str, kid_to_jwk) -> JWTAuthorizationCredentials:
+    message, signature = jwt_token.rsplit(".", 1)
+    jwt_credentials = JWTAuthorizationCredentials(
+        jwt_token=jwt_token,
+        header=jwt.get_unverified_header(jwt_token),
+        claims=jwt.get_unverified_claims(jwt_token),
+        signature=signature,
+        message=message,
+    )
+    key = jwk.construct(kid_to_jwk[jwt_credentials.header["kid"]])
+    assert key.verify(message.encode(), base64url_decode(signature.encode()))
+    return jwt_credentials
+
+
+def request(jwt_token: str) -> Request:
+    headers = [(b"authorization", f"Bearer {jwt_token}".encode())]
+    return Request({"type": "http", "headers": headers})
+
+
+def report(name: str, iterations: int, elapsed: float) -> None:
+    print(f"{name:>10}: {elapsed / iterations * 1e6:9.1f}us per request")
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    _, private_key = rsa.newkeys(2048, poolsize=4)
+    pem = private_key.save_pkcs1().decode()
+    public_key = {**jwk.construct(pem, "RS256").public_key().to_dict(), "kid": "k"}
+    jwt_token = jwt.encode(
+        {"sub": "user", "exp": int(time.time()) + 3600},
+        pem,
+        algorithm="RS256",
+        headers={"kid": "k"},
+    )
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        legacy_verify(jwt_token, {"k": public_key})
+    report("legacy", iterations, time.perf_counter() - started)
+
+    for name, cache_size in (("no cache", 0), ("cached", 1000)):
+        provider = JWKSProvider()
+        provider.seed(JWKS(keys=[public_key]))
+        bearer = JWTBearer(provider, cache_size=cache_size)
+
+        async def authenticate():
+            for _ in range(iterations):
+                await bearer(request(jwt_token))
+
+        started = time.perf_counter()
+        asyncio.run(authenticate())
+        report(name, iterations, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
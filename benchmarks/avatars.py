@@ -0,0 +1,61 @@
+"""
+Bytes sent per avatar in list views, original upload against the variants made
+by the image pool, and the time the pool takes per avatar.
+
+    python -m benchmarks.avatars [avatars] [size_px]
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+
+from PIL import Image
+
+from app.utils.images import AVATAR_VARIANTS, render_variants_async, shutdown_image_pool
+
+
+def noise(size: int, scale: int) -> Image.Image:
+    small = max(1, size // scale)
+    pixels = Image.frombytes("RGB", (small, small), os.urandom(small * small * 3))
+    return pixels.resize((size, size), Image.BICUBIC)
+
+
+def photo(size: int) -> bytes:
+    # Detail at every scale, compresses about like a phone picture
+    image = noise(size, 64)
+    for scale, weight in ((16, 0.4), (4, 0.25), (1, 0.1)):
+        image = Image.blend(image, noise(size, scale), weight)
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=92)
+    return output.getvalue()
+
+
+async def render_all(originals):
+    return await asyncio.gather(*(render_variants_async(data) for data in originals))
+
+
+def main() -> None:
+    avatars = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 2048
+    originals = [photo(size) for _ in range(avatars)]
+
+    asyncio.run(render_all(originals[:1]))  # start the pool
+    started = time.perf_counter()
+    rendered = asyncio.run(render_all(originals))
+    elapsed = time.perf_counter() - started
+    shutdown_image_pool()
+
+    original_bytes = sum(map(len, originals)) / avatars
+    print(f"{'original':>8}: {original_bytes / 1024:8.1f}KB per avatar")
+    for name in AVATAR_VARIANTS:
+        variant_bytes = sum(len(variants[name]) for variants in rendered) / avatars
+        print(
+            f"{name:>8}: {variant_bytes / 1024:8.1f}KB per avatar, "
+            f"{original_bytes / variant_bytes:6.1f}x smaller"
+        )
+    print(f"rendered {avatars} avatars in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
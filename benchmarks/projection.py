@@ -0,0 +1,99 @@
+"""
+Time and peak memory of reading a user's candidates for the list endpoint.
+
+    python -m benchmarks.projection [candidates] [rounds]
+
+Runs against DATABASE_URL inside a transaction that is rolled back at the end.
+"orm" hydrates Candidate objects into the session, as `find_by_user_id` does;
+"rows" selects the DTO's columns into plain rows, and "sparse" only two of them.
+"""
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy.orm import Session
+
+from app.db.session import engine
+from app.models.api.candidate import Candidate as CandidateDto
+from app.models.orm.candidate import Candidate
+from app.models.orm.user import User
+from app.repositories import candidate_repo
+from app.services.api.fields import from_rows
+
+
+def orm(db: Session, user_id):
+    candidates = candidate_repo.find_by_user_id(user_id=user_id, db=db)
+    return [CandidateDto.from_orm_trusted(candidate) for candidate in candidates]
+
+
+def rows(db: Session, user_id):
+    return from_rows(
+        CandidateDto,
+        candidate_repo.find_rows(
+            db, Candidate.user_id == user_id, columns=CandidateDto.__fields__
+        ),
+    )
+
+
+def sparse(db: Session, user_id):
+    fields = ["name", "email"]
+    return from_rows(
+        CandidateDto,
+        candidate_repo.find_rows(db, Candidate.user_id == user_id, columns=fields),
+        fields,
+    )
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection)
+    try:
+        user = User(username="projection", email="projection@email.com")
+        db.add(user)
+        db.flush()
+        db.bulk_insert_mappings(
+            Candidate,
+            [
+                {
+                    "name": f"candidate {n}",
+                    "email": f"candidate{n}@testing.com",
+                    "linkedin_url": f"https://linkedin.com/in/candidate{n}",
+                    "avatar_path": f"images/candidates/{n}/{n}_avatar",
+                    "user_id": user.id,
+                }
+                for n in range(count)
+            ],
+        )
+        db.flush()
+        user_id = user.id
+
+        for name, read in (("orm", orm), ("rows", rows), ("sparse", sparse)):
+            db.expunge_all()
+            read(db, user_id)
+            started = time.perf_counter()
+            for _ in range(rounds):
+                db.expunge_all()
+                read(db, user_id)
+            elapsed = (time.perf_counter() - started) / rounds
+
+            db.expunge_all()
+            tracemalloc.start()
+            result = read(db, user_id)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del result
+            print(
+                f"{name:>8}: {elapsed * 1000 / count * 1000:8.2f}ms and "
+                f"{peak / count * 1000 / 2 ** 20:6.2f}MB peak per 1000 candidates"
+            )
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Serialization cost of a list of candidates (with their jobs), from loaded ORM
+objects to the response body.
+
+    python -m benchmarks.responses [candidates] [rounds]
+
+"legacy" is what the routes did: `from_orm` in the service, then FastAPI
+validating the DTOs again against the `response_model` and encoding them with
+`jsonable_encoder` and the stdlib json. "fast" is the FAST_RESPONSES path.
+"""
+import asyncio
+import datetime
+import sys
+import time
+import typing
+import uuid
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.responses import JSONResponse
+
+import app.models.orm.user  # noqa: F401  pylint: disable=unused-import
+from app.cross import responses
+from app.models.api.candidate import CandidateWithJobs
+from app.models.orm.candidate import Candidate, CandidateJobs
+from app.models.orm.job import Job
+
+
+def candidates(count: int) -> typing.List[Candidate]:
+    now = datetime.datetime.utcnow()
+    jobs = [
+        Job(id=uuid.uuid4(), title=f"job {n}", description="d" * 200) for n in range(3)
+    ]
+    for job in jobs:
+        job.created_at = job.updated_at = now
+    return [
+        Candidate(
+            id=uuid.uuid4(),
+            name=f"candidate {n}",
+            email=f"candidate{n}@testing.com",
+            linkedin_url=f"https://linkedin.com/in/candidate{n}",
+            avatar_path=f"images/candidates/{n}/{n}_avatar",
+            created_at=now,
+            updated_at=now,
+            jobs=[CandidateJobs(job=job, created_at=now) for job in jobs],
+        )
+        for n in range(count)
+    ]
+
+
+FIELD = create_response_field(
+    name="response", type_=typing.List[CandidateWithJobs]  # type: ignore
+)
+
+
+def legacy(rows: typing.List[Candidate]) -> bytes:
+    dtos = [CandidateWithJobs.from_orm(row) for row in rows]
+    content = asyncio.run(serialize_response(field=FIELD, response_content=dtos))
+    return JSONResponse(content).body
+
+
+def fast(rows: typing.List[Candidate]) -> bytes:
+    dtos = [CandidateWithJobs.from_orm_trusted(row) for row in rows]
+    return responses.DTOResponse(dtos).body
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rows = candidates(count)
+    responses.FAST_RESPONSES = True
+    if responses.orjson is None:
+        print("orjson isn't installed, the fast path falls back to the stdlib json")
+
+    for name, serialize in (("legacy", legacy), ("fast", fast)):
+        serialize(rows)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            body = serialize(rows)
+        elapsed = (time.perf_counter() - started) / rounds
+        print(
+            f"{name:>8}: {elapsed * 1000 / count * 1000:8.2f}ms per 1000 candidates"
+            f" ({len(body)} bytes)"
+        )
+
+
+if __name__ == "__main__":
+    main()
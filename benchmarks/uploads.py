@@ -0,0 +1,72 @@
+"""
+How avatar uploads affect the other requests of a worker, against a local S3
+stand-in.
+
+    python -m benchmarks.uploads [uploads] [size_mb]
+
+"legacy" runs the boto3 upload on the event loop as the avatar route used to,
+"current" goes through the upload thread pool. Meanwhile a trivial request is
+served every 5ms; the report shows how long those requests waited.
+"""
+import asyncio
+import io
+import statistics
+import sys
+import time
+
+from app.utils.file_management import FileManagement
+from tests.s3 import S3StandIn
+
+BUCKET = "benchmark"
+TICK = 0.005
+
+
+async def other_requests(done: asyncio.Event, waits: list) -> None:
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        waits.append(time.perf_counter() - started - TICK)
+
+
+async def legacy_upload(files: FileManagement, body: bytes, name: str) -> None:
+    files.upload_file(io.BytesIO(body), name, BUCKET)
+
+
+async def current_upload(files: FileManagement, body: bytes, name: str) -> None:
+    await files.upload_file_async(io.BytesIO(body), name, BUCKET, len(body))
+
+
+async def run(upload, files: FileManagement, uploads: int, body: bytes):
+    done = asyncio.Event()
+    waits: list = []
+    ticker = asyncio.ensure_future(other_requests(done, waits))
+    started = time.perf_counter()
+    await asyncio.gather(*(upload(files, body, f"avatar-{n}") for n in range(uploads)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker
+    return elapsed, waits
+
+
+def report(name: str, elapsed: float, waits: list) -> None:
+    waits = sorted(waits) or [0.0]
+    p99 = waits[int(len(waits) * 0.99)]
+    print(
+        f"{name:>8}: uploads took {elapsed:6.2f}s, other requests waited "
+        f"{statistics.mean(waits) * 1000:7.1f}ms on average, "
+        f"{p99 * 1000:7.1f}ms p99, {waits[-1] * 1000:7.1f}ms max"
+    )
+
+
+def main() -> None:
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    size = int(float(sys.argv[2]) * 1024 * 1024) if len(sys.argv) > 2 else 4 << 20
+    body = b"\xff" * size
+    with S3StandIn(latency=0.02, bandwidth=20e6) as s3:
+        files = FileManagement(client=s3.client())
+        for name, upload in (("legacy", legacy_upload), ("current", current_upload)):
+            report(name, *asyncio.run(run(upload, files, uploads, body)))
+
+
+if __name__ == "__main__":
+    main()
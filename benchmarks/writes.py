@@ -0,0 +1,78 @@
+"""
+Round trips and latency of single row writes.
+
+    python -m benchmarks.writes [iterations]
+
+Runs against DATABASE_URL inside a transaction that is rolled back at the end.
+"legacy" is the add/commit/refresh sequence the repositories used to run.
+"""
+import sys
+import time
+import uuid
+
+from sqlalchemy.orm import Session
+
+from app.db.instrumentation import capture_queries
+from app.db.session import engine
+from app.models.api.job import JobCreate
+from app.models.orm.job import Job
+from app.models.orm.user import User  # noqa: F401 pylint: disable=unused-import
+from app.repositories import job_repo
+
+
+def legacy_create(db: Session, obj_in: JobCreate) -> Job:
+    db_obj = Job(**obj_in.dict())
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+
+def legacy_update(db: Session, db_obj: Job, description: str) -> Job:
+    db_obj.description = description
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+
+def run(name, iterations, create, update, **session_options) -> None:
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection, **session_options)
+    db.begin_nested()
+    db.connection()
+    try:
+        started = time.perf_counter()
+        with capture_queries() as stats:
+            for _ in range(iterations):
+                job = create(db, JobCreate(title=uuid.uuid4().hex, description="-"))
+                update(db, job, uuid.uuid4().hex)
+                db.begin_nested()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:>8}: {stats.count / iterations:.1f} statements, "
+            f"{elapsed / iterations * 1000:.2f}ms per create + update"
+        )
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    run("legacy", iterations, legacy_create, legacy_update)
+    run(
+        "current",
+        iterations,
+        lambda db, obj_in: job_repo.create(db=db, obj_in=obj_in),
+        lambda db, db_obj, description: job_repo.update(
+            db=db, db_obj=db_obj, obj_in={"description": description}
+        ),
+        expire_on_commit=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
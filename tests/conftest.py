@@ -1,9 +1,12 @@
+import contextlib
+
 import alembic.config
 import pytest
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm.session import Session
 
+from app.db.instrumentation import capture_queries
 from app.settings import globals as g
 
 
@@ -42,11 +45,36 @@ def setup_test_db():
 def db_session(test_db):
     connection = test_db.connect()
     transaction = connection.begin()
-    session = Session(autocommit=False, autoflush=False, bind=connection)
+    session = Session(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=connection
+    )
     try:
         session.begin_nested()
+        # Emit the SAVEPOINT up front so it doesn't count against query budgets
+        session.connection()
         yield session
     finally:
         session.close()
         transaction.rollback()
         connection.close()
+
+
+@pytest.fixture(name="query_budget")
+def query_budget_fixture():
+    """
+    Fails the test when the wrapped block runs more statements than allowed:
+
+        with query_budget(2):
+            client.get("/v1/job/")
+    """
+
+    @contextlib.contextmanager
+    def query_budget(max_queries: int):
+        with capture_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, (
+            f"Ran {stats.count} statements, the budget is {max_queries}:\n"
+            + "\n".join(f"{n} x {shape}" for shape, n in stats.shapes.items())
+        )
+
+    return query_budget
@@ -0,0 +1,92 @@
+# type: ignore
+import pytest
+
+from starlette.testclient import TestClient
+
+from app.cross.cache import response_cache
+from app.cross.db import get_db
+from app.db.instrumentation import capture_queries
+from app.main import app
+from app.models.api.job import JobCreate
+from app.services.api import job_service
+from app.utils.cache import MemoryCacheBackend, RedisCacheBackend
+
+
+class FakeRedis:
+    """Stand-in for the few redis commands the cache backend uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.expiry[key] = ex
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+@pytest.fixture(name="client", params=["memory", "redis"])
+def test_client(request, db, monkeypatch):
+    if request.param == "redis":
+        backend = RedisCacheBackend(FakeRedis())
+    else:
+        backend = MemoryCacheBackend(maxsize=10, ttl=60)
+    monkeypatch.setattr(response_cache, "backend", backend)
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def create_job(db, n):
+    return job_service.create(
+        job=JobCreate(title=f"job {n}", description=f"description {n}"), db=db
+    )
+
+
+def test_unchanged_jobs_get_a_304(db, client):
+    create_job(db, 1)
+
+    first = client.get("/v1/job/")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert [job["title"] for job in first.json()] == ["job 1"]
+
+    with capture_queries() as stats:
+        second = client.get("/v1/job/", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert stats.count == 1  # the version signal
+
+    with capture_queries() as stats:
+        third = client.get("/v1/job/")
+    assert third.content == first.content
+    assert stats.count == 1
+
+
+def test_writes_change_the_etag(db, client):
+    create_job(db, 1)
+    etag = client.get("/v1/job/").headers["ETag"]
+
+    create_job(db, 2)
+    response = client.get("/v1/job/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_invalidate_changes_the_etag(client):
+    etag = client.get("/v1/job/").headers["ETag"]
+
+    response_cache.invalidate("jobs")
+
+    assert client.get("/v1/job/", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,125 @@
+# type: ignore
+import asyncio
+import gzip
+import json
+import zlib
+
+import brotli
+import pytest
+
+from starlette.responses import JSONResponse, Response, StreamingResponse
+
+from app.cross.compression import CompressionMiddleware, accepted_encodings
+
+ITEMS = [{"name": f"candidate {n}", "email": f"c{n}@testing.com"} for n in range(200)]
+
+
+def call(response, accept_encoding, **options):
+    """The messages `response` sends through the middleware"""
+    messages = []
+
+    async def app(scope, receive, send):
+        await response(scope, receive, send)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    asyncio.run(CompressionMiddleware(app, **options)(scope, receive, send))
+    headers = {key.decode(): value.decode() for key, value in messages[0]["headers"]}
+    return headers, [message["body"] for message in messages[1:]]
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip;q=0.5, br , identity;q=0, *;q=x") == {
+        "gzip": 0.5,
+        "br": 1.0,
+        "identity": 0.0,
+        "*": 0.0,
+    }
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("*", "br"),
+        ("br;q=0, *", "gzip"),
+    ],
+)
+def test_negotiates_the_encoding(accept_encoding, expected):
+    headers, bodies = call(JSONResponse(ITEMS), accept_encoding)
+
+    assert headers["content-encoding"] == expected
+    assert headers["vary"] == "Accept-Encoding"
+    decompress = brotli.decompress if expected == "br" else gzip.decompress
+    assert json.loads(decompress(b"".join(bodies))) == ITEMS
+    assert int(headers["content-length"]) == len(bodies[0])
+    assert len(bodies[0]) < len(JSONResponse(ITEMS).body) / 5
+
+
+@pytest.mark.parametrize(
+    "response, accept_encoding",
+    [
+        (JSONResponse(ITEMS[:2]), "gzip"),
+        (JSONResponse(ITEMS), "identity"),
+        (JSONResponse(ITEMS), "gzip;q=0"),
+        (Response(b"\xff" * 2000, media_type="image/jpeg"), "gzip"),
+        (
+            Response(gzip.compress(b"{}" * 2000), headers={"Content-Encoding": "gzip"}),
+            "gzip",
+        ),
+    ],
+)
+def test_leaves_responses_alone(response, accept_encoding):
+    headers, bodies = call(response, accept_encoding)
+
+    assert "content-encoding" not in headers or response.headers.get("content-encoding")
+    assert b"".join(bodies) == response.body
+
+
+def test_compresses_streams_chunk_by_chunk():
+    chunks = [json.dumps(item).encode() + b"\n" for item in ITEMS]
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    headers, bodies = call(
+        StreamingResponse(stream(), media_type="application/x-ndjson"), "gzip"
+    )
+
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    # Every chunk can be decoded as soon as it's received
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk, body in zip(chunks, bodies):
+        assert decompressor.decompress(body) == chunk
+    assert gzip.decompress(b"".join(bodies)) == b"".join(chunks)
+
+
+def test_weakens_etags():
+    response = JSONResponse(ITEMS, headers={"ETag": '"abc"'})
+
+    headers, _ = call(response, "gzip")
+
+    assert headers["etag"] == 'W/"abc"'
+
+
+def test_compression_level():
+    stored, _ = call(JSONResponse(ITEMS), "gzip", gzip_level=0)
+    small, _ = call(JSONResponse(ITEMS), "gzip", gzip_level=9)
+
+    assert int(stored["content-length"]) > len(JSONResponse(ITEMS).body)
+    assert int(small["content-length"]) < len(JSONResponse(ITEMS).body) / 5
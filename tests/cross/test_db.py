@@ -0,0 +1,97 @@
+# type: ignore
+import pytest
+
+from fastapi import Depends
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from starlette.testclient import TestClient
+
+from app.cross import db as cross_db
+from app.cross.db import get_db
+from app.cross.db import run_db
+from app.models.orm.job import Job
+
+
+@pytest.fixture(name="checkouts")
+def pool_checkouts(test_db, monkeypatch):
+    monkeypatch.setattr(cross_db, "Session", sessionmaker(bind=test_db))
+    checkouts = []
+
+    def on_checkout(*_):
+        checkouts.append(1)
+
+    event.listen(test_db.pool, "checkout", on_checkout)
+    yield checkouts
+    event.remove(test_db.pool, "checkout", on_checkout)
+
+
+@pytest.fixture(name="client")
+def test_client():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def _():
+        return "pong"
+
+    @app.get("/count")
+    async def _(db=Depends(get_db)):
+        return await run_db(db, lambda db: db.execute(text("SELECT 1")).scalar())
+
+    @app.post("/fail")
+    async def _(db=Depends(get_db)):
+        def add_job(db):
+            db.add(Job(title="rolled back", description="rolled back"))
+            db.flush()
+            raise RuntimeError("boom")
+
+        return await run_db(db, add_job)
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_routes_without_db_never_touch_the_pool(client, checkouts, test_db):
+    assert client.get("/ping").status_code == 200
+
+    assert not checkouts
+    assert test_db.pool.checkedout() == 0
+
+
+def test_session_is_released_after_the_request(client, checkouts, test_db):
+    assert client.get("/count").json() == 1
+
+    assert len(checkouts) == 1
+    assert test_db.pool.checkedout() == 0
+
+
+@pytest.mark.usefixtures("checkouts")
+def test_session_rolls_back_when_the_route_fails(client, test_db):
+    assert client.post("/fail").status_code == 500
+
+    assert test_db.pool.checkedout() == 0
+    with test_db.connect() as connection:
+        assert not connection.execute(
+            text("SELECT count(*) FROM jobs WHERE title = 'rolled back'")
+        ).scalar()
+
+
+@pytest.mark.usefixtures("checkouts")
+def test_uncommitted_writes_are_discarded(test_db):
+    app = FastAPI()
+
+    @app.post("/jobs")
+    async def _(db=Depends(get_db)):
+        def add_job(db):
+            db.add(Job(title="uncommitted", description="uncommitted"))
+            db.flush()
+
+        await run_db(db, add_job)
+
+    assert TestClient(app).post("/jobs").status_code == 200
+
+    assert test_db.pool.checkedout() == 0
+    with test_db.connect() as connection:
+        assert not connection.execute(
+            text("SELECT count(*) FROM jobs WHERE title = 'uncommitted'")
+        ).scalar()
@@ -0,0 +1,59 @@
+# type: ignore
+import pytest
+
+from fastapi import FastAPI, File, UploadFile
+from starlette.testclient import TestClient
+
+from app.cross.limits import RequestSizeLimitMiddleware
+
+
+@pytest.fixture(name="client")
+def test_client():
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_size=1024)
+
+    @app.post("/upload")
+    async def _(file: UploadFile = File(...)):
+        return len(await file.read())
+
+    return TestClient(app)
+
+
+def chunked(content, size=256):
+    """A multipart form with `content` as its file, sent without a Content-Length"""
+    body = (
+        b'--x\r\nContent-Disposition: form-data; name="file"; filename="a.jpg"\r\n'
+        b"Content-Type: image/jpeg\r\n\r\n" + content + b"\r\n--x--\r\n"
+    )
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+def test_small_bodies_go_through(client):
+    response = client.post("/upload", files={"file": ("a.jpg", b"\xff" * 100)})
+
+    assert response.status_code == 200
+    assert response.json() == 100
+
+
+def test_refused_by_content_length(client):
+    response = client.post("/upload", files={"file": ("a.jpg", b"\xff" * 2000)})
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Requests are limited to 1024 bytes"}
+
+
+def test_chunked_bodies_are_cut_at_the_limit(client):
+    small = client.post(
+        "/upload",
+        data=chunked(b"\xff" * 100),
+        headers={"Content-Type": "multipart/form-data; boundary=x"},
+    )
+    response = client.post(
+        "/upload",
+        data=chunked(b"\xff" * 4096),
+        headers={"Content-Type": "multipart/form-data; boundary=x"},
+    )
+
+    assert small.json() == 100
+    assert response.status_code == 413
@@ -0,0 +1,98 @@
+# type: ignore
+import datetime
+import json
+import uuid
+
+import pytest
+
+from starlette.responses import JSONResponse
+from starlette.testclient import TestClient
+
+from app.cross import responses
+from app.cross.db import get_db
+from app.cross.security import get_auth_user
+from app.cross.responses import DTOResponse, dto_response, render_json
+from app.main import app
+from app.models.api.base import to_jsonable
+from app.models.api.candidate import Candidate as CandidateDto, CandidateWithJobs
+from app.models.api.user import User as UserDto
+from app.models.orm.candidate import Candidate, CandidateJobs
+from app.models.orm.job import Job
+from app.models.orm.user import User
+
+
+def candidate_with_jobs():
+    now = datetime.datetime(2021, 1, 2, 3, 4, 5, 678)
+    job = Job(
+        id=uuid.uuid4(), title="job", description="d", created_at=now, updated_at=now
+    )
+    return Candidate(
+        id=uuid.uuid4(),
+        name="candidate",
+        email="c@testing.com",
+        linkedin_url="https://linkedin.com/in/c",
+        avatar_path=None,
+        avatar_variants={"thumb": "thumb.jpg"},
+        created_at=now,
+        updated_at=now,
+        jobs=[CandidateJobs(job=job, created_at=now)],
+    )
+
+
+def test_from_orm_trusted_matches_from_orm():
+    candidate = candidate_with_jobs()
+
+    trusted = CandidateWithJobs.from_orm_trusted(candidate)
+
+    assert trusted == CandidateWithJobs.from_orm(candidate)
+    assert to_jsonable(trusted) == CandidateWithJobs.from_orm(candidate).dict()
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_render_json_matches_the_default_rendering(monkeypatch, fast):
+    monkeypatch.setattr(responses, "FAST_RESPONSES", fast)
+    dtos = [CandidateWithJobs.from_orm(candidate_with_jobs()) for _ in range(3)]
+
+    body = render_json(dtos)
+
+    expected = JSONResponse([json.loads(dto.json()) for dto in dtos]).body
+    assert json.loads(body) == json.loads(expected)
+
+
+def test_dto_response_is_opt_in(monkeypatch):
+    dto = CandidateDto.from_orm(candidate_with_jobs())
+
+    monkeypatch.setattr(responses, "FAST_RESPONSES", False)
+    assert dto_response(dto) is dto
+
+    monkeypatch.setattr(responses, "FAST_RESPONSES", True)
+    response = dto_response(dto)
+    assert isinstance(response, DTOResponse)
+    assert json.loads(response.body)["id"] == str(dto.id)
+
+
+def test_fast_route_responses_are_unchanged(db, monkeypatch):
+    user = User(username="fast", email="fast@email.com")
+    candidate = Candidate(
+        name="fast", email="fast@testing.com", linkedin_url="fast", user=user
+    )
+    job = Job(title="fast job", description="d")
+    db.add_all([candidate, job])
+    db.flush()
+    db.add(CandidateJobs(candidate_id=candidate.id, job_id=job.id))
+    db.commit()
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_auth_user] = lambda: UserDto.from_orm(user)
+    client = TestClient(app)
+    try:
+        bodies = []
+        for fast in (False, True):
+            monkeypatch.setattr(responses, "FAST_RESPONSES", fast)
+            response = client.get(f"/v1/candidate/{candidate.id}")
+            assert response.status_code == 200
+            bodies.append(response.json())
+    finally:
+        app.dependency_overrides.clear()
+
+    assert bodies[0] == bodies[1]
+    assert bodies[1]["jobs"][0]["job"]["title"] == "fast job"
@@ -0,0 +1,287 @@
+# type: ignore
+import asyncio
+import json
+import time
+import uuid
+
+import pytest
+import rsa
+
+from fastapi import Depends
+from fastapi import FastAPI
+from fastapi import HTTPException
+from jose import jwk, jwt
+from starlette.requests import Request
+from starlette.testclient import TestClient
+
+from app.cross import security
+from app.cross.db import get_db
+from app.cross.jwks import JWKS, JWKSProvider
+from app.cross.security import JWTBearer, JWTAuthorizationCredentials, get_auth_user
+from app.db.instrumentation import capture_queries
+from app.models.api.user import User as UserDto
+from app.models.orm.user import User
+from app.services.api.user import user_service
+from app.utils.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(name="private_key", scope="session")
+def rsa_private_key():
+    _, private_key = rsa.newkeys(512)
+    return private_key.save_pkcs1().decode()
+
+
+@pytest.fixture(name="jwks")
+def json_web_key_set(private_key):
+    public_key = jwk.construct(private_key, "RS256").public_key().to_dict()
+    return JWKS(keys=[{**public_key, "kid": "key-1"}])
+
+
+def token(private_key, kid="key-1", **claims):
+    return jwt.encode(
+        {"sub": "user-1", **claims},
+        private_key,
+        algorithm="RS256",
+        headers={"kid": kid},
+    )
+
+
+def fetcher(jwks, delay=0.0):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if isinstance(jwks, Exception):
+            raise jwks
+        return jwks
+
+    return fetch, calls
+
+
+def test_loads_from_file(tmp_path, jwks):
+    path = tmp_path / "jwks.json"
+    path.write_text(jwks.json())
+
+    provider = JWKSProvider(path=str(path))
+
+    assert asyncio.run(provider.get("key-1")) == jwks.keys[0]
+
+
+def test_unknown_kid_refetches_once(jwks):
+    fetch, calls = fetcher(jwks, delay=0.01)
+    clock = Clock()
+    provider = JWKSProvider(fetch=fetch, min_refresh_interval=60, clock=clock)
+    provider.seed(JWKS(keys=[]))
+    clock.now = 120
+
+    async def concurrently():
+        return await asyncio.gather(*(provider.get("key-1") for _ in range(10)))
+
+    assert asyncio.run(concurrently()) == [jwks.keys[0]] * 10
+    assert len(calls) == 1
+
+    assert asyncio.run(provider.get("rotated-key")) is None
+    assert len(calls) == 1
+
+
+def test_expired_keys_are_refetched(jwks):
+    fetch, calls = fetcher(jwks)
+    clock = Clock()
+    provider = JWKSProvider(fetch=fetch, ttl=3600, clock=clock)
+
+    asyncio.run(provider.load())
+    clock.now = 3599
+    asyncio.run(provider.get("key-1"))
+    assert len(calls) == 1
+
+    clock.now = 3600
+    asyncio.run(provider.get("key-1"))
+    assert len(calls) == 2
+
+
+def test_fresh_until_the_keys_expire(jwks):
+    fetch, _ = fetcher(jwks)
+    clock = Clock()
+    provider = JWKSProvider(fetch=fetch, ttl=3600, clock=clock)
+    assert not provider.fresh
+
+    asyncio.run(provider.load())
+    assert provider.fresh
+
+    clock.now = 3600
+    assert not provider.fresh
+
+
+def test_failed_fetch_keeps_known_keys(jwks):
+    fetch, calls = fetcher(ConnectionError("issuer down"))
+    clock = Clock()
+    provider = JWKSProvider(fetch=fetch, ttl=10, min_refresh_interval=5, clock=clock)
+    provider.seed(jwks)
+    clock.now = 10
+
+    assert asyncio.run(provider.get("key-1")) == jwks.keys[0]
+    assert asyncio.run(provider.get("key-1")) == jwks.keys[0]
+    assert len(calls) == 1
+
+    clock.now = 15
+    asyncio.run(provider.get("key-1"))
+    assert len(calls) == 2
+
+
+def test_bearer_verifies_with_provider_keys(private_key, jwks):
+    provider = JWKSProvider(fetch=fetcher(jwks)[0])
+    auth = JWTBearer(provider)
+    app = FastAPI()
+
+    @app.get("/me")
+    async def _(credentials: JWTAuthorizationCredentials = Depends(auth)):
+        return credentials.claims["sub"]
+
+    client = TestClient(app)
+
+    def get(bearer):
+        return client.get("/me", headers={"Authorization": f"Bearer {bearer}"})
+
+    assert get(token(private_key)).json() == "user-1"
+    assert get(token(private_key, kid="other")).status_code == 403
+
+    forged = token(private_key).rsplit(".", 1)[0] + "." + json.dumps("x")
+    assert get(forged).status_code == 403
+
+
+@pytest.fixture(name="bearer")
+def jwt_bearer(jwks):
+    return JWTBearer(JWKSProvider(fetch=fetcher(jwks)[0]))
+
+
+def authenticate(bearer, jwt_token):
+    request = Request(
+        {
+            "type": "http",
+            "headers": [(b"authorization", f"Bearer {jwt_token}".encode())],
+        }
+    )
+    return asyncio.run(bearer(request))
+
+
+def test_verified_tokens_are_cached(monkeypatch, private_key, bearer):
+    first, second = token(private_key, n=1), token(private_key, n=2)
+    constructed = []
+    construct = security.jwk.construct
+    monkeypatch.setattr(
+        security.jwk, "construct", lambda key: constructed.append(1) or construct(key)
+    )
+    verified = []
+    verify = bearer.verify_jwk_token
+
+    async def counting_verify(credentials):
+        verified.append(1)
+        return await verify(credentials)
+
+    monkeypatch.setattr(bearer, "verify_jwk_token", counting_verify)
+
+    for jwt_token in (first, second, first, second):
+        assert authenticate(bearer, jwt_token).claims["sub"] == "user-1"
+
+    assert len(verified) == 2
+    assert len(constructed) == 1
+
+
+def test_token_cache_expires_with_the_token(monkeypatch, private_key, bearer):
+    ttls = []
+    monkeypatch.setattr(
+        bearer.verified, "set", lambda key, value, ttl=None: ttls.append(ttl)
+    )
+
+    authenticate(bearer, token(private_key, exp=int(time.time()) + 60))
+
+    assert 0 < ttls[0] <= 60
+
+
+def test_expired_token(private_key, bearer):
+    with pytest.raises(HTTPException) as error:
+        authenticate(bearer, token(private_key, exp=int(time.time()) - 1))
+
+    assert error.value.detail == "JWT expired"
+
+
+@pytest.mark.parametrize("jwt_token", ["nope", "a.b", "a.b.c", "e30.e30.e30"])
+def test_malformed_token(bearer, jwt_token):
+    with pytest.raises(HTTPException):
+        authenticate(bearer, jwt_token)
+
+
+@pytest.fixture(name="user_client")
+def user_test_client(db, jwks, monkeypatch):
+    provider = JWKSProvider(fetch=fetcher(jwks)[0])
+    monkeypatch.setattr(security.auth, "jwks", provider)
+    monkeypatch.setattr(user_service, "cache", TTLCache(maxsize=10, ttl=60))
+    app = FastAPI()
+
+    @app.get("/me")
+    async def _(
+        user: UserDto = Depends(get_auth_user),
+        again: UserDto = Depends(get_auth_user),
+        request: Request = None,
+    ):
+        assert user is again is request.state.user
+        return user
+
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def test_auth_user_is_provisioned_then_cached(db, private_key, user_client):
+    sub = str(uuid.uuid4())
+    headers = {"Authorization": f"Bearer {token(private_key, sub=sub, email='a@b.c')}"}
+
+    with capture_queries() as stats:
+        response = user_client.get("/me", headers=headers)
+    assert stats.count
+    assert response.json()["id"] == sub
+    assert response.json()["email"] == "a@b.c"
+    assert db.query(User).filter(User.id == sub).count() == 1
+
+    with capture_queries() as stats:
+        assert user_client.get("/me", headers=headers).json()["id"] == sub
+    assert stats.count == 0
+
+
+def test_auth_user_finds_existing_user(db, private_key, user_client):
+    user = User(username="existing", email="existing@email.com")
+    db.add(user)
+    db.commit()
+    headers = {"Authorization": f"Bearer {token(private_key, sub=str(user.id))}"}
+
+    assert user_client.get("/me", headers=headers).json()["username"] == "existing"
+
+
+@pytest.mark.parametrize(
+    "claims", [{"username": "existing"}, {"email": "existing@email.com"}]
+)
+def test_auth_user_conflicting_with_another_user(db, private_key, user_client, claims):
+    db.add(User(username="existing", email="existing@email.com"))
+    db.commit()
+    headers = {
+        "Authorization": f"Bearer {token(private_key, sub=str(uuid.uuid4()), **claims)}"
+    }
+
+    response = user_client.get("/me", headers=headers)
+
+    assert response.status_code == 409
+    assert "already taken" in response.json()["detail"]
+
+
+def test_auth_user_needs_uuid_sub(private_key, user_client):
+    headers = {"Authorization": f"Bearer {token(private_key, sub='not-a-uuid')}"}
+
+    assert user_client.get("/me", headers=headers).status_code == 403
@@ -0,0 +1,54 @@
+# type: ignore
+from unittest import mock
+
+from fastapi import Depends
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from starlette.testclient import TestClient
+
+from app.cross import db as cross_db
+from app.cross.db import get_db
+from app.cross.db import run_db
+from app.db import instrumentation
+from app.db.instrumentation import QueryStatsMiddleware
+from app.db.instrumentation import statement_shape
+
+
+def test_statement_shape_collapses_parameter_lists():
+    assert statement_shape(
+        "SELECT *\n  FROM jobs WHERE id IN (%(id_1_1)s, %(id_1_2)s)"
+    ) == statement_shape("SELECT * FROM jobs WHERE id IN (%(id_1_1)s)")
+
+
+def test_requests_report_server_timing_and_repeated_statements(test_db, monkeypatch):
+    logger = mock.Mock()
+    monkeypatch.setattr(instrumentation, "logger", logger)
+    monkeypatch.setattr(cross_db, "Session", sessionmaker(bind=test_db))
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, threshold=3)
+
+    async def n_plus_one(db=Depends(get_db)):
+        def query(db):
+            for n in range(5):
+                db.execute(text("SELECT :n"), {"n": n})
+
+        await run_db(db, query)
+
+    app.add_api_route("/n-plus-one", n_plus_one)
+    response = TestClient(app).get("/n-plus-one")
+
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert 'desc="5 queries"' in response.headers["Server-Timing"]
+    (_, method, route, count, shape), _ = logger.warning.call_args
+    assert (method, count, shape) == ("GET", 5, "SELECT %(n)s")
+    assert route.endswith("n_plus_one")
+
+
+def test_query_budget(db, query_budget):
+    with query_budget(2) as stats:
+        db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+
+    assert stats.count == 2
+    assert stats.slowest_statement is not None
@@ -0,0 +1,54 @@
+# type: ignore
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy import exc
+
+from app.db.pool import InstrumentedQueuePool
+from app.db.pool import instrument_pool
+from app.db.pool import pool_size
+from app.settings import globals as g
+from app.utils.metrics import registry
+
+
+@pytest.mark.parametrize(
+    "workers,budget,max_overflow,expected",
+    [(4, 80, 0, 20), (17, 80, 0, 4), (17, 80, 2, 2), (200, 80, 0, 1)],
+)
+def test_pool_size_splits_the_connection_budget(
+    workers, budget, max_overflow, expected
+):
+    size = pool_size(workers, budget, max_overflow)
+
+    assert size == expected
+    assert workers * (size + max_overflow) <= max(budget, workers)
+
+
+@pytest.mark.usefixtures("test_db")
+def test_pool_exposes_checkout_gauges():
+    engine = create_engine(
+        g.DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    stats = instrument_pool(engine, "test")
+
+    try:
+        with engine.connect():
+            assert stats.in_use == 1
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        assert stats.in_use == 0
+        assert stats.checkouts == 2
+        assert stats.timeouts == 1
+        assert stats.max_wait_seconds >= 0.1
+
+        rendered = registry.render()
+        assert "# TYPE db_pool_in_use gauge" in rendered
+        assert 'db_pool_checkout_timeouts_total{pid="' in rendered
+        assert 'engine="test"} 1' in rendered
+    finally:
+        engine.dispose()
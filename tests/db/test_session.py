@@ -0,0 +1,56 @@
+# type: ignore
+import asyncio
+import time
+
+import pytest
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.cross.db import run_db
+from app.db.session import async_database_url
+from app.services.api import job_service
+from app.settings import globals as g
+
+
+SLOW_QUERY_SECONDS = 1.0
+
+
+@pytest.mark.usefixtures("test_db")
+def test_slow_queries_do_not_stall_the_loop():
+    async def load():
+        engine = create_async_engine(
+            async_database_url(g.DATABASE_URL), pool_size=10, max_overflow=0
+        )
+
+        async def slow_query():
+            async with AsyncSession(bind=engine) as db:
+                await db.execute(text(f"SELECT pg_sleep({SLOW_QUERY_SECONDS})"))
+
+        async def fast_request():
+            async with AsyncSession(bind=engine) as db:
+                start = time.monotonic()
+                await run_db(db, job_service.get_all)
+                return time.monotonic() - start
+
+        try:
+            slow = [asyncio.ensure_future(slow_query()) for _ in range(4)]
+            await asyncio.sleep(0.1)
+
+            # Fast requests run one at a time while the slow ones hold their
+            # connections; none of them should wait on a slow query.
+            start = time.monotonic()
+            fast_latencies = [await fast_request() for _ in range(20)]
+            fast_elapsed = time.monotonic() - start
+
+            await asyncio.gather(*slow)
+        finally:
+            await engine.dispose()
+
+        return fast_elapsed, max(fast_latencies)
+
+    fast_elapsed, worst_latency = asyncio.run(load())
+
+    assert fast_elapsed < SLOW_QUERY_SECONDS
+    assert worst_latency < SLOW_QUERY_SECONDS / 2
@@ -0,0 +1,107 @@
+# type: ignore
+import uuid
+
+import sqlalchemy as sa
+
+from app.models.api.job import JobCreate
+from app.models.orm.archive import candidates_archive
+from app.models.orm.candidate import Candidate, CandidateJobs
+from app.models.orm.job import Job
+from app.models.orm.user import User
+from app.repositories import candidate_repo, job_repo
+
+
+def test_create_needs_no_refresh(db, query_budget):
+    # the INSERT ... RETURNING and the commit
+    with query_budget(2):
+        job = job_repo.create(
+            db=db, obj_in=JobCreate(title="title", description="description")
+        )
+        assert job.id and job.created_at and job.updated_at
+
+
+def test_update_in_one_statement(db, query_budget):
+    job = job_repo.create(
+        db=db, obj_in=JobCreate(title="title", description="description")
+    )
+    db.expunge_all()
+
+    with query_budget(2):
+        updated = job_repo.update(
+            db=db, model_id=job.id, obj_in={"description": "changed", "nope": 1}
+        )
+        assert updated.description == "changed"
+        assert updated.title == "title"
+        assert updated.updated_at >= job.updated_at
+
+    assert db.query(Job).filter(Job.id == job.id).one().description == "changed"
+
+
+def test_update_refreshes_loaded_object(db):
+    job = job_repo.create(
+        db=db, obj_in=JobCreate(title="title", description="description")
+    )
+
+    job_repo.update(db=db, db_obj=job, obj_in={"title": "changed"})
+
+    assert job.title == "changed"
+
+
+def test_update_missing_row(db):
+    job = job_repo.create(
+        db=db, obj_in=JobCreate(title="title", description="description")
+    )
+    db.delete(job)
+    db.commit()
+
+    assert job_repo.update(db=db, model_id=job.id, obj_in={"title": "x"}) is None
+
+
+def create_attached_jobs(db, count):
+    user = User(username="remove", email="remove@email.com")
+    candidate = Candidate(
+        name="candidate",
+        email="candidate@testing.com",
+        linkedin_url="https://linkedin.com/in/candidate",
+        user=user,
+    )
+    jobs = [Job(title=f"job {n}", description=f"description {n}") for n in range(count)]
+    db.add_all([candidate, *jobs])
+    db.flush()
+    db.add_all(CandidateJobs(candidate_id=candidate.id, job_id=job.id) for job in jobs)
+    db.commit()
+    return candidate, jobs
+
+
+def test_remove(db, query_budget):
+    _, jobs = create_attached_jobs(db, 1)
+
+    with query_budget(2):
+        assert job_repo.remove(db=db, model_id=jobs[0].id)
+
+    assert not job_repo.remove(db=db, model_id=jobs[0].id)
+    assert db.query(CandidateJobs).count() == 0
+
+
+def test_remove_many(db):
+    _, jobs = create_attached_jobs(db, 3)
+    ids = [job.id for job in jobs[:2]]
+
+    assert set(job_repo.remove_many(db, ids + [uuid.uuid4()])) == set(ids)
+    assert db.query(Job.id).scalar() == jobs[2].id
+    assert db.query(CandidateJobs.job_id).scalar() == jobs[2].id
+
+
+def test_remove_where_archive(db):
+    candidate, _ = create_attached_jobs(db, 2)
+
+    removed = candidate_repo.remove_where(
+        db, Candidate.email == candidate.email, archive=True
+    )
+
+    assert removed == [candidate.id]
+    assert not db.query(Candidate).filter(Candidate.id == candidate.id).count()
+    assert not db.query(CandidateJobs).count()
+    archived = db.execute(sa.select(candidates_archive)).one()
+    assert archived.email == candidate.email
+    assert archived.archived_at
@@ -0,0 +1,137 @@
+# type: ignore
+import pytest
+
+from app.models.api.candidate import Candidate as CandidateDto
+from app.models.api.candidate import CandidateCreate
+from app.models.orm.candidate import Candidate
+from app.models.orm.job import Job
+from app.models.orm.user import User
+from app.repositories import cache as entity_cache_module
+from app.repositories import candidate_repo
+from app.repositories.base import BaseRepository
+from app.repositories.cache import EntityCache, entity_cache
+from app.utils.cache import MemoryCacheBackend
+
+
+@pytest.fixture(name="cache")
+def candidate_cache(monkeypatch):
+    cache = EntityCache(
+        "candidates", CandidateDto, MemoryCacheBackend(maxsize=10, ttl=60), ttl=60
+    )
+    monkeypatch.setattr(candidate_repo, "cache", cache)
+    return cache
+
+
+@pytest.fixture(name="user")
+def create_user(db):
+    user = User(username="cached", email="cached@email.com")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture(name="candidate")
+def create_candidate(db, user):
+    """A candidate stored without going through the repository, so not cached"""
+    candidate = Candidate(
+        name="candidate",
+        email="candidate@testing.com",
+        linkedin_url="https://linkedin.com/in/candidate",
+        user_id=user.id,
+    )
+    db.add(candidate)
+    db.commit()
+    return candidate
+
+
+def test_created_rows_are_cached(db, query_budget, cache, user):
+    candidate = candidate_repo.create_by_user_id(
+        user_id=user.id,
+        obj_in=CandidateCreate(
+            name="candidate",
+            email="candidate@testing.com",
+            linkedin_url="https://linkedin.com/in/candidate",
+        ),
+        db=db,
+    )
+
+    with query_budget(0):
+        snapshot = candidate_repo.find_cached(db=db, model_id=candidate.id)
+
+    assert snapshot == CandidateDto.from_orm(candidate)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_reads_go_through_the_cache(db, query_budget, cache, candidate):
+    with query_budget(1):
+        candidate_repo.find_cached(db=db, model_id=candidate.id)
+        candidate_repo.find_cached(db=db, model_id=candidate.id)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_updates_are_written_through(db, cache, candidate):
+    candidate_repo.update(db=db, model_id=candidate.id, obj_in={"name": "renamed"})
+
+    assert cache.get(candidate.id).name == "renamed"
+
+
+def test_removes_invalidate(db, cache, candidate):
+    candidate_repo.remove(db=db, model_id=candidate.id)
+
+    assert cache.get(candidate.id) is None
+    assert candidate_repo.find_cached(db=db, model_id=candidate.id) is None
+
+
+def test_not_cached_when_processes_dont_share_the_backend(monkeypatch):
+    monkeypatch.setattr(entity_cache_module, "CACHE_BACKEND", "memory")
+    assert entity_cache("candidates", CandidateDto) is None
+
+    monkeypatch.setattr(entity_cache_module, "CACHE_BACKEND", "redis")
+    monkeypatch.setattr(
+        entity_cache_module,
+        "create_backend",
+        lambda *args, **kwargs: MemoryCacheBackend(maxsize=10, ttl=60),
+    )
+    assert entity_cache("candidates", CandidateDto) is not None
+
+
+def test_reads_dont_overwrite_newer_snapshots(db, cache, candidate, monkeypatch):
+    find = candidate_repo.find
+
+    def find_then_update(db, model_id):
+        db_obj = find(db=db, model_id=model_id)
+        # An update lands between the read and its snapshot being cached
+        cache.set(model_id, CandidateDto.from_orm(db_obj).copy(update={"name": "new"}))
+        return db_obj
+
+    monkeypatch.setattr(candidate_repo, "find", find_then_update)
+
+    assert candidate_repo.find_cached(db=db, model_id=candidate.id).name == "candidate"
+    assert cache.get(candidate.id).name == "new"
+
+
+def test_reads_dont_restore_removed_rows(db, cache, candidate, monkeypatch):
+    find = candidate_repo.find
+
+    def find_then_remove(db, model_id):
+        db_obj = find(db=db, model_id=model_id)
+        # The row is removed between the read and its snapshot being cached
+        candidate_repo.remove(db=db, model_id=model_id)
+        return db_obj
+
+    monkeypatch.setattr(candidate_repo, "find", find_then_remove)
+
+    assert candidate_repo.find_cached(db=db, model_id=candidate.id).name == "candidate"
+    assert cache.get(candidate.id) is None
+
+
+def test_caching_needs_a_schema(db):
+    with pytest.raises(ValueError):
+        BaseRepository(Job, cache=True)
+
+    job = Job(title="job", description="description")
+    db.add(job)
+    db.flush()
+    # Without a schema there are no snapshots, only rows
+    assert BaseRepository(Job).find_cached(db=db, model_id=job.id) is job
@@ -0,0 +1,192 @@
+# type: ignore
+"""
+Local S3 stand-in for the upload tests and benchmarks: keeps objects in memory
+and answers the calls boto3 makes for simple and multipart uploads, HEAD, and
+browser uploads through presigned POST forms (checking their policy, not their
+signature). Every call takes a fixed `latency` plus the time the body would take
+at `bandwidth` bytes per second.
+"""
+import base64
+import cgi
+import json
+import threading
+import time
+import typing
+import uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import boto3
+from botocore.config import Config
+
+
+def _checksum_options() -> typing.Dict[str, str]:
+    # botocore 1.36+ adds CRC checksums to every upload unless told otherwise,
+    # older versions don't know the options
+    return {
+        option: "when_required"
+        for option in ("request_checksum_calculation", "response_checksum_validation")
+        if option in Config.OPTION_DEFAULTS
+    }
+
+
+class S3StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.02, bandwidth: float = 50e6):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.objects: typing.Dict[str, bytes] = {}
+        self.content_types: typing.Dict[str, str] = {}
+        self.uploads: typing.Dict[str, typing.Dict[int, bytes]] = {}
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def client(self):
+        return boto3.client(
+            "s3",
+            endpoint_url=self.url,
+            region_name="us-east-1",
+            aws_access_key_id="stand-in",
+            aws_secret_access_key="stand-in",
+            config=Config(s3={"addressing_style": "path"}, **_checksum_options()),
+        )
+
+    def __enter__(self) -> "S3StandIn":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: S3StandIn
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _body(self) -> bytes:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.server.latency + len(body) / self.server.bandwidth)
+        return body
+
+    def _reply(self, status: int = 200, body: bytes = b"", **headers: str) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _target(self) -> typing.Tuple[str, typing.Dict[str, typing.List[str]]]:
+        url = urlparse(self.path)
+        return url.path, parse_qs(url.query, keep_blank_values=True)
+
+    def do_PUT(self) -> None:
+        key, query = self._target()
+        body = self._body()
+        if "uploadId" in query:
+            upload_id = query["uploadId"][0]
+            self.server.uploads[upload_id][int(query["partNumber"][0])] = body
+        else:
+            self.server.objects[key] = body
+            self.server.content_types[key] = self.headers.get("Content-Type", "")
+        self._reply(ETag=f'"{uuid.uuid4().hex}"')
+
+    def do_POST(self) -> None:
+        key, query = self._target()
+        if self.headers.get_content_type() == "multipart/form-data":
+            self._form_upload(key)
+            return
+        self._body()
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            self.server.uploads[upload_id] = {}
+            self._reply(
+                body=b"<InitiateMultipartUploadResult><UploadId>%s</UploadId>"
+                b"</InitiateMultipartUploadResult>" % upload_id.encode()
+            )
+            return
+        parts = self.server.uploads.pop(query["uploadId"][0])
+        self.server.objects[key] = b"".join(parts[n] for n in sorted(parts))
+        self._reply(
+            body=b"<CompleteMultipartUploadResult><ETag>&quot;%s&quot;</ETag>"
+            b"</CompleteMultipartUploadResult>" % uuid.uuid4().hex.encode()
+        )
+
+    def _form_upload(self, bucket: str) -> None:
+        form = cgi.FieldStorage(
+            fp=self.rfile, headers=self.headers, environ={"REQUEST_METHOD": "POST"},
+        )
+        fields = {name: form.getfirst(name) for name in form.keys() if name != "file"}
+        body = form["file"].value
+        time.sleep(self.server.latency + len(body) / self.server.bandwidth)
+
+        policy = json.loads(base64.b64decode(fields["policy"]))
+        for condition in policy["conditions"]:
+            if isinstance(condition, dict):
+                ((name, value),) = condition.items()
+                if name != "bucket" and fields.get(name) != value:
+                    self._reply(403, b"<Error><Code>AccessDenied</Code></Error>")
+                    return
+            elif condition[0] == "content-length-range":
+                if not condition[1] <= len(body) <= condition[2]:
+                    self._reply(400, b"<Error><Code>EntityTooLarge</Code></Error>")
+                    return
+
+        key = f"{bucket}/{fields['key']}"
+        self.server.objects[key] = body
+        self.server.content_types[key] = fields.get("Content-Type", "")
+        self._reply(204)
+
+    def do_DELETE(self) -> None:
+        key, query = self._target()
+        self._body()
+        if "uploadId" in query:
+            self.server.uploads.pop(query["uploadId"][0], None)
+        else:
+            self.server.objects.pop(key, None)
+        self._reply(204)
+
+    def do_GET(self) -> None:
+        key, _ = self._target()
+        body = self.server.objects.get(key)
+        if body is None:
+            self._reply(404, b"<Error><Code>NoSuchKey</Code></Error>")
+            return
+        time.sleep(self.server.latency + len(body) / self.server.bandwidth)
+        byte_range = self.headers.get("Range")
+        if byte_range:
+            start, end = byte_range.split("=")[1].split("-")
+            end = min(int(end or len(body) - 1), len(body) - 1)
+            self._reply(
+                206,
+                body[int(start) : end + 1],
+                Content_Range=f"bytes {start}-{end}/{len(body)}",
+            )
+            return
+        self._reply(body=body)
+
+    def do_HEAD(self) -> None:
+        key, _ = self._target()
+        time.sleep(self.server.latency)
+        if key not in self.server.objects:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.server.objects[key])))
+        content_type = self.server.content_types.get(key)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("ETag", '"stand-in"')
+        self.end_headers()
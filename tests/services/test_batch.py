@@ -0,0 +1,147 @@
+# type: ignore
+import pytest
+
+from fastapi import HTTPException
+
+from app.models.api.candidate import CandidateCreate
+from app.models.api.job import JobCreate
+from app.models.api.util.response import BatchStatus
+from app.models.orm.job import Job
+from app.models.orm.user import User
+from app.repositories import base, candidate_repo, job_repo
+from app.services.api import batch, candidate_service, job_service
+
+
+def job(n):
+    return JobCreate(title=f"job {n}", description=f"description {n}")
+
+
+def test_create_many_in_one_statement(db, query_budget):
+    # the INSERT and the commit
+    with query_budget(2):
+        jobs = job_repo.create_many(db=db, objs_in=[job(n) for n in range(50)])
+
+    assert len(jobs) == 50
+    assert all(j.id and j.created_at for j in jobs)
+    assert db.query(Job).count() == 50
+
+
+def test_create_many_through_copy(db, monkeypatch):
+    monkeypatch.setattr(base, "BULK_COPY_THRESHOLD", 10)
+    job_repo.create_many(db=db, objs_in=[job(1)])
+
+    jobs = job_repo.create_many(
+        db=db,
+        objs_in=[job(n) for n in range(20)]
+        + [JobCreate(title="tab\there", description="new\nline \\N")],
+        skip_conflicts=True,
+    )
+
+    assert len(jobs) == 20
+    assert "job 1" not in {j.title for j in jobs}
+    stored = db.query(Job).filter(Job.title == "tab\there").one()
+    assert stored.description == "new\nline \\N"
+
+
+def test_create_many_copies_json_values(db, monkeypatch):
+    monkeypatch.setattr(base, "BULK_COPY_THRESHOLD", 1)
+    user = User(username="copy", email="copy@email.com")
+    db.add(user)
+    db.commit()
+    variants = {"thumb": "avatars/a\tb.webp", "sizes": [64, 256]}
+
+    (candidate,) = candidate_repo.create_many(
+        db=db,
+        objs_in=[
+            CandidateCreate(
+                name="copied",
+                email="copied@testing.com",
+                linkedin_url="https://linkedin.com/in/copied",
+            )
+        ],
+        values={"user_id": user.id, "avatar_variants": variants},
+    )
+
+    assert candidate.avatar_variants == variants
+
+
+def test_upsert_many(db):
+    job_repo.create_many(db=db, objs_in=[job(1), job(2)])
+
+    jobs = job_repo.upsert_many(
+        db=db,
+        objs_in=[
+            JobCreate(title="job 2", description="changed"),
+            job(3),
+            JobCreate(title="job 3", description="changed twice"),
+        ],
+        index_elements=["title"],
+    )
+
+    assert {(j.title, j.description) for j in jobs} == {
+        ("job 2", "changed"),
+        ("job 3", "changed twice"),
+    }
+    assert db.query(Job).count() == 3
+
+
+def test_job_batch_reports_conflicts(db):
+    job_service.create(job=job(1), db=db)
+
+    result = job_service.create_batch(jobs=[job(1), job(2), job(2)], db=db)
+
+    assert [item.status for item in result.data] == [
+        BatchStatus.conflict,
+        BatchStatus.created,
+        BatchStatus.conflict,
+    ]
+    assert result.data[1].data.title == "job 2"
+    assert [item.index for item in result.data] == [0, 1, 2]
+
+
+def test_batch_matches_items_on_every_unique_column(db):
+    job_service.create(job=job(1), db=db)
+
+    result = job_service.create_batch(
+        jobs=[
+            JobCreate(title="new", description="description 1"),
+            JobCreate(title="new", description="other"),
+        ],
+        db=db,
+    )
+
+    assert [item.status for item in result.data] == [
+        BatchStatus.conflict,
+        BatchStatus.created,
+    ]
+    assert result.data[1].data.description == "other"
+
+
+def test_candidate_batch(db):
+    user = User(username="batch", email="batch@email.com")
+    db.add(user)
+    db.commit()
+    candidates = [
+        CandidateCreate(
+            name=f"candidate {n}",
+            email=f"candidate{n}@testing.com",
+            linkedin_url=f"https://linkedin.com/in/candidate{n}",
+        )
+        for n in range(3)
+    ]
+
+    result = candidate_service.create_batch(
+        user_id=user.id, candidates=candidates, db=db
+    )
+
+    assert {item.status for item in result.data} == {BatchStatus.created}
+    assert len(candidate_service.get_user_candidates(user_id=user.id, db=db)) == 3
+
+
+def test_batch_size_limit(db, monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_MAX_ITEMS", 2)
+
+    with pytest.raises(HTTPException) as error:
+        job_service.create_batch(jobs=[job(n) for n in range(3)], db=db)
+
+    assert error.value.status_code == 413
@@ -1,8 +1,31 @@
 # type: ignore
-from app.models.api.candidate import CandidateCreate
+import asyncio
+import io
+import threading
+import time
+import uuid
+
+import pytest
+import requests
+
+from PIL import Image
+
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+from app.models.api.candidate import Candidate as CandidateDto, CandidateCreate
+from app.models.orm.candidate import Candidate, CandidateJobs
+from app.models.orm.job import Job
+from app.models.orm.task import Task
 from app.models.orm.user import User
 from app.services.api import candidate_service
 from app.repositories import candidate_repo
+from app.repositories.exceptions import RecordNotFound
+from app.utils import file_management as file_management_module
+from app.utils.file_management import FileManagement
+from app.utils.images import AVATAR_VARIANTS, render_variants
+
+from tests.s3 import S3StandIn
 
 
 def test_create_candidate(db):
@@ -20,3 +43,359 @@ def test_create_candidate(db):
     candidate_service.create(user_id=test_user.id, db=db, candidate=test_candidate)
 
     assert candidate_repo.find_multi(db)
+
+
+def create_candidates_with_jobs(db, count):
+    user = User(username=f"user{count}", email=f"user{count}@email.com")
+    candidates = [
+        Candidate(
+            name=f"candidate {n}",
+            email=f"candidate{n}@testing.com",
+            linkedin_url=f"https://linkedin.com/in/candidate{n}",
+            user=user,
+        )
+        for n in range(count)
+    ]
+    jobs = [Job(title=f"job {n}", description=f"description {n}") for n in range(3)]
+    db.add_all([*candidates, *jobs])
+    db.flush()
+    db.add_all(
+        CandidateJobs(candidate_id=candidate.id, job_id=job.id)
+        for candidate in candidates
+        for job in jobs
+    )
+    db.flush()
+    db.expunge_all()
+    return user
+
+
+@pytest.mark.parametrize("count", [1, 20])
+def test_candidates_with_jobs_in_constant_queries(db, query_budget, count):
+    user = create_candidates_with_jobs(db, count)
+
+    # the candidates, then their jobs
+    with query_budget(2):
+        candidates = candidate_service.get_user_candidates(
+            user_id=user.id, db=db, profile="with_jobs"
+        )
+
+    assert len(candidates) == count
+    assert all(len(candidate.jobs) == 3 for candidate in candidates)
+    assert candidates[0].jobs[0].job.title.startswith("job")
+
+
+def test_user_candidates_skip_the_orm(db, query_budget):
+    user = create_candidates_with_jobs(db, 3)
+    expected = {
+        candidate.id: CandidateDto.from_orm(candidate)
+        for candidate in db.query(Candidate).filter(Candidate.user_id == user.id)
+    }
+    db.expunge_all()
+
+    with query_budget(1):
+        candidates = candidate_service.get_user_candidates(user_id=user.id, db=db)
+
+    assert not db.identity_map
+    assert {candidate.id: candidate for candidate in candidates} == expected
+
+
+def test_user_candidates_sparse_fields(db, query_budget):
+    user = create_candidates_with_jobs(db, 3)
+
+    with query_budget(1) as stats:
+        candidates = candidate_service.get_user_candidates(
+            user_id=user.id, db=db, fields=["name", "email"]
+        )
+
+    assert "linkedin_url" not in next(iter(stats.shapes))
+    assert sorted(candidates, key=lambda c: c["name"])[0] == {
+        "name": "candidate 0",
+        "email": "candidate0@testing.com",
+    }
+
+
+def test_user_candidate_is_scoped_to_its_user(db):
+    owner = create_candidates_with_jobs(db, 1)
+    other = User(username="other", email="other@email.com")
+    db.add(other)
+    db.commit()
+    candidate_id = db.query(Candidate.id).filter(Candidate.user_id == owner.id).scalar()
+
+    candidate = candidate_service.get_user_candidate(
+        user_id=owner.id, candidate_id=candidate_id, db=db, profile="with_jobs"
+    )
+
+    assert len(candidate.jobs) == 3
+    with pytest.raises(RecordNotFound):
+        candidate_service.get_user_candidate(
+            user_id=other.id, candidate_id=candidate_id, db=db, profile="with_jobs"
+        )
+
+
+def test_unknown_profile(db):
+    with pytest.raises(ValueError):
+        candidate_repo.find_multi(db, profile="with_everything")
+
+
+class FakeS3:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.objects = {}
+
+    def upload_fileobj(self, file, bucket, key, **_kwargs):
+        body = b""
+        while True:
+            chunk = file.read(1024)
+            if not chunk:
+                break
+            body += chunk
+            if self.fail:
+                raise ConnectionError("S3 is down")
+        self.objects[(bucket, key)] = body
+
+
+@pytest.fixture(name="s3")
+def fake_s3(monkeypatch):
+    def use(**kwargs):
+        client = FakeS3(**kwargs)
+        monkeypatch.setattr(
+            file_management_module.file_management, "_s3", client, raising=False
+        )
+        return client
+
+    return use
+
+
+def upload_avatar(db, candidate_id, body):
+    file = UploadFile("avatar.jpg", io.BytesIO(body), content_type="image/jpeg")
+    return asyncio.run(
+        candidate_service.set_candidate_avatar(
+            candidate_id=candidate_id, file=file, db=db
+        )
+    )
+
+
+def create_candidate(db):
+    user = User(username="avatar", email="avatar@email.com")
+    candidate = Candidate(
+        name="avatar", email="avatar@testing.com", linkedin_url="avatar", user=user
+    )
+    db.add(candidate)
+    db.commit()
+    return candidate
+
+
+def test_set_candidate_avatar(db, s3):
+    client = s3()
+    candidate = create_candidate(db)
+
+    path = upload_avatar(db, candidate.id, b"\xff\xd8" * 100)
+
+    assert client.objects[("fastapi-starter", path)] == b"\xff\xd8" * 100
+    assert candidate_repo.find(db, candidate.id).avatar_path == path
+    (task,) = db.query(Task).filter(Task.name == "process_avatar").all()
+    assert task.payload == {"candidate_id": str(candidate.id), "file_name": path}
+
+
+def test_avatar_size_is_limited_while_uploading(db, s3, monkeypatch):
+    client = s3()
+    monkeypatch.setattr("app.services.api.candidate.AVATAR_MAX_BYTES", 1000)
+    candidate = create_candidate(db)
+
+    with pytest.raises(HTTPException) as exc_info:
+        upload_avatar(db, candidate.id, b"\xff" * 1001)
+
+    assert exc_info.value.status_code == 413
+    assert not client.objects
+    assert candidate_repo.find(db, candidate.id).avatar_path is None
+
+
+def test_failed_avatar_upload_keeps_the_candidate(db, s3):
+    s3(fail=True)
+    candidate = create_candidate(db)
+
+    with pytest.raises(ConnectionError):
+        upload_avatar(db, candidate.id, b"\xff" * 2000)
+
+    assert candidate_repo.find(db, candidate.id).avatar_path is None
+
+
+def test_uploads_are_bounded_by_the_pool():
+    class SlowS3:
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.running = 0
+            self.most = 0
+
+        def upload_fileobj(self, file, *_args, **_kwargs):
+            with self.lock:
+                self.running += 1
+                self.most = max(self.most, self.running)
+            file.read()
+            time.sleep(0.02)
+            with self.lock:
+                self.running -= 1
+
+    client = SlowS3()
+    files = FileManagement(client=client, max_workers=2)
+
+    async def upload_many():
+        await asyncio.gather(
+            *(
+                files.upload_file_async(io.BytesIO(b"x"), f"{n}", "bucket", 10)
+                for n in range(6)
+            )
+        )
+
+    asyncio.run(upload_many())
+    assert client.most == 2
+
+
+@pytest.fixture(name="stand_in")
+def s3_stand_in(monkeypatch):
+    with S3StandIn(latency=0) as s3:
+        monkeypatch.setattr(
+            file_management_module.file_management, "_s3", s3.client(), raising=False
+        )
+        yield s3
+
+
+@pytest.mark.usefixtures("stand_in")
+def test_presigned_avatar_upload(db):
+    candidate = create_candidate(db)
+
+    upload = candidate_service.request_avatar_upload(
+        candidate_id=candidate.id, content_type="image/jpeg", db=db
+    )
+    response = requests.post(
+        upload.url, data=upload.form_fields, files={"file": b"\xff\xd8" * 100}
+    )
+    assert response.status_code == 204
+    assert candidate_repo.find(db, candidate.id).avatar_path is None
+    # Uploaded next to the recorded avatar, not over it
+    assert upload.path.startswith(f"images/candidates/{candidate.id}/")
+    assert upload.path != candidate_service.generate_avatar_path(candidate)
+
+    path = asyncio.run(
+        candidate_service.confirm_avatar_upload(
+            candidate_id=candidate.id, file_name=upload.path, db=db
+        )
+    )
+
+    assert path == upload.path
+    assert candidate_repo.find(db, candidate.id).avatar_path == path
+    another = candidate_service.request_avatar_upload(
+        candidate_id=candidate.id, content_type="image/jpeg", db=db
+    )
+    assert another.path != upload.path
+
+
+@pytest.mark.usefixtures("stand_in")
+def test_presigned_upload_conditions(db, monkeypatch):
+    monkeypatch.setattr("app.services.api.candidate.AVATAR_MAX_BYTES", 1000)
+    candidate = create_candidate(db)
+    upload = candidate_service.request_avatar_upload(
+        candidate_id=candidate.id, content_type="image/jpeg", db=db
+    )
+
+    too_large = requests.post(
+        upload.url, data=upload.form_fields, files={"file": b"\xff" * 1001}
+    )
+    other_type = requests.post(
+        upload.url,
+        data={**upload.form_fields, "Content-Type": "text/html"},
+        files={"file": b"<script>"},
+    )
+
+    assert too_large.status_code == 400
+    assert other_type.status_code == 403
+    with pytest.raises(ValueError):
+        candidate_service.request_avatar_upload(
+            candidate_id=candidate.id, content_type="text/html", db=db
+        )
+
+
+@pytest.mark.usefixtures("stand_in")
+def test_confirm_without_upload(db):
+    candidate = create_candidate(db)
+    upload = candidate_service.request_avatar_upload(
+        candidate_id=candidate.id, content_type="image/jpeg", db=db
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(
+            candidate_service.confirm_avatar_upload(
+                candidate_id=candidate.id, file_name=upload.path, db=db
+            )
+        )
+
+    assert exc_info.value.status_code == 404
+    assert candidate_repo.find(db, candidate.id).avatar_path is None
+
+
+@pytest.mark.usefixtures("stand_in")
+@pytest.mark.parametrize(
+    "file_name",
+    [
+        "images/candidates/{other}/{other}_avatar_" + "0" * 32,
+        "images/candidates/{id}/{id}_avatar",
+        "images/candidates/{id}/{id}_avatar_../../secrets",
+    ],
+)
+def test_confirm_only_the_candidates_uploads(db, file_name):
+    candidate = create_candidate(db)
+    file_name = file_name.format(id=candidate.id, other=uuid.uuid4())
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(
+            candidate_service.confirm_avatar_upload(
+                candidate_id=candidate.id, file_name=file_name, db=db
+            )
+        )
+
+    assert exc_info.value.status_code == 422
+
+
+def jpeg(width, height):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(output, "JPEG")
+    return output.getvalue()
+
+
+def test_render_variants():
+    rendered = render_variants(jpeg(1200, 800))
+
+    assert set(rendered) == set(AVATAR_VARIANTS)
+    for name, data in rendered.items():
+        image = Image.open(io.BytesIO(data))
+        variant = AVATAR_VARIANTS[name]
+        assert image.format == variant.format
+        assert max(image.size) == variant.size
+        assert image.size[0] > image.size[1]
+
+
+@pytest.mark.usefixtures("stand_in")
+def test_avatar_variants_pipeline(db):
+    candidate = create_candidate(db)
+    path = upload_avatar(db, candidate.id, jpeg(1024, 1024))
+    client = file_management_module.file_management.s3
+
+    variants = asyncio.run(
+        candidate_service.render_avatar_variants(
+            candidate_id=candidate.id, file_name=path
+        )
+    )
+    candidate_service.record_avatar_variants(
+        candidate_id=candidate.id, variants=variants, db=db
+    )
+
+    assert candidate_repo.find(db, candidate.id).avatar_variants == variants
+    assert variants["thumb"] == f"{path}_thumb.jpg"
+    thumb = client.head_object(Bucket="fastapi-starter", Key=variants["thumb"])
+    assert thumb["ContentType"] == "image/jpeg"
+    webp = client.head_object(Bucket="fastapi-starter", Key=variants["webp"])
+    assert webp["ContentType"] == "image/webp"
+
+    # A new avatar leaves the outdated variants out until it's processed
+    upload_avatar(db, candidate.id, jpeg(512, 512))
+    assert candidate_repo.find(db, candidate.id).avatar_variants is None
@@ -0,0 +1,49 @@
+# type: ignore
+import csv
+import io
+import json
+
+from app.db.instrumentation import capture_queries
+from app.models.orm.job import Job
+from app.repositories import job_repo
+from app.services.api import job_service
+from app.services.api.export import ExportFormat
+
+
+def create_jobs(db, count):
+    db.add_all(
+        Job(title=f"job {n}", description=f"description {n}") for n in range(count)
+    )
+    db.flush()
+
+
+def test_export_ndjson(db):
+    create_jobs(db, 25)
+
+    chunks = list(job_service.export(export_format=ExportFormat.ndjson, db=db))
+    lines = b"".join(chunks).decode().splitlines()
+
+    assert len(lines) == 25
+    assert {json.loads(line)["title"] for line in lines} == {
+        f"job {n}" for n in range(25)
+    }
+
+
+def test_export_csv(db):
+    create_jobs(db, 25)
+
+    chunks = list(job_service.export(export_format=ExportFormat.csv, db=db))
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert len(rows) == 25
+    assert set(rows[0]) == {"id", "created_at", "updated_at", "title", "description"}
+
+
+def test_stream_reads_batches_from_a_single_cursor(db):
+    create_jobs(db, 25)
+
+    with capture_queries() as stats:
+        batches = list(job_repo.stream(db, Job.title != "job 0", batch_size=10))
+
+    assert [len(batch) for batch in batches] == [10, 10, 4]
+    assert stats.count == 1
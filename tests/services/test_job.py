@@ -0,0 +1,119 @@
+# type: ignore
+import uuid
+
+import pytest
+
+from starlette.testclient import TestClient
+
+from app.cross.db import get_db
+from app.main import app
+from app.models.orm.candidate import Candidate, CandidateJobs
+from app.models.orm.job import Job
+from app.models.orm.user import User
+from app.repositories.exceptions import RecordNotFound
+from app.services.api import candidate_service, job_service
+
+
+@pytest.fixture(name="candidates")
+def create_candidates(db):
+    user = User(username="attach", email="attach@email.com")
+    candidates = [
+        Candidate(
+            name=f"candidate {n}",
+            email=f"candidate{n}@testing.com",
+            linkedin_url=f"https://linkedin.com/in/candidate{n}",
+            user=user,
+        )
+        for n in range(30)
+    ]
+    db.add_all(candidates)
+    db.flush()
+    return candidates
+
+
+@pytest.fixture(name="jobs")
+def create_jobs(db):
+    jobs = [Job(title=f"job {n}", description=f"description {n}") for n in range(5)]
+    db.add_all(jobs)
+    db.flush()
+    return jobs
+
+
+def test_attach_candidates_in_one_statement(db, query_budget, candidates, jobs):
+    job_id = jobs[0].id
+    job_service.attach_candidates(
+        job_id=job_id, candidate_ids=[candidates[0].id], db=db
+    )
+    db.expunge_all()
+
+    # the INSERT ... SELECT and the commit, however many candidates the job has
+    with query_budget(2):
+        attached = job_service.attach_candidates(
+            job_id=job_id,
+            candidate_ids=[c.id for c in candidates] + [uuid.uuid4()],
+            db=db,
+        )
+
+    assert len(attached) == len(candidates) - 1
+    assert {a.job_id for a in attached} == {job_id}
+    assert db.query(CandidateJobs).filter(CandidateJobs.job_id == job_id).count() == 30
+
+
+def test_attach_and_detach_jobs(db, candidates, jobs):
+    candidate_id = candidates[0].id
+    job_ids = [job.id for job in jobs]
+
+    attached = candidate_service.attach_jobs(
+        candidate_id=candidate_id, job_ids=job_ids, db=db
+    )
+    assert {a.job_id for a in attached} == set(job_ids)
+
+    detached = candidate_service.detach_jobs(
+        candidate_id=candidate_id, job_ids=job_ids[:2], db=db
+    )
+    assert {a.job_id for a in detached} == set(job_ids[:2])
+    remaining = db.query(CandidateJobs.job_id).filter(
+        CandidateJobs.candidate_id == candidate_id
+    )
+    assert {job_id for job_id, in remaining} == set(job_ids[2:])
+
+
+def test_attach_one_job(db, candidates, jobs):
+    candidate_id = candidates[0].id
+
+    for _ in range(2):
+        candidate_service.add_job(candidate_id=candidate_id, job_id=jobs[0].id, db=db)
+    with pytest.raises(RecordNotFound):
+        candidate_service.add_job(candidate_id=candidate_id, job_id=uuid.uuid4(), db=db)
+
+    attached = db.query(CandidateJobs).filter(
+        CandidateJobs.candidate_id == candidate_id
+    )
+    assert attached.count() == 1
+
+
+def test_jobs_sparse_fields(db, jobs):
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+    try:
+        sparse = client.get("/v1/job/", params={"fields": "title,id"})
+        unknown = client.get("/v1/job/", params={"fields": "title,salary"})
+        full = client.get("/v1/job/")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert sparse.status_code == 200
+    assert sorted(sparse.json(), key=lambda job: job["title"])[0] == {
+        "title": "job 0",
+        "id": str(jobs[0].id),
+    }
+    assert sparse.headers["etag"] != full.headers["etag"]
+    assert unknown.status_code == 400
+    assert "salary" in unknown.json()["detail"]
+    assert set(full.json()[0]) == {
+        "id",
+        "created_at",
+        "updated_at",
+        "title",
+        "description",
+    }
@@ -0,0 +1,115 @@
+# type: ignore
+import pytest
+
+from fastapi import HTTPException
+
+from app.db.instrumentation import capture_queries
+from app.models.orm.job import Job
+from app.services.api import pagination
+from app.services.api.pagination import Paginate
+
+
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    pagination.exact_counts.clear()
+
+
+@pytest.fixture(name="jobs")
+def create_jobs(db):
+    jobs = [Job(title=f"job {n}", description=f"description {n}") for n in range(25)]
+    db.add_all(jobs)
+    db.flush()
+    return sorted(jobs, key=lambda job: (job.created_at, job.id))
+
+
+@pytest.mark.usefixtures("jobs")
+def test_offset_pagination(db):
+    page = Paginate(page=3, page_size=10)(db.query(Job))
+
+    assert len(page.data) == 5
+    assert page.meta.total == 25
+    assert page.meta.total_exact
+    assert page.meta.total_pages == 3
+    assert page.meta.next_page is None
+    assert page.meta.prev_page == 2
+
+
+def test_cursor_pagination_walks_forward_and_back(db, jobs):
+    scope = db.query(Job)
+    first = Paginate(mode="cursor", page_size=10)(scope)
+
+    assert first.data == jobs[:10]
+    assert first.meta.prev is None
+    assert first.meta.total is None
+
+    with capture_queries() as stats:
+        second = Paginate(page_size=10, cursor=first.meta.next)(scope)
+    third = Paginate(page_size=10, cursor=second.meta.next)(scope)
+
+    assert stats.count == 1
+    assert "OFFSET" not in next(iter(stats.shapes))
+    assert second.data == jobs[10:20]
+    assert third.data == jobs[20:]
+    assert third.meta.next is None
+
+    back = Paginate(page_size=10, cursor=third.meta.prev)(scope)
+    assert back.data == jobs[10:20]
+    assert back.meta.next == second.meta.next
+
+    start = Paginate(page_size=10, cursor=back.meta.prev)(scope)
+    assert start.data == jobs[:10]
+    assert start.meta.prev is None
+
+
+@pytest.mark.usefixtures("jobs")
+def test_cursor_pagination_counts_on_request(db):
+    page = Paginate(mode="cursor", page_size=10, count="exact")(db.query(Job))
+
+    assert page.meta.total == 25
+    assert page.meta.total_pages == 3
+    assert page.meta.total_exact
+
+
+@pytest.mark.usefixtures("jobs")
+def test_exact_counts_are_cached_per_filter(db):
+    paginate = Paginate(page_size=10)
+    titled = db.query(Job).filter(Job.title == "job 1")
+
+    assert paginate(titled).meta.total == 1
+    db.add(Job(title="job 25", description="description 25"))
+    db.flush()
+
+    with capture_queries() as stats:
+        assert paginate(titled).meta.total == 1
+    assert paginate(db.query(Job).filter(Job.title != "job 1")).meta.total == 25
+    assert stats.count == 1
+
+
+@pytest.mark.usefixtures("jobs")
+def test_estimated_counts(db):
+    filtered = Paginate(page_size=10, count="estimated")(
+        db.query(Job).filter(Job.title.like("job%"))
+    )
+    unfiltered = Paginate(page_size=10, count="estimated")(db.query(Job))
+
+    assert filtered.meta.total_exact is False
+    assert filtered.meta.total >= 1
+    assert unfiltered.meta.total_exact is False
+    assert unfiltered.meta.total >= 0
+    assert unfiltered.meta.next_page == 2
+
+
+@pytest.mark.usefixtures("jobs")
+def test_count_none(db):
+    page = Paginate(page=3, page_size=10, count="none")(db.query(Job))
+
+    assert page.meta.total is None
+    assert page.meta.next_page is None
+    assert len(page.data) == 5
+
+
+def test_invalid_cursor(db):
+    with pytest.raises(HTTPException) as error:
+        Paginate(cursor="not-a-cursor")(db.query(Job))
+
+    assert error.value.status_code == 400
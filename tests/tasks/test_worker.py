@@ -0,0 +1,168 @@
+# type: ignore
+import asyncio
+import contextlib
+import datetime
+import uuid
+
+import pytest
+
+from sqlalchemy.orm import Session
+
+from app.models.orm.task import Task, TaskStatus
+from app.repositories import task_repo
+from app.tasks import enqueue, register, registry
+from app.tasks.worker import Worker
+
+
+@pytest.fixture(name="tasks")
+def task_registry():
+    registered = dict(registry)
+    yield register
+    registry.clear()
+    registry.update(registered)
+
+
+@pytest.fixture(name="worker")
+def fixture_worker(db):
+    @contextlib.asynccontextmanager
+    async def session_scope():
+        yield db
+
+    return Worker(concurrency=10, session_scope=session_scope)
+
+
+def queued(db, name):
+    return db.query(Task).filter(Task.name == name).order_by(Task.priority).all()
+
+
+def test_runs_due_tasks_by_priority(db, tasks, worker):
+    ran = []
+
+    async def record(item_id: uuid.UUID, label: str):
+        assert isinstance(item_id, uuid.UUID)
+        ran.append(label)
+
+    tasks("record", record)
+    item_id = uuid.uuid4()
+    for label, priority in (("low", 5), ("urgent", -1), ("normal", 0)):
+        enqueue(db, "record", priority=priority, item_id=item_id, label=label)
+    enqueue(db, "record", delay=60, item_id=item_id, label="later")
+    db.commit()
+
+    assert asyncio.run(worker.run_once()) == 3
+    assert ran == ["urgent", "normal", "low"]
+    # Done tasks are removed, the delayed one waits
+    assert [task.payload["label"] for task in queued(db, "record")] == ["later"]
+
+
+def test_failed_tasks_are_retried_with_backoff(db, tasks, worker):
+    def flaky():
+        raise ConnectionError("try again")
+
+    tasks("flaky", flaky, max_attempts=2)
+    enqueue(db, "flaky")
+    db.commit()
+
+    asyncio.run(worker.run_once())
+    (task,) = queued(db, "flaky")
+    assert task.status == TaskStatus.queued
+    assert task.attempts == 1
+    assert "try again" in task.last_error
+    assert task.run_at > datetime.datetime.utcnow()
+    assert asyncio.run(worker.run_once()) == 0
+
+    db.query(Task).filter(Task.id == task.id).update({"run_at": task.created_at})
+    db.commit()
+    asyncio.run(worker.run_once())
+    db.refresh(task)
+    assert task.status == TaskStatus.failed
+    assert task.attempts == 2
+
+
+def test_task_concurrency_limit(db, tasks, worker):
+    running, most = [], 0
+
+    async def resize():
+        nonlocal most
+        running.append(resize)
+        most = max(most, len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    tasks("resize", resize, concurrency=1)
+    tasks("noop", lambda: None)
+    for _ in range(3):
+        enqueue(db, "resize")
+    enqueue(db, "noop")
+    db.commit()
+
+    # Each batch only claims the resize it has a slot for
+    assert [asyncio.run(worker.run_once()) for _ in range(3)] == [2, 1, 1]
+    assert most == 1
+    assert not queued(db, "resize")
+
+
+def test_enqueue_is_part_of_the_transaction(test_db, tasks):
+    tasks("noop", lambda: None)
+    with Session(bind=test_db) as db:
+        enqueue(db, "noop")
+        db.rollback()
+        assert not queued(db, "noop")
+
+    with pytest.raises(ValueError):
+        enqueue(db, "not registered")
+
+
+def test_claims_skip_locked_tasks(test_db):
+    name = f"skip-{uuid.uuid4()}"
+    first, second = Session(bind=test_db), Session(bind=test_db)
+    try:
+        ids = [
+            task_repo.enqueue(first, name=name, payload={}, max_attempts=1)
+            for _ in range(2)
+        ]
+        first.commit()
+        # Another worker is in the middle of claiming the first task
+        first.query(Task).filter(Task.id == ids[0]).with_for_update().one()
+
+        claimed = task_repo.claim(second, limit=10, lock_timeout=600)
+
+        assert [task.id for task in claimed if task.name == name] == [ids[1]]
+    finally:
+        first.rollback()
+        second.query(Task).filter(Task.name == name).delete()
+        second.commit()
+        first.close()
+        second.close()
+
+
+def test_claims_respect_caps(db, tasks):
+    tasks("capped", lambda: None)
+    tasks("other", lambda: None)
+    for _ in range(3):
+        enqueue(db, "capped")
+        enqueue(db, "other")
+    db.commit()
+
+    claimed = task_repo.claim(db, limit=10, lock_timeout=600, caps={"capped": 2})
+    assert sorted(task.name for task in claimed) == ["capped"] * 2 + ["other"] * 3
+
+    claimed = task_repo.claim(db, limit=10, lock_timeout=600, caps={"capped": 0})
+    assert claimed == []
+
+
+def test_stale_tasks_are_claimed_until_out_of_attempts(db, tasks):
+    tasks("stuck", lambda: None, max_attempts=2)
+    enqueue(db, "stuck")
+    db.commit()
+    (task,) = task_repo.claim(db, limit=10, lock_timeout=600)
+
+    for attempts, status in ((2, TaskStatus.running), (2, TaskStatus.failed)):
+        # The worker running it died without releasing it
+        db.query(Task).filter(Task.id == task.id).update(
+            {"locked_at": datetime.datetime(2000, 1, 1)}
+        )
+        db.commit()
+        task_repo.claim(db, limit=10, lock_timeout=600)
+        db.refresh(task)
+        assert (task.attempts, task.status) == (attempts, status)
@@ -0,0 +1,62 @@
+# type: ignore
+import signal
+from unittest import mock
+
+from app import server
+from app.server import LifespanUvicornWorker
+
+
+def test_default_options():
+    options = server.default_options()
+
+    assert options["workers"] == server.WEB_CONCURRENCY
+    assert options["preload_app"] is server.WEB_PRELOAD
+    assert options["post_fork"] is server.post_fork
+    assert options["max_requests"] == server.WEB_MAX_REQUESTS
+    assert options["max_requests_jitter"] == server.WEB_MAX_REQUESTS_JITTER
+    assert "threads" not in options
+
+
+def test_run_preloads_once_in_the_master(monkeypatch):
+    application = mock.Mock()
+    monkeypatch.setattr(server, "StandaloneApplication", application)
+    monkeypatch.setattr(server, "WEB_PRELOAD", True)
+    preload = mock.Mock()
+
+    server.run("app", {"workers": 3}, preload=preload)
+
+    preload.assert_called_once_with()
+    app, options = application.call_args.args
+    assert app == "app" and options["workers"] == 3
+
+    monkeypatch.setattr(server, "WEB_PRELOAD", False)
+    server.run("app", preload=preload)
+    assert preload.call_count == 1
+
+
+def test_post_fork_leaves_the_master_connections_alone(monkeypatch):
+    engine, async_engine = mock.Mock(), mock.Mock()
+    monkeypatch.setattr(server, "engine", engine)
+    monkeypatch.setattr(server, "async_engine", async_engine)
+
+    server.post_fork(None, None)
+
+    engine.dispose.assert_called_once_with(close=False)
+    async_engine.sync_engine.dispose.assert_called_once_with(close=False)
+
+
+def test_workers_over_their_memory_limit_stop_gracefully(monkeypatch):
+    kill = mock.Mock()
+    monkeypatch.setattr(server.os, "kill", kill)
+    worker = LifespanUvicornWorker.__new__(LifespanUvicornWorker)
+    worker.pid = 1234
+    worker.recycling = False
+    worker.max_rss = 2 ** 40
+
+    worker.check_memory()
+    assert not kill.called
+
+    worker.max_rss = 1
+    worker.check_memory()
+    worker.check_memory()
+    kill.assert_called_once_with(1234, signal.SIGTERM)
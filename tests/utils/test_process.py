@@ -0,0 +1,50 @@
+# type: ignore
+import os
+
+import pytest
+
+from app.utils.process import available_cpus, cgroup_cpu_quota, rss_bytes
+
+
+def cgroup(tmp_path, files):
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content + "\n")
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize(
+    "files, quota",
+    [
+        ({"cpu.max": "150000 100000"}, 1.5),
+        ({"cpu.max": "max 100000"}, None),
+        ({"cpu/cpu.cfs_quota_us": "200000", "cpu/cpu.cfs_period_us": "100000"}, 2.0,),
+        (
+            {
+                "cpu,cpuacct/cpu.cfs_quota_us": "-1",
+                "cpu,cpuacct/cpu.cfs_period_us": "100000",
+            },
+            None,
+        ),
+        ({}, None),
+    ],
+)
+def test_cgroup_cpu_quota(tmp_path, files, quota):
+    assert cgroup_cpu_quota(cgroup(tmp_path, files)) == quota
+
+
+def test_available_cpus_are_capped_by_the_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(16)))
+
+    assert available_cpus(cgroup(tmp_path, {"cpu.max": "150000 100000"})) == 2
+    assert available_cpus(cgroup(tmp_path / "v1", {})) == 16
+    assert available_cpus(cgroup(tmp_path / "tiny", {"cpu.max": "1000 100000"})) == 1
+
+
+def test_rss_bytes():
+    before = rss_bytes()
+    ballast = b"\x01" * (64 * 2 ** 20)
+
+    assert rss_bytes() - before >= 60 * 2 ** 20
+    del ballast